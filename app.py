@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 import os
-from utils.session_utils import ensure_session
+from utils.session_utils import ensure_session, get_dashboard_summary
+from utils.page_registry import PAGE_FILES, render_page
+from utils.warmup import warm_up
 
+warm_up()
 ensure_session()
 
 # Handle share code query parameter
@@ -94,21 +96,22 @@ else:
 
 # Handle incoming share code
 if hasattr(st.session_state, 'incoming_share_code') and st.session_state.incoming_share_code:
-    from utils.db import Database
+    from utils.resources import get_database
     
-    db = Database()
+    db = get_database()
     share_code = st.session_state.incoming_share_code
-    shared_set = db.get_study_set_by_share_code(share_code)
+    shared_set = db.get_share_preview(share_code, limit=5)
     
     if shared_set:
         st.success(f"✅ Found shared study set: **{shared_set['title']}**")
         
-        cards = db.get_cards(shared_set['id'])
+        cards = shared_set['preview_cards']
+        card_count = shared_set['card_count']
         
         st.markdown(f"### {shared_set['title']}")
         st.markdown(f"**Description:** {shared_set.get('description', 'No description')}")
         st.markdown(f"**Subject:** {shared_set.get('subject', 'Other')}")
-        st.markdown(f"**Cards:** {len(cards)}")
+        st.markdown(f"**Cards:** {card_count}")
         
         col1, col2 = st.columns(2)
         
@@ -132,13 +135,13 @@ if hasattr(st.session_state, 'incoming_share_code') and st.session_state.incomin
         
         st.markdown("---")
         st.markdown("### Preview Cards")
-        for i, card in enumerate(cards[:5]):
+        for i, card in enumerate(cards):
             with st.expander(f"Card {i+1}: {card['term'][:50]}"):
                 st.write(f"**Term:** {card['term']}")
                 st.write(f"**Definition:** {card['definition']}")
         
-        if len(cards) > 5:
-            st.caption(f"... and {len(cards) - 5} more cards")
+        if card_count > len(cards):
+            st.caption(f"... and {card_count - len(cards)} more cards")
     else:
         st.error("❌ Invalid or expired share link")
         if st.button("Go Home"):
@@ -152,10 +155,11 @@ if page == "Home":
     # Welcome message and statistics
     col1, col2, col3, col4 = st.columns(4)
     
-    total_sets = len(st.session_state.data_manager.get_all_sets())
-    total_cards = sum(len(study_set['cards']) for study_set in st.session_state.data_manager.get_all_sets().values())
-    mastered_cards = st.session_state.study_progress.get_total_mastered()
-    learning_cards = st.session_state.study_progress.get_total_learning()
+    summary = get_dashboard_summary()
+    total_sets = summary['total_sets']
+    total_cards = summary['total_cards']
+    mastered_cards = summary['mastered']
+    learning_cards = summary['learning']
     
     with col1:
         st.markdown(f"""
@@ -219,9 +223,9 @@ if page == "Home":
         st.markdown("---")
         st.subheader("📊 Your Recent Study Sets")
         
-        recent_sets = list(st.session_state.data_manager.get_all_sets().items())[:3]
-        for set_id, study_set in recent_sets:
-            with st.expander(f"📚 {study_set['title']} ({len(study_set['cards'])} cards)"):
+        for study_set in summary['recent_sets']:
+            set_id = study_set['id']
+            with st.expander(f"📚 {study_set['title']} ({study_set['card_count']} cards)"):
                 st.write(f"**Description:** {study_set.get('description', 'No description')}")
                 st.write(f"**Created:** {study_set.get('created_date', 'Unknown')}")
                 
@@ -238,26 +242,8 @@ if page == "Home":
                         st.session_state.page = "Practice Test"
                         st.rerun()
 
-elif page == "Create Study Set":
-    exec(open("pages/create_set.py").read())
-
-elif page == "Browse Sets":
-    exec(open("pages/browse_sets.py").read())
-
-elif page == "Study Mode":
-    exec(open("pages/study_mode.py").read())
-
-elif page == "Practice Test":
-    exec(open("pages/practice_test.py").read())
-
-elif page == "Spaced Review":
-    exec(open("pages/spaced_review.py").read())
-
-elif page == "Login":
-    exec(open("pages/auth.py").read())
-
-elif page == "Public Library":
-    exec(open("pages/public_library.py").read())
+elif page in PAGE_FILES:
+    render_page(page)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,35 @@
+"""Per-rerun cost of dispatching to a page script.
+
+Compares the old `exec(open(path).read())` dispatch (read + parse + compile on
+every rerun) with the page registry, which compiles each page once. Only the
+dispatch overhead is measured; the page bodies need a Streamlit runtime and are
+not executed.
+
+Run from the repository root:
+    python benchmarks/page_dispatch.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.page_registry import BASE_DIR, PAGE_FILES, get_page_code
+
+RERUNS = 2000
+
+def read_and_compile(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return compile(f.read(), path, 'exec')
+
+def main():
+    print(f"{'page':<18} {'exec(open().read())':>20} {'registry':>12} {'speedup':>9}")
+    for page, relative_path in PAGE_FILES.items():
+        path = os.path.join(BASE_DIR, relative_path)
+        before = timeit.timeit(lambda: read_and_compile(path), number=RERUNS) / RERUNS
+        get_page_code(page)
+        after = timeit.timeit(lambda: get_page_code(page), number=RERUNS) / RERUNS
+        print(f"{page:<18} {before * 1e6:>17.1f} us {after * 1e6:>9.1f} us {before / after:>8.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Memory and build time of a 10k-card deck as dicts versus row models.
+
+"dicts" is the old path: Database.get_cards built a dict per row, then
+DBDataManager copied each card into another dict for the session. "models" is
+Card.from_row, whose result is passed through unchanged; its memory includes
+the entries it adds to the pool of shared short strings. The rows stand in for
+what psycopg2 returns, so no database is needed.
+
+Run from the repository root:
+    python benchmarks/row_models.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.models import Card
+
+CARDS = 10000
+RUNS = 20
+
+def make_rows():
+    # Distinct strings per row, as psycopg2 creates them (nothing to intern across rows)
+    return [
+        (i, f"term {i}", f"definition of term {i} with a few more words", None, None, i)
+        for i in range(CARDS)
+    ]
+
+def as_dicts(rows):
+    cards = []
+    for row in rows:
+        cards.append({
+            'id': row[0],
+            'term': row[1],
+            'definition': row[2],
+            'term_image_url': row[3],
+            'definition_image_url': row[4],
+            'card_order': row[5]
+        })
+
+    formatted_cards = []
+    for card in cards:
+        formatted_cards.append({
+            'term': card['term'],
+            'definition': card['definition'],
+            'term_image_url': card.get('term_image_url'),
+            'definition_image_url': card.get('definition_image_url')
+        })
+    return cards, formatted_cards
+
+def as_models(rows):
+    return tuple(Card.from_row(row) for row in rows)
+
+def measure(build, rows):
+    """Bytes allocated by what `build` returns (the rows themselves excluded)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def main():
+    rows = make_rows()
+    print(f"{CARDS} cards    {'memory':>10} {'build time':>12}")
+    for name, build in (("dicts", as_dicts), ("models", as_models)):
+        memory = measure(build, rows)
+        seconds = timeit.timeit(lambda: build(rows), number=RUNS) / RUNS
+        print(f"{name:<12} {memory / 1024:>7.0f} KiB {seconds * 1e3:>9.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Cold start cost: import time and time to first render in a fresh interpreter.
+
+Each measurement runs in a new Python process, as a freshly started container
+would. "imports" is the time to import what app.py imports; the modules that
+are now loaded lazily are timed separately to show what eager imports cost.
+"first render" runs app.py once through Streamlit's AppTest (no browser or
+server), timed from process launch, so it includes interpreter start-up and
+imports. The warm-up thread runs in the background and is not waited for.
+
+Run from the repository root:
+    python benchmarks/startup.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+TARGET_SECONDS = 1.0
+
+IMPORT_TIMER = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+FIRST_RENDER = """
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("app.py", default_timeout=60).run()
+"""
+
+def run_python(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+def import_seconds(module: str) -> float:
+    # Streamlit is loaded first so only the module's own cost is measured
+    setup = "import streamlit\n" if module != "streamlit" else ""
+    return min(float(run_python(setup + IMPORT_TIMER.format(module=module)).splitlines()[-1])
+               for _ in range(RUNS))
+
+def first_render_seconds() -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        run_python(FIRST_RENDER)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    print("Imports (best of %d)" % RUNS)
+    for module in ("streamlit", "utils.session_utils", "utils.page_registry", "utils.warmup"):
+        print(f"  {module:<24} {import_seconds(module) * 1e3:>8.1f} ms")
+
+    print("Loaded lazily, not at start-up")
+    for module in ("pandas", "psycopg2", "bcrypt", "utils.db_data_manager"):
+        try:
+            print(f"  {module:<24} {import_seconds(module) * 1e3:>8.1f} ms")
+        except subprocess.CalledProcessError:
+            print(f"  {module:<24} {'not installed':>11}")
+
+    seconds = first_render_seconds()
+    verdict = "within" if seconds <= TARGET_SECONDS else "over"
+    print(f"First render (best of {RUNS}): {seconds:.2f}s, {verdict} the {TARGET_SECONDS:.0f}s target")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Time to generate a 20-question multiple choice test from a 50k-card deck.
+
+"scan" is the old path: each question scanned the whole deck for the other
+cards before sampling three of them. The others are TestGenerator, drawing
+from a DeckIndex built once per deck version (timed separately) and a
+QuestionBank: "new bank" is the first test of a deck version, which builds
+the distractor pools of its cards, and "warm bank" is the same test started
+again (e.g. by the rest of a class), which only samples from them. "similar"
+adds the similarity distractor engine, when NumPy is installed; its TF-IDF
+index is also built once per deck version. The deck is an in-memory
+ListDeckSource, so no database is needed.
+
+Run from the repository root:
+    python benchmarks/test_generation.py
+"""
+import os
+import random
+import string
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deck_cursor import ListDeckSource
+from utils.distractors import SimilarityIndex, get_distractor_engine
+from utils.test_generator import DeckIndex, QuestionBank, TestGenerator
+
+CARDS = 50000
+QUESTIONS = 20
+RUNS = 20
+
+def make_cards():
+    # Definitions mix a few common words with many rare ones, like real decks
+    rng = random.Random(1)
+    rare = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(20000)]
+    common = ['the', 'of', 'a', 'and', 'in', 'to', 'is', 'that']
+    return [
+        {'term': f"term {i}",
+         'definition': ' '.join(rng.choice(common) if rng.random() < 0.4 else rng.choice(rare) for _ in range(10))}
+        for i in range(CARDS)
+    ]
+
+def scan(cards):
+    questions = []
+    for card in random.sample(cards, QUESTIONS):
+        other_cards = [c for c in cards if c != card]
+        wrong_answers = random.sample(other_cards, min(3, len(other_cards)))
+        options = [card['definition']] + [c['definition'] for c in wrong_answers]
+        random.shuffle(options)
+        questions.append({'card': card, 'options': options})
+    return questions
+
+def main():
+    cards = make_cards()
+    source = ListDeckSource(cards)
+
+    index_seconds = timeit.timeit(lambda: DeckIndex(source.card_keys()), number=RUNS) / RUNS
+    index = DeckIndex(source.card_keys())
+
+    print(f"{QUESTIONS} questions from {CARDS} cards")
+    print(f"  {'index build':<18} {index_seconds * 1e3:>9.2f} ms (once per deck version)")
+
+    def new_bank(engine=None):
+        return TestGenerator(QuestionBank(source, index, distractors=engine and (lambda: engine)))
+
+    warm = new_bank()
+    strategies = [("scan", lambda: scan(cards)),
+                  ("random, new bank", lambda: new_bank().generate(QUESTIONS, "Multiple Choice")),
+                  ("random, warm bank", lambda: warm.generate(QUESTIONS, "Multiple Choice", random_order=False))]
+
+    engine = get_distractor_engine(source, "benchmark", 1)
+    if engine is None:
+        print("  (NumPy not installed, similarity engine skipped)")
+    else:
+        started = time.perf_counter()
+        SimilarityIndex(cards=source.cards_after(None, CARDS))
+        print(f"  {'tf-idf build':<18} {(time.perf_counter() - started) * 1e3:>9.2f} ms (once per deck version)")
+        warm_similar = new_bank(engine)
+        strategies += [("similar, new bank", lambda: new_bank(engine).generate(QUESTIONS, "Multiple Choice")),
+                       ("similar, warm bank",
+                        lambda: warm_similar.generate(QUESTIONS, "Multiple Choice", random_order=False))]
+
+    for name, generate in strategies:
+        runs = 1 if name == "scan" else RUNS
+        seconds = timeit.timeit(generate, number=runs) / runs
+        print(f"  {name:<18} {seconds * 1e3:>9.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,8 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(100) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    last_login TIMESTAMP
+    last_login TIMESTAMP,
+    progress_updated_at TIMESTAMP
 );
 
 -- Study sets table
@@ -20,6 +21,8 @@ CREATE TABLE IF NOT EXISTS study_sets (
     subject VARCHAR(100),
     is_public BOOLEAN DEFAULT FALSE,
     share_code VARCHAR(20) UNIQUE,
+    source_set_id VARCHAR(36) REFERENCES study_sets(id) ON DELETE SET NULL,
+    synced_at TIMESTAMP,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
@@ -33,6 +36,13 @@ CREATE TABLE IF NOT EXISTS cards (
     term_image_url TEXT,
     definition_image_url TEXT,
     card_order INTEGER NOT NULL,
+    source_card_id INTEGER REFERENCES cards(id) ON DELETE SET NULL,
+    is_deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    superseded_at TIMESTAMP,
+    replaced_by INTEGER REFERENCES cards(id) ON DELETE SET NULL,
+    content_hash TEXT GENERATED ALWAYS AS (
+        md5(term || chr(31) || definition || chr(31) || COALESCE(term_image_url, '') || chr(31) || COALESCE(definition_image_url, ''))
+    ) STORED,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -50,14 +60,93 @@ CREATE TABLE IF NOT EXISTS study_progress (
     easiness_factor DECIMAL(3,2) DEFAULT 2.5,
     repetitions INTEGER DEFAULT 0,
     interval_days INTEGER DEFAULT 0,
-    UNIQUE(user_id, card_id)
+    UNIQUE(user_id, study_set_id, card_id)
 );
 
+-- Finished practice tests; each attempt's results are applied to study progress once
+CREATE TABLE IF NOT EXISTS test_attempts (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    study_set_id VARCHAR(36) NOT NULL REFERENCES study_sets(id) ON DELETE CASCADE,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    score INTEGER,
+    question_count INTEGER
+);
+
+-- One row per answered question of an attempt, inserted in bulk when the attempt is recorded
+CREATE TABLE IF NOT EXISTS test_responses (
+    attempt_id VARCHAR(36) NOT NULL REFERENCES test_attempts(id) ON DELETE CASCADE,
+    position SMALLINT NOT NULL,
+    card_id INTEGER NOT NULL,
+    question_type VARCHAR(20) NOT NULL,
+    is_correct BOOLEAN NOT NULL,
+    chosen_card_id INTEGER,
+    similarity REAL,
+    seconds REAL,
+    PRIMARY KEY (attempt_id, position)
+);
+
+-- Item analysis, updated incrementally with each recorded attempt so reading it never
+-- scans test_responses: how often each card was answered (correctly), and how often each
+-- distractor was offered with it and picked
+CREATE TABLE IF NOT EXISTS card_item_stats (
+    study_set_id VARCHAR(36) NOT NULL REFERENCES study_sets(id) ON DELETE CASCADE,
+    card_id INTEGER NOT NULL,
+    responses INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    total_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (study_set_id, card_id)
+);
+
+CREATE TABLE IF NOT EXISTS card_distractor_stats (
+    study_set_id VARCHAR(36) NOT NULL REFERENCES study_sets(id) ON DELETE CASCADE,
+    card_id INTEGER NOT NULL,
+    distractor_card_id INTEGER NOT NULL,
+    offered INTEGER NOT NULL DEFAULT 0,
+    picked INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (study_set_id, card_id, distractor_card_id)
+);
+
+-- Copy-on-write study set copies (for databases created before copies shared cards)
+-- A copy references its source set's cards; a card row with source_card_id overrides
+-- (or, with is_deleted, hides) the shared source card inside that copy only.
+ALTER TABLE study_sets ADD COLUMN IF NOT EXISTS source_set_id VARCHAR(36) REFERENCES study_sets(id) ON DELETE SET NULL;
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS source_card_id INTEGER REFERENCES cards(id) ON DELETE SET NULL;
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS is_deleted BOOLEAN NOT NULL DEFAULT FALSE;
+-- Progress on a shared card is tracked per copy, so the same card_id can appear once per set
+ALTER TABLE study_progress DROP CONSTRAINT IF EXISTS study_progress_user_id_card_id_key;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_study_progress_user_set_card ON study_progress(user_id, study_set_id, card_id);
+
+-- Upstream sync for copied sets: a copy sees its source's cards as of synced_at, and
+-- source cards are versioned (superseded_at/replaced_by) while copies exist
+ALTER TABLE study_sets ADD COLUMN IF NOT EXISTS synced_at TIMESTAMP;
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS superseded_at TIMESTAMP;
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS replaced_by INTEGER REFERENCES cards(id) ON DELETE SET NULL;
+ALTER TABLE cards ADD COLUMN IF NOT EXISTS content_hash TEXT GENERATED ALWAYS AS (
+    md5(term || chr(31) || definition || chr(31) || COALESCE(term_image_url, '') || chr(31) || COALESCE(definition_image_url, ''))
+) STORED;
+UPDATE study_sets SET synced_at = CURRENT_TIMESTAMP WHERE source_set_id IS NOT NULL AND synced_at IS NULL;
+
+-- Bumped on every change to a user's study progress so per-session caches can revalidate cheaply
+ALTER TABLE users ADD COLUMN IF NOT EXISTS progress_updated_at TIMESTAMP;
+
+-- Attempt details (for databases created before test responses were kept)
+ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS started_at TIMESTAMP;
+ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS score INTEGER;
+ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS question_count INTEGER;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_study_sets_user_id ON study_sets(user_id);
 CREATE INDEX IF NOT EXISTS idx_study_sets_is_public ON study_sets(is_public);
 CREATE INDEX IF NOT EXISTS idx_study_sets_share_code ON study_sets(share_code);
 CREATE INDEX IF NOT EXISTS idx_cards_study_set_id ON cards(study_set_id);
+CREATE INDEX IF NOT EXISTS idx_study_sets_source_set_id ON study_sets(source_set_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_set_source_card ON cards(study_set_id, source_card_id) WHERE source_card_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_cards_set_order ON cards(study_set_id, card_order, id);
+CREATE INDEX IF NOT EXISTS idx_cards_set_created_at ON cards(study_set_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_cards_set_superseded_at ON cards(study_set_id, superseded_at) WHERE superseded_at IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_study_progress_user_id ON study_progress(user_id);
 CREATE INDEX IF NOT EXISTS idx_study_progress_card_id ON study_progress(card_id);
 CREATE INDEX IF NOT EXISTS idx_study_progress_next_review ON study_progress(next_review_date);
+CREATE INDEX IF NOT EXISTS idx_test_attempts_user_set ON test_attempts(user_id, study_set_id, finished_at);
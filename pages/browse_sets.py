@@ -3,6 +3,9 @@ from utils.session_utils import ensure_session
 
 ensure_session()
 
+# Tiles built per page of the grid
+SETS_PER_PAGE = 20
+
 st.title("📖 Browse Study Sets")
 st.markdown("Explore and manage your study sets.")
 
@@ -57,8 +60,8 @@ if hasattr(st.session_state, 'sharing_set_id') and st.session_state.sharing_set_
                     del st.session_state.sharing_set_id
                     st.rerun()
 
-# Get all study sets
-all_sets = st.session_state.data_manager.get_all_sets()
+# Get all study sets, with card counts but without their cards
+all_sets = st.session_state.data_manager.list_study_sets()
 
 if not all_sets:
     st.info("No study sets found. Create your first study set to get started!")
@@ -96,21 +99,33 @@ else:
     
     # Sort sets
     if sort_by == "Recently Created":
-        sorted_sets = sorted(filtered_sets.items(), key=lambda x: x[1].get('created_date', ''), reverse=True)
+        sorted_sets = sorted(filtered_sets.items(), key=lambda x: x[1].get('created_date') or '', reverse=True)
     elif sort_by == "Title (A-Z)":
         sorted_sets = sorted(filtered_sets.items(), key=lambda x: x[1]['title'].lower())
     else:  # Card Count
-        sorted_sets = sorted(filtered_sets.items(), key=lambda x: len(x[1]['cards']), reverse=True)
+        sorted_sets = sorted(filtered_sets.items(), key=lambda x: x[1]['card_count'], reverse=True)
     
     st.markdown(f"**{len(filtered_sets)}** study sets found")
     
+    # Only the current page of tiles is built; a new search starts from the first page
+    page_count = max(1, -(-len(sorted_sets) // SETS_PER_PAGE))
+    filters = (search_term, selected_subject, sort_by)
+    if st.session_state.get('browse_filters') != filters:
+        st.session_state.browse_filters = filters
+        st.session_state.browse_page = 0
+    browse_page = min(st.session_state.get('browse_page', 0), page_count - 1)
+    page_sets = sorted_sets[browse_page * SETS_PER_PAGE:(browse_page + 1) * SETS_PER_PAGE]
+    
+    # Progress for every set in one query
+    all_progress = st.session_state.study_progress.get_all_set_progress()
+    
     # Display study sets in a grid
-    for i in range(0, len(sorted_sets), 2):
+    for i in range(0, len(page_sets), 2):
         cols = st.columns(2)
         
         for j, col in enumerate(cols):
-            if i + j < len(sorted_sets):
-                set_id, study_set = sorted_sets[i + j]
+            if i + j < len(page_sets):
+                set_id, study_set = page_sets[i + j]
                 
                 with col:
                     with st.container():
@@ -119,7 +134,7 @@ else:
                             <h4 style="color: #6366f1; margin-top: 0;">{study_set['title']}</h4>
                             <p style="color: #64748b; font-size: 0.9rem;">{study_set.get('description', 'No description')[:100]}{'...' if len(study_set.get('description', '')) > 100 else ''}</p>
                             <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 1rem;">
-                                <span style="background-color: #6366f1; color: white; padding: 0.2rem 0.5rem; border-radius: 4px; font-size: 0.8rem;">{len(study_set['cards'])} cards</span>
+                                <span style="background-color: #6366f1; color: white; padding: 0.2rem 0.5rem; border-radius: 4px; font-size: 0.8rem;">{study_set['card_count']} cards</span>
                                 <span style="color: #64748b; font-size: 0.8rem;">{study_set.get('subject', 'Other')}</span>
                             </div>
                         </div>
@@ -151,12 +166,39 @@ else:
                                     st.success(f"Deleted '{study_set['title']}'")
                                     st.rerun()
                         
+                        # Copies can pull in changes made to the set they were copied from
+                        if study_set.get('has_upstream_changes'):
+                            if st.button("🔄 Sync with Original", key=f"sync_{set_id}", use_container_width=True):
+                                delta = st.session_state.data_manager.sync_study_set(set_id)
+                                if delta:
+                                    st.success(
+                                        f"Synced: {delta['added']} added, {delta['changed']} changed, "
+                                        f"{delta['removed']} removed"
+                                    )
+                                    st.rerun()
+                        
                         # Study progress for this set
-                        progress = st.session_state.study_progress.get_set_progress(set_id)
-                        if progress['studied'] > 0:
-                            mastery_percentage = (progress['mastered'] / len(study_set['cards'])) * 100
-                            st.progress(mastery_percentage / 100)
-                            st.caption(f"Progress: {progress['mastered']}/{len(study_set['cards'])} mastered ({mastery_percentage:.0f}%)")
+                        progress = all_progress.get(set_id)
+                        if progress and progress['studied'] > 0 and study_set['card_count']:
+                            mastery_percentage = (progress['mastered'] / study_set['card_count']) * 100
+                            st.progress(min(mastery_percentage / 100, 1.0))
+                            st.caption(f"Progress: {progress['mastered']}/{study_set['card_count']} mastered ({mastery_percentage:.0f}%)")
+    
+    if page_count > 1:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        
+        with col_prev:
+            if st.button("⬅️ Previous", disabled=browse_page == 0, use_container_width=True):
+                st.session_state.browse_page = browse_page - 1
+                st.rerun()
+        
+        with col_page:
+            st.markdown(f"<p style='text-align: center;'>Page {browse_page + 1} of {page_count}</p>", unsafe_allow_html=True)
+        
+        with col_next:
+            if st.button("Next ➡️", disabled=browse_page == page_count - 1, use_container_width=True):
+                st.session_state.browse_page = browse_page + 1
+                st.rerun()
 
 # Summary statistics
 if all_sets:
@@ -166,7 +208,7 @@ if all_sets:
     col1, col2, col3, col4 = st.columns(4)
     
     total_sets = len(all_sets)
-    total_cards = sum(len(study_set['cards']) for study_set in all_sets.values())
+    total_cards = sum(study_set['card_count'] for study_set in all_sets.values())
     subjects = list(set(study_set.get('subject', 'Other') for study_set in all_sets.values()))
     avg_cards = total_cards / total_sets if total_sets > 0 else 0
     
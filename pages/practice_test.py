@@ -1,6 +1,11 @@
 import streamlit as st
-import random
+import time
+import uuid
+from array import array
+from datetime import datetime
+from utils.grading import grader
 from utils.session_utils import ensure_session
+from utils.test_generator import TestGenerator, get_question_bank
 
 ensure_session()
 
@@ -15,14 +20,69 @@ if 'selected_set_id' not in st.session_state:
         st.rerun()
     st.stop()
 
-# Get the selected study set
-study_set = st.session_state.data_manager.get_study_set(st.session_state.selected_set_id)
+# Get the selected study set; questions refer to its cards by key and the
+# text is looked up when a question is shown
+set_id = st.session_state.selected_set_id
+study_set = st.session_state.data_manager.get_study_set_info(set_id)
 if not study_set:
     st.error("Study set not found.")
     st.stop()
 
+card_source = st.session_state.data_manager.get_deck_source(set_id)
+
+def get_cards(keys):
+    """Look up the cards with the given keys, by key"""
+    return {card.key: card for card in card_source.cards_by_keys(list(keys))}
+
+def refresh_question(question):
+    """Point a question at the current keys of its cards, which an edit or a sync
+    with the original may have changed during the test
+    
+    Returns False if the question's card is no longer in the set.
+    """
+    options = question.get('options', ())
+    current = card_source.current_keys([question['card'], *options])
+    if current.get(question['card']) is None:
+        return False
+    
+    question['card'] = current[question['card']]
+    if options:
+        question['options'] = array('q', [current[key] for key in options if current.get(key) is not None])
+    return True
+
+def question_text(question, card):
+    if question['type'] == 'multiple_choice':
+        return f"What is the definition of: {card['term']}?"
+    return f"Define: {card['term']}"
+
 st.markdown(f"**Testing:** {study_set['title']}")
 
+# Item analysis of earlier attempts, for the set's owner (not shown while taking a test)
+test_in_progress = st.session_state.get('test_session', {}).get('started') and not st.session_state.test_session.get('completed')
+item_statistics = [] if test_in_progress else st.session_state.data_manager.get_item_statistics(set_id)
+if item_statistics:
+    with st.expander(f"📈 Item Analysis ({len(item_statistics)} cards tested)"):
+        st.caption("Hardest cards first. P-value is the share of answers that were correct.")
+        st.dataframe(
+            [
+                {
+                    'Term': item['term'],
+                    'Answers': item['responses'],
+                    'P-value': f"{item['p_value']:.0%}",
+                    'Avg. time': f"{item['avg_seconds']:.0f}s",
+                    'Most picked wrong answer': item['top_distractor'] or "",
+                    'Picked when offered': (f"{item['top_distractor_pick_rate']:.0%}"
+                                            if item['top_distractor_pick_rate'] is not None else "")
+                }
+                for item in item_statistics
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+
+if st.session_state.get('test_session', {}).get('set_id', set_id) != set_id:
+    del st.session_state.test_session
+
 # Test configuration
 if 'test_session' not in st.session_state or st.button("🔄 Start New Test"):
     st.markdown("### 🛠️ Test Configuration")
@@ -31,53 +91,24 @@ if 'test_session' not in st.session_state or st.button("🔄 Start New Test"):
     
     with col1:
         test_type = st.selectbox("Test Type", ["Multiple Choice", "Written Response", "Mixed"])
-        num_questions = st.slider("Number of Questions", 1, min(len(study_set['cards']), 20), min(10, len(study_set['cards'])))
+        num_questions = st.slider("Number of Questions", 1, min(study_set['card_count'], 20), min(10, study_set['card_count']))
     
     with col2:
         question_order = st.selectbox("Question Order", ["Random", "Original Order"])
         time_limit = st.selectbox("Time Limit", ["No Limit", "1 minute per question", "30 seconds per question"])
     
     if st.button("🚀 Start Test", use_container_width=True):
-        # Create test questions
-        test_cards = study_set['cards'].copy()
-        if question_order == "Random":
-            random.shuffle(test_cards)
-        
-        test_cards = test_cards[:num_questions]
-        questions = []
-        
-        for i, card in enumerate(test_cards):
-            if test_type == "Multiple Choice" or (test_type == "Mixed" and random.choice([True, False])):
-                # Create multiple choice question
-                question = {
-                    'type': 'multiple_choice',
-                    'question': f"What is the definition of: {card['term']}?",
-                    'correct_answer': card['definition'],
-                    'options': []
-                }
-                
-                # Add correct answer
-                question['options'].append(card['definition'])
-                
-                # Add wrong answers from other cards
-                other_cards = [c for c in study_set['cards'] if c != card]
-                wrong_answers = random.sample(other_cards, min(3, len(other_cards)))
-                for wrong_card in wrong_answers:
-                    question['options'].append(wrong_card['definition'])
-                
-                random.shuffle(question['options'])
-                questions.append(question)
-            else:
-                # Create written response question
-                question = {
-                    'type': 'written',
-                    'question': f"Define: {card['term']}",
-                    'correct_answer': card['definition'],
-                    'term': card['term']
-                }
-                questions.append(question)
+        # Create test questions from card keys; only the keys are kept in the session
+        bank = get_question_bank(card_source, set_id, study_set.get('updated_at'))
+        questions = TestGenerator(bank).generate(
+            num_questions, test_type, random_order=question_order == "Random"
+        )
         
         st.session_state.test_session = {
+            'attempt_id': str(uuid.uuid4()),
+            'started_at': datetime.now(),
+            'question_started_at': time.time(),
+            'set_id': set_id,
             'questions': questions,
             'current_question': 0,
             'answers': [],
@@ -98,6 +129,22 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
         
         if current_q < len(questions):
             question = questions[current_q]
+            cards = get_cards(question.get('options', [question['card']]))
+            card = cards.get(question['card'])
+            if (card is None or len(cards) < len(question.get('options', ()))) and refresh_question(question):
+                cards = get_cards(question.get('options', [question['card']]))
+                card = cards.get(question['card'])
+            
+            if card is None:
+                # The card left the set during the test; its question is dropped
+                questions.pop(current_q)
+                test_session['skipped'] = test_session.get('skipped', 0) + 1
+                if current_q >= len(questions):
+                    test_session['completed'] = True
+                st.rerun()
+            
+            if test_session.get('skipped'):
+                st.info(f"{test_session['skipped']} question(s) were skipped because their cards were removed from the set.")
             
             # Progress indicator
             progress = (current_q + 1) / len(questions)
@@ -105,32 +152,36 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
             st.markdown(f"**Question {current_q + 1} of {len(questions)}**")
             
             # Display question
-            st.markdown(f"### {question['question']}")
+            st.markdown(f"### {question_text(question, card)}")
             
             if question['type'] == 'multiple_choice':
                 # Multiple choice question
                 answer = st.radio(
                     "Select the correct answer:",
-                    question['options'],
+                    [key for key in question['options'] if key in cards],
+                    format_func=lambda key: cards[key]['definition'],
                     key=f"q_{current_q}"
                 )
                 
                 if st.button("Submit Answer", key=f"submit_{current_q}"):
-                    is_correct = answer == question['correct_answer']
+                    chosen = cards.get(answer)
+                    is_correct = chosen is not None and chosen['definition'] == card['definition']
                     test_session['answers'].append({
-                        'question': question['question'],
+                        'card': question['card'],
+                        'type': question['type'],
                         'user_answer': answer,
-                        'correct_answer': question['correct_answer'],
-                        'is_correct': is_correct
+                        'is_correct': is_correct,
+                        'seconds': time.time() - test_session['question_started_at']
                     })
                     
                     if is_correct:
                         test_session['score'] += 1
                         st.success("✅ Correct!")
                     else:
-                        st.error(f"❌ Incorrect. The correct answer is: {question['correct_answer']}")
+                        st.error(f"❌ Incorrect. The correct answer is: {card['definition']}")
                     
                     test_session['current_question'] += 1
+                    test_session['question_started_at'] = time.time()
                     
                     if test_session['current_question'] >= len(questions):
                         test_session['completed'] = True
@@ -146,50 +197,83 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
                 )
                 
                 if st.button("Submit Answer", key=f"submit_written_{current_q}"):
-                    # Simple similarity check (case-insensitive)
-                    correct_answer = question['correct_answer'].lower().strip()
-                    user_answer_clean = user_answer.lower().strip()
-                    
-                    # Basic scoring - check if key words are present
-                    correct_words = set(correct_answer.split())
-                    user_words = set(user_answer_clean.split())
-                    overlap = len(correct_words.intersection(user_words))
-                    similarity = overlap / len(correct_words) if correct_words else 0
-                    
-                    is_correct = similarity >= 0.6  # 60% word overlap threshold
-                    
+                    # Written answers are graded together when the test is submitted
                     test_session['answers'].append({
-                        'question': question['question'],
+                        'card': question['card'],
+                        'type': question['type'],
                         'user_answer': user_answer,
-                        'correct_answer': question['correct_answer'],
-                        'is_correct': is_correct,
-                        'similarity': similarity
+                        'is_correct': None,
+                        'seconds': time.time() - test_session['question_started_at']
                     })
                     
-                    if is_correct:
-                        test_session['score'] += 1
-                        st.success("✅ Good answer!")
-                    else:
-                        st.warning(f"⚠️ Your answer needs improvement. Expected: {question['correct_answer']}")
-                    
-                    # Show comparison
-                    st.markdown("**Your answer:**")
-                    st.write(user_answer)
-                    st.markdown("**Expected answer:**")
-                    st.write(question['correct_answer'])
-                    
                     test_session['current_question'] += 1
+                    test_session['question_started_at'] = time.time()
                     
                     if test_session['current_question'] >= len(questions):
                         test_session['completed'] = True
                     
                     st.rerun()
-        
+    
     else:
         # Test completed - show results
         st.success("🎉 Test Completed!")
         
-        score_percentage = (test_session['score'] / len(test_session['questions'])) * 100
+        # Mark cards answered correctly as easy, once per attempt however often the results rerun
+        if not test_session.get('results_recorded', False):
+            # Cards edited or removed since they were answered are recorded under
+            # their current keys, or not at all
+            answers = test_session['answers']
+            current = card_source.current_keys(list(
+                {answer['card'] for answer in answers}
+                | {answer['user_answer'] for answer in answers if answer['type'] == 'multiple_choice'}
+            ))
+            for question, answer in zip(test_session['questions'], answers):
+                answer['card'] = current.get(answer['card'])
+                if answer['type'] == 'multiple_choice':
+                    answer['user_answer'] = current.get(answer['user_answer'])
+                    question['options'] = [current[key] for key in question.get('options', ()) if current.get(key) is not None]
+            
+            # Grade the written answers as one batch: share of the expected key
+            # words present, allowing for small typos
+            written = [answer for answer in answers if answer['is_correct'] is None and answer['card'] is not None]
+            written_cards = get_cards(answer['card'] for answer in written)
+            written = [answer for answer in written if answer['card'] in written_cards]
+            grades = grader.grade_batch(
+                (written_cards[answer['card']]['definition'], answer['user_answer']) for answer in written
+            )
+            for answer, (similarity, is_correct) in zip(written, grades):
+                answer['similarity'] = similarity
+                answer['is_correct'] = is_correct
+                if is_correct:
+                    test_session['score'] += 1
+            
+            responses = []
+            for question, answer in zip(test_session['questions'], answers):
+                if answer['card'] is None:
+                    continue
+                responses.append({
+                    'card': answer['card'],
+                    'type': answer['type'],
+                    'is_correct': answer['is_correct'],
+                    'chosen': answer['user_answer'] if answer['type'] == 'multiple_choice' else None,
+                    'options': question.get('options', ()),
+                    'similarity': answer.get('similarity'),
+                    'seconds': answer.get('seconds')
+                })
+            
+            st.session_state.study_progress.record_test_results(
+                set_id,
+                {
+                    'id': test_session['attempt_id'],
+                    'started_at': test_session.get('started_at'),
+                    'score': test_session['score'],
+                    'responses': responses
+                },
+                [(answer['card'], 'easy') for answer in answers if answer['is_correct'] and answer['card'] is not None]
+            )
+            test_session['results_recorded'] = True
+        
+        score_percentage = (test_session['score'] / len(test_session['questions'])) * 100 if test_session['questions'] else 0
         
         col1, col2, col3 = st.columns(3)
         
@@ -221,11 +305,27 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
         # Detailed results
         st.markdown("### 📋 Detailed Results")
         
+        answer_cards = get_cards(
+            {answer['card'] for answer in test_session['answers'] if answer['card'] is not None}
+            | {answer['user_answer'] for answer in test_session['answers']
+               if answer['type'] == 'multiple_choice' and answer['user_answer'] is not None}
+        )
+        
         for i, answer in enumerate(test_session['answers']):
+            card = answer_cards.get(answer['card'])
+            if card is None:
+                continue
+            
+            if answer['type'] == 'multiple_choice':
+                chosen = answer_cards.get(answer['user_answer'])
+                user_answer = chosen['definition'] if chosen else ""
+            else:
+                user_answer = answer['user_answer']
+            
             with st.expander(f"Question {i+1}: {'✅' if answer['is_correct'] else '❌'}"):
-                st.write(f"**Question:** {answer['question']}")
-                st.write(f"**Your Answer:** {answer['user_answer']}")
-                st.write(f"**Correct Answer:** {answer['correct_answer']}")
+                st.write(f"**Question:** {question_text(answer, card)}")
+                st.write(f"**Your Answer:** {user_answer}")
+                st.write(f"**Correct Answer:** {card['definition']}")
                 
                 if 'similarity' in answer:
                     st.write(f"**Similarity Score:** {answer['similarity']:.1%}")
@@ -247,18 +347,6 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
             if st.button("📊 Browse Sets"):
                 st.session_state.page = "Browse Sets"
                 st.rerun()
-        
-        # Update study progress based on test results
-        for answer in test_session['answers']:
-            if answer['is_correct']:
-                # Mark as mastered if answered correctly
-                # Find the card index for this question
-                for card_idx, card in enumerate(study_set['cards']):
-                    if card['term'] in answer['question']:
-                        st.session_state.study_progress.update_card_difficulty(
-                            st.session_state.selected_set_id, card_idx, 'easy'
-                        )
-                        break
 
 # Sidebar with test statistics
 if 'test_session' in st.session_state and st.session_state.test_session.get('started', False):
@@ -267,11 +355,14 @@ if 'test_session' in st.session_state and st.session_state.test_session.get('sta
         
         test_session = st.session_state.test_session
         
+        # Written answers count once the test is submitted and they are graded
+        graded = sum(1 for answer in test_session['answers'] if answer['is_correct'] is not None)
+        
         if not test_session.get('completed', False):
             st.metric("Questions Completed", f"{test_session['current_question']}/{len(test_session['questions'])}")
-            st.metric("Current Score", f"{test_session['score']}/{test_session['current_question']}" if test_session['current_question'] > 0 else "0/0")
+            st.metric("Current Score", f"{test_session['score']}/{graded}" if graded > 0 else "0/0")
         
-        if test_session['current_question'] > 0:
-            current_percentage = (test_session['score'] / test_session['current_question']) * 100
+        if graded > 0:
+            current_percentage = (test_session['score'] / graded) * 100
             st.progress(current_percentage / 100)
             st.caption(f"{current_percentage:.1f}% Correct So Far")
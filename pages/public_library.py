@@ -102,7 +102,7 @@ if hasattr(st.session_state, 'preview_set_id') and st.session_state.preview_set_
             st.markdown(f"**Description:** {preview_set.get('description', 'No description')}")
             st.markdown(f"**Subject:** {preview_set.get('subject', 'Other')}")
             
-            cards = db.get_cards(preview_set_id)
+            cards = preview_set['cards']
             st.markdown(f"**Total Cards:** {len(cards)}")
             
             st.markdown("---")
@@ -1,6 +1,5 @@
 import streamlit as st
 from utils.spaced_repetition import SpacedRepetition
-from datetime import datetime
 from utils.session_utils import ensure_session
 
 ensure_session()
@@ -41,21 +40,8 @@ for set_id, study_set in all_sets.items():
     due_cards = []
     for i in range(len(cards)):
         progress = st.session_state.study_progress.get_card_progress(set_id, i)
-        next_review = progress.get('next_review_date')
-        
-        if next_review is None:
+        if SpacedRepetition.is_card_due(progress):
             due_cards.append(i)
-        else:
-            if isinstance(next_review, str):
-                try:
-                    next_review_dt = datetime.fromisoformat(next_review)
-                    if SpacedRepetition.is_due_for_review(next_review_dt):
-                        due_cards.append(i)
-                except:
-                    due_cards.append(i)
-            elif isinstance(next_review, datetime):
-                if SpacedRepetition.is_due_for_review(next_review):
-                    due_cards.append(i)
     
     if due_cards:
         due_cards_by_set[set_id] = {
@@ -1,6 +1,14 @@
 import streamlit as st
-import random
+from array import array
 from utils.session_utils import ensure_session
+from utils.flashcard_component import flashcard_deck
+from utils.deck_cursor import DeckCursor
+
+# Cards held in memory, and sent to the in-browser flashcards, at a time
+CARD_WINDOW = 200
+
+# Windows sent to the in-browser flashcards whose ratings are still accepted
+SENT_DECKS = 4
 
 ensure_session()
 
@@ -15,209 +23,328 @@ if 'selected_set_id' not in st.session_state:
         st.rerun()
     st.stop()
 
-# Get the selected study set
-study_set = st.session_state.data_manager.get_study_set(st.session_state.selected_set_id)
+# Get the selected study set; its cards are read window by window through a DeckCursor
+study_set = st.session_state.data_manager.get_study_set_info(st.session_state.selected_set_id)
 if not study_set:
     st.error("Study set not found.")
     st.stop()
 
 st.markdown(f"**Studying:** {study_set['title']}")
-st.markdown(f"*{len(study_set['cards'])} cards*")
+st.markdown(f"*{study_set['card_count']} cards*")
 
-# Initialize study session
-if 'study_session' not in st.session_state:
-    st.session_state.study_session = {
-        'cards': study_set['cards'].copy(),
-        'current_index': 0,
+def new_study_session(set_id):
+    """Study session state; cards are referred to by key and read from the shared card store"""
+    return {
+        'set_id': set_id,
+        'cursor': DeckCursor(st.session_state.data_manager.get_deck_source(set_id), window_size=CARD_WINDOW),
         'show_definition': False,
-        'shuffled': False,
+        # Card keys of each window sent to the in-browser flashcards, by deck key
+        'sent_decks': {},
         'studied_cards': set(),
-        'difficult_cards': [],
-        'easy_cards': []
+        'difficult_cards': array('q'),
+        'easy_cards': array('q')
     }
 
-cards = st.session_state.study_session['cards']
-current_index = st.session_state.study_session['current_index']
+# Initialize study session
+if st.session_state.get('study_session', {}).get('set_id') != st.session_state.selected_set_id:
+    st.session_state.study_session = new_study_session(st.session_state.selected_set_id)
 
-if not cards:
+if not len(st.session_state.study_session['cursor']):
     st.info("No cards in this study set.")
     st.stop()
 
-# Study mode controls
-col1, col2, col3 = st.columns([1, 2, 1])
+def replace_card_key(key, new_key):
+    """Refer to an edited card by its new key in the study session, or forget a deleted one (None)"""
+    session = st.session_state.study_session
+    session['cursor'].replace(key, new_key)
+    for name in ('difficult_cards', 'easy_cards'):
+        session[name] = array('q', (new_key if k == key else k for k in session[name]
+                                    if k != key or new_key is not None))
+    if key in session['studied_cards']:
+        session['studied_cards'].discard(key)
+        if new_key is not None:
+            session['studied_cards'].add(new_key)
 
-with col1:
-    if st.button("🔀 Shuffle Cards"):
-        random.shuffle(st.session_state.study_session['cards'])
-        st.session_state.study_session['shuffled'] = True
-        st.rerun()
-
-with col2:
-    st.markdown(f"**Card {current_index + 1} of {len(cards)}**")
-    progress = (current_index + 1) / len(cards)
-    st.progress(progress)
-
-with col3:
-    if st.button("🔄 Reset Session"):
-        st.session_state.study_session = {
-            'cards': study_set['cards'].copy(),
-            'current_index': 0,
-            'show_definition': False,
-            'shuffled': False,
-            'studied_cards': set(),
-            'difficult_cards': [],
-            'easy_cards': []
-        }
-        st.rerun()
-
-# Current card display
-current_card = cards[current_index]
-
-# Flashcard container with flip animation simulation
-with st.container():
-    if not st.session_state.study_session['show_definition']:
-        # Show term (front of card)
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 3rem;
-            border-radius: 16px;
-            text-align: center;
-            min-height: 200px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5rem;
-            font-weight: bold;
-            margin: 2rem 0;
-            box-shadow: 0 8px 32px rgba(0,0,0,0.1);
-        ">
-            {current_card['term']}
-        </div>
-        """, unsafe_allow_html=True)
+# The card viewer reruns on its own: flipping, rating and navigating only
+# re-execute this fragment, not the app header, sidebar or set lookup
+@st.fragment
+def study_card_viewer(study_set):
+    """Flashcard, rating buttons, navigation and session summary"""
+    cursor = st.session_state.study_session['cursor']
+    current_index = cursor.position
+    total_cards = len(cursor)
+    
+    # Study mode controls
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        if st.button("🔀 Shuffle Cards"):
+            cursor.shuffle()
+            st.session_state.study_session['show_definition'] = False
+            st.rerun(scope="fragment")
+    
+    with col2:
+        st.markdown(f"**Card {current_index + 1} of {total_cards}**")
+        progress = (current_index + 1) / total_cards
+        st.progress(progress)
+    
+    with col3:
+        if st.button("🔄 Reset Session"):
+            st.session_state.study_session = new_study_session(st.session_state.selected_set_id)
+            st.rerun(scope="fragment")
+    
+    # Current card display
+    current_card = cursor.current()
+    if current_card is None:
+        st.info("No cards in this study set.")
+        return
+    
+    # Flashcard container with flip animation simulation
+    with st.container():
+        if not st.session_state.study_session['show_definition']:
+            # Show term (front of card)
+            st.markdown(f"""
+            <div style="
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                padding: 3rem;
+                border-radius: 16px;
+                text-align: center;
+                min-height: 200px;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                font-size: 1.5rem;
+                font-weight: bold;
+                margin: 2rem 0;
+                box-shadow: 0 8px 32px rgba(0,0,0,0.1);
+            ">
+                {current_card['term']}
+            </div>
+            """, unsafe_allow_html=True)
         
-        st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
-        if st.button("🔄 Show Definition", use_container_width=True, key="show_def"):
-            st.session_state.study_session['show_definition'] = True
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
+            st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
+            if st.button("🔄 Show Definition", use_container_width=True, key="show_def"):
+                st.session_state.study_session['show_definition'] = True
+                st.rerun(scope="fragment")
+            st.markdown("</div>", unsafe_allow_html=True)
         
-    else:
-        # Show definition (back of card)
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-            color: white;
-            padding: 3rem;
-            border-radius: 16px;
-            text-align: center;
-            min-height: 200px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.2rem;
-            margin: 2rem 0;
-            box-shadow: 0 8px 32px rgba(0,0,0,0.1);
-        ">
-            {current_card['definition']}
-        </div>
-        """, unsafe_allow_html=True)
+        else:
+            # Show definition (back of card)
+            st.markdown(f"""
+            <div style="
+                background: linear-gradient(135deg, #10b981 0%, #059669 100%);
+                color: white;
+                padding: 3rem;
+                border-radius: 16px;
+                text-align: center;
+                min-height: 200px;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                font-size: 1.2rem;
+                margin: 2rem 0;
+                box-shadow: 0 8px 32px rgba(0,0,0,0.1);
+            ">
+                {current_card['definition']}
+            </div>
+            """, unsafe_allow_html=True)
         
-        st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
-        if st.button("🔄 Show Term", use_container_width=True, key="show_term"):
+            st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
+            if st.button("🔄 Show Term", use_container_width=True, key="show_term"):
+                st.session_state.study_session['show_definition'] = False
+                st.rerun(scope="fragment")
+            st.markdown("</div>", unsafe_allow_html=True)
+    
+    # Helper function to move to next card
+    def next_card():
+        """Helper function to move to next card"""
+        if cursor.position < total_cards - 1:
+            cursor.seek(cursor.position + 1)
             st.session_state.study_session['show_definition'] = False
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
-
-# Helper function to move to next card
-def next_card():
-    """Helper function to move to next card"""
-    if st.session_state.study_session['current_index'] < len(cards) - 1:
-        st.session_state.study_session['current_index'] += 1
-        st.session_state.study_session['show_definition'] = False
-        st.session_state.study_session['studied_cards'].add(current_index)
-        st.rerun()
-
-# Card difficulty rating (when definition is shown)
-if st.session_state.study_session['show_definition']:
-    st.markdown("---")
-    st.markdown("**How well did you know this card?**")
+            st.session_state.study_session['studied_cards'].add(current_card['key'])
+            st.rerun(scope="fragment")
     
-    col1, col2, col3 = st.columns(3)
+    # Card difficulty rating (when definition is shown)
+    if st.session_state.study_session['show_definition']:
+        st.markdown("---")
+        st.markdown("**How well did you know this card?**")
     
-    with col1:
-        if st.button("😰 Hard", use_container_width=True, type="secondary"):
-            st.session_state.study_session['difficult_cards'].append(current_card)
-            st.session_state.study_progress.update_card_difficulty(
-                st.session_state.selected_set_id, current_index, 'hard'
-            )
-            next_card()
+        col1, col2, col3 = st.columns(3)
     
-    with col2:
-        if st.button("😐 Good", use_container_width=True, type="secondary"):
-            st.session_state.study_progress.update_card_difficulty(
-                st.session_state.selected_set_id, current_index, 'good'
-            )
-            next_card()
+        with col1:
+            if st.button("😰 Hard", use_container_width=True, type="secondary"):
+                st.session_state.study_session['difficult_cards'].append(current_card['key'])
+                st.session_state.study_progress.apply_card_ratings(
+                    st.session_state.selected_set_id, [(current_card['key'], 'hard')]
+                )
+                next_card()
+    
+        with col2:
+            if st.button("😐 Good", use_container_width=True, type="secondary"):
+                st.session_state.study_progress.apply_card_ratings(
+                    st.session_state.selected_set_id, [(current_card['key'], 'good')]
+                )
+                next_card()
+    
+        with col3:
+            if st.button("😊 Easy", use_container_width=True, type="primary"):
+                st.session_state.study_session['easy_cards'].append(current_card['key'])
+                st.session_state.study_progress.apply_card_ratings(
+                    st.session_state.selected_set_id, [(current_card['key'], 'easy')]
+                )
+                next_card()
+    
+    # Navigation buttons
+    st.markdown("---")
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        if st.button("⬅️ Previous", disabled=(current_index == 0)):
+            if current_index > 0:
+                cursor.seek(current_index - 1)
+                st.session_state.study_session['show_definition'] = False
+                st.rerun(scope="fragment")
     
     with col3:
-        if st.button("😊 Easy", use_container_width=True, type="primary"):
-            st.session_state.study_session['easy_cards'].append(current_card)
-            st.session_state.study_progress.update_card_difficulty(
-                st.session_state.selected_set_id, current_index, 'easy'
-            )
-            next_card()
-
-# Navigation buttons
-st.markdown("---")
-col1, col2, col3 = st.columns([1, 2, 1])
-
-with col1:
-    if st.button("⬅️ Previous", disabled=(current_index == 0)):
-        if current_index > 0:
-            st.session_state.study_session['current_index'] -= 1
-            st.session_state.study_session['show_definition'] = False
-            st.rerun()
+        if st.button("➡️ Next", disabled=(current_index == total_cards - 1)):
+            if current_index < total_cards - 1:
+                cursor.seek(current_index + 1)
+                st.session_state.study_session['show_definition'] = False
+                st.rerun(scope="fragment")
+    
+    # Card editing, for the set's owner; edits to a copy stay in the copy
+    if (st.session_state.auth.is_authenticated() and study_set.get('user_id') is not None
+            and study_set.get('user_id') == st.session_state.get('user_id')):
+        with st.expander("✏️ Edit Card"):
+            new_term = st.text_input("Term", value=current_card['term'], key=f"edit_term_{current_card['key']}")
+            new_definition = st.text_area("Definition", value=current_card['definition'],
+                                          key=f"edit_definition_{current_card['key']}")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                changed = (new_term, new_definition) != (current_card['term'], current_card['definition'])
+                if st.button("💾 Save Card", use_container_width=True, disabled=not changed):
+                    new_key = st.session_state.data_manager.update_card(
+                        st.session_state.selected_set_id, current_card['key'],
+                        term=new_term, definition=new_definition
+                    )
+                    replace_card_key(current_card['key'], new_key)
+                    st.rerun()
+            
+            with col2:
+                if st.button("🗑️ Delete Card", use_container_width=True):
+                    if st.session_state.data_manager.delete_card(st.session_state.selected_set_id, current_card['key']):
+                        replace_card_key(current_card['key'], None)
+                    st.rerun()
+    
+    # Study session summary
+    if current_index == total_cards - 1 and st.session_state.study_session['show_definition']:
+        st.markdown("---")
+        st.success("🎉 You've completed this study session!")
+    
+        col1, col2 = st.columns(2)
+    
+        with col1:
+            st.metric("Cards Studied", len(st.session_state.study_session['studied_cards']))
+            st.metric("Easy Cards", len(st.session_state.study_session['easy_cards']))
+    
+        with col2:
+            st.metric("Difficult Cards", len(st.session_state.study_session['difficult_cards']))
+        
+            if st.button("📝 Study Difficult Cards Only"):
+                if st.session_state.study_session['difficult_cards']:
+                    cursor.restrict(st.session_state.study_session['difficult_cards'])
+                    st.session_state.study_session['show_definition'] = False
+                    st.rerun(scope="fragment")
 
-with col3:
-    if st.button("➡️ Next", disabled=(current_index == len(cards) - 1)):
-        if current_index < len(cards) - 1:
-            st.session_state.study_session['current_index'] += 1
-            st.session_state.study_session['show_definition'] = False
-            st.rerun()
 
-# Study session summary
-if current_index == len(cards) - 1 and st.session_state.study_session['show_definition']:
-    st.markdown("---")
-    st.success("🎉 You've completed this study session!")
+# In-browser flashcards: flipping, navigation and shuffling never reach the
+# server, and ratings come back in batches that are saved with one write
+@st.fragment
+def browser_flashcards(study_set):
+    """Flashcard component over the current window of the study session's deck"""
+    set_id = st.session_state.selected_set_id
+    cursor = st.session_state.study_session['cursor']
+    window_start = cursor.window_start
+    window = cursor.window()
+    component_key = f"flashcards_{set_id}"
+    deck_key = f"{set_id}:{cursor.generation}:{window_start}"
+    
+    # Ratings are checked against the window they were made in, which may be one
+    # the learner has just moved away from
+    sent_decks = st.session_state.study_session['sent_decks']
+    sent_decks.pop(deck_key, None)
+    sent_decks[deck_key] = frozenset(card['key'] for card in window)
+    while len(sent_decks) > SENT_DECKS:
+        del sent_decks[next(iter(sent_decks))]
+    
+    # Apply the latest batch before rendering, so this run already acknowledges it
+    batch = st.session_state.get(component_key)
+    acknowledged = st.session_state.get('acknowledged_ratings')
+    if batch:
+        if not acknowledged or acknowledged['session'] != batch['session']:
+            acknowledged = {'session': batch['session'], 'seq': 0}
+        new_ratings = [rating for rating in batch['ratings'] if rating['seq'] > acknowledged['seq']]
+        if new_ratings:
+            # Only accept ratings for cards that were actually sent to the browser
+            ratings = [(rating['key'], rating['difficulty']) for rating in new_ratings
+                       if rating['key'] in sent_decks.get(rating['deck'], ())]
+            if not ratings or st.session_state.study_progress.apply_card_ratings(set_id, ratings):
+                acknowledged = {'session': batch['session'], 'seq': max(r['seq'] for r in new_ratings)}
+                st.session_state.acknowledged_ratings = acknowledged
+                if batch['done']:
+                    st.success("🎉 You've completed this study session!")
+    
+    flashcard_deck(
+        [{'key': card['key'], 'term': card['term'], 'definition': card['definition']}
+         for card in window],
+        deck_key=deck_key,
+        acknowledged=acknowledged,
+        key=component_key
+    )
     
     col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Cards Studied", len(st.session_state.study_session['studied_cards']))
-        st.metric("Easy Cards", len(st.session_state.study_session['easy_cards']))
+        if window_start > 0:
+            if st.button("⬅️ Previous Cards", use_container_width=True):
+                cursor.seek(window_start - cursor.window_size)
+                st.rerun(scope="fragment")
     
     with col2:
-        st.metric("Difficult Cards", len(st.session_state.study_session['difficult_cards']))
-        
-        if st.button("📝 Study Difficult Cards Only"):
-            if st.session_state.study_session['difficult_cards']:
-                st.session_state.study_session['cards'] = st.session_state.study_session['difficult_cards']
-                st.session_state.study_session['current_index'] = 0
-                st.session_state.study_session['show_definition'] = False
-                st.rerun()
+        if window_start + cursor.window_size < len(cursor):
+            if st.button("➡️ Next Cards", use_container_width=True):
+                cursor.seek(window_start + cursor.window_size)
+                st.rerun(scope="fragment")
 
-# Sidebar with study progress
-with st.sidebar:
+in_browser = st.toggle(
+    "⚡ In-browser flashcards",
+    value=True,
+    help="Flip and navigate cards without waiting for the server. Ratings are saved in batches."
+)
+
+if in_browser:
+    browser_flashcards(study_set)
+else:
+    study_card_viewer(study_set)
+
+# Sidebar with study progress, refreshed on its own schedule rather than on every flip
+@st.fragment(run_every="30s")
+def study_progress_sidebar(set_id, total_cards):
+    """Mastery metrics for the set being studied"""
     st.markdown("### 📊 Study Progress")
     
-    progress_data = st.session_state.study_progress.get_set_progress(st.session_state.selected_set_id)
+    progress_data = st.session_state.study_progress.get_set_progress(set_id)
     
-    st.metric("Cards Mastered", f"{progress_data['mastered']}/{len(study_set['cards'])}")
-    st.metric("Cards Learning", f"{progress_data['learning']}/{len(study_set['cards'])}")
+    st.metric("Cards Mastered", f"{progress_data['mastered']}/{total_cards}")
+    st.metric("Cards Learning", f"{progress_data['learning']}/{total_cards}")
     
-    if len(study_set['cards']) > 0:
-        mastery_percentage = (progress_data['mastered'] / len(study_set['cards'])) * 100
+    if total_cards > 0:
+        mastery_percentage = (progress_data['mastered'] / total_cards) * 100
         st.progress(mastery_percentage / 100)
         st.caption(f"{mastery_percentage:.0f}% Mastered")
+
+with st.sidebar:
+    study_progress_sidebar(st.session_state.selected_set_id, study_set['card_count'])
@@ -0,0 +1,92 @@
+"""Process-wide caches: size bounds, recency, tags and expiry"""
+from utils import cache
+from utils.cache import LRUCache, TTLCache
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRUCache(maxsize=3)
+    for key in "abc":
+        lru.set(key, key.upper())
+    assert lru.get("a") == "A"
+    
+    lru.set("d", "D")
+    assert lru.get("b") is None
+    assert [lru.get(key) for key in "acd"] == ["A", "C", "D"]
+    assert lru.stats()['evictions'] == 1
+
+def test_lru_is_bounded_by_the_size_of_its_values():
+    lru = LRUCache(maxsize=10, sizeof=len)
+    lru.set("a", "x" * 4)
+    lru.set("b", "x" * 4)
+    lru.set("c", "x" * 4)
+    assert lru.get("a") is None and lru.stats()['size'] == 8
+    
+    # A value larger than the whole cache is not cached, and evicts nothing
+    lru.set("huge", "x" * 11)
+    assert lru.get("huge") is None and lru.stats()['entries'] == 2
+    
+    # Replacing a value accounts for its new size
+    lru.set("b", "x")
+    assert lru.stats()['size'] == 5
+    
+    # Empty values still take room
+    lru.set("empty", "")
+    assert lru.stats()['size'] == 6
+
+def test_lru_tags_drop_every_entry_derived_from_an_object():
+    lru = LRUCache(maxsize=4)
+    lru.set(("set-1", 1), "deck", tag="set-1")
+    lru.set(("set-1", 2), "bank", tag="set-1")
+    lru.set(("set-2", 1), "deck", tag="set-2")
+    
+    lru.invalidate_tag("set-1")
+    assert lru.get(("set-1", 1)) is None and lru.get(("set-1", 2)) is None
+    assert lru.get(("set-2", 1)) == "deck"
+    assert lru.stats()['size'] == 1
+    lru.invalidate_tag("unknown")
+
+def test_lru_tags_forget_evicted_entries():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1, tag="set")
+    lru.set("b", 2, tag="set")
+    lru.set("c", 3, tag="other")
+    assert lru._tags == {"set": {"b"}, "other": {"c"}}
+    
+    lru.invalidate_tag("set")
+    assert lru._tags == {"other": {"c"}} and lru.stats()['entries'] == 1
+
+def test_lru_counts_hits_and_misses():
+    lru = LRUCache()
+    lru.set("a", 1)
+    lru.get("a")
+    lru.get("b")
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+    
+    lru.clear()
+    assert lru.stats()['entries'] == 0 and lru.stats()['hits'] == 1
+
+def test_ttl_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    ttl = TTLCache(ttl=10, maxsize=2)
+    ttl.set("a", 1, tag="set")
+    
+    now[0] += 5
+    assert ttl.get("a") == 1
+    now[0] += 6
+    assert ttl.get("a") is None and ttl._tags == {}
+
+def test_ttl_makes_room_from_expired_entries_first(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    ttl = TTLCache(ttl=10, maxsize=2)
+    ttl.set("old", 1)
+    now[0] += 8
+    ttl.set("fresh", 2)
+    now[0] += 3
+    
+    ttl.set("new", 3)
+    assert ttl.get("old") is None and ttl.get("fresh") == 2 and ttl.get("new") == 3
+    
+    ttl.set("newer", 4)
+    assert ttl.get("fresh") is None and ttl.get("newer") == 4
@@ -0,0 +1,153 @@
+"""Upstream sync of copied study sets, against a scratch Postgres database
+
+Set DATABASE_URL to an empty database to run these; init_db.sql is applied
+to it first. They are skipped otherwise.
+"""
+import os
+import uuid
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+if not os.environ.get('DATABASE_URL'):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from utils.db import Database
+
+SCHEMA = os.path.join(os.path.dirname(__file__), os.pardir, "init_db.sql")
+
+@pytest.fixture(scope="module")
+def db():
+    database = Database()
+    with open(SCHEMA, encoding='utf-8') as f:
+        database.execute_query(f.read())
+    return database
+
+def create_user(db) -> int:
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    return db.create_user(name, f"{name}@example.com", "not-a-hash")
+
+def test_sync_follows_edits_made_while_another_copy_syncs(db):
+    owner, copier, other_copier = create_user(db), create_user(db), create_user(db)
+    source_id = str(uuid.uuid4())
+    db.create_study_set(source_id, owner, "Source", "", "Science", is_public=True)
+    card_a = db.add_card_to_set(source_id, "term", "first", 0)
+    
+    copy_x = db.copy_study_set(source_id, copier)
+    copy_y = db.copy_study_set(source_id, other_copier)
+    db.update_study_progress(copier, card_a, copy_x, 'easy', 0)
+    
+    # Two edits after both copies synced: A -> B -> C
+    db.update_card(card_a, definition="second")
+    card_b = db.get_card_ids(source_id)[0]
+    db.update_card(card_b, definition="third")
+    card_c = db.get_card_ids(source_id)[0]
+    assert len({card_a, card_b, card_c}) == 3
+    
+    # Another copy's sync collects old versions; B must survive for copy X
+    db.sync_copied_set(copy_y, other_copier)
+    
+    delta = db.sync_copied_set(copy_x, copier)
+    assert delta == {'added': 0, 'changed': 1, 'removed': 0, 'kept_local': 0}
+    progress = db.get_card_progress(copier, copy_x, card_c)
+    assert progress is not None and progress.times_studied == 1
+
+def test_deleting_a_copy_keeps_versions_other_copies_reach(db):
+    owner, copier, other_copier = create_user(db), create_user(db), create_user(db)
+    source_id = str(uuid.uuid4())
+    db.create_study_set(source_id, owner, "Source", "", "Science", is_public=True)
+    card_a = db.add_card_to_set(source_id, "term", "first", 0)
+    
+    copy_x = db.copy_study_set(source_id, copier)
+    copy_y = db.copy_study_set(source_id, other_copier)
+    db.update_study_progress(copier, card_a, copy_x, 'good', 0)
+    
+    db.update_card(card_a, definition="second")
+    db.update_card(db.get_card_ids(source_id)[0], definition="third")
+    card_c = db.get_card_ids(source_id)[0]
+    
+    db.delete_study_set(copy_y, other_copier)
+    
+    delta = db.sync_copied_set(copy_x, copier)
+    assert delta['removed'] == 0 and delta['changed'] == 1
+    assert db.get_card_progress(copier, copy_x, card_c) is not None
+
+def create_shared_set(db):
+    owner, copier = create_user(db), create_user(db)
+    source_id = str(uuid.uuid4())
+    db.create_study_set(source_id, owner, "Source", "", "Science", is_public=True)
+    card_id = db.add_card_to_set(source_id, "term", "first", 0)
+    copy_id = db.copy_study_set(source_id, copier)
+    return owner, copier, source_id, copy_id, card_id
+
+def test_editing_a_copied_card_keeps_it_in_the_copy(db):
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    db.update_study_progress(copier, card_id, copy_id, 'good', 0)
+    
+    own_id = db.update_set_card(copy_id, card_id, definition="mine")
+    assert own_id not in (None, card_id)
+    assert db.get_card_ids(copy_id) == [own_id]
+    assert db.get_cards_by_ids(copy_id, [own_id])[0]['definition'] == "mine"
+    assert db.get_cards_by_ids(source_id, [card_id])[0]['definition'] == "first"
+    assert db.get_card_progress(copier, copy_id, own_id).times_studied == 1
+    assert db.get_current_card_ids(copy_id, [card_id]) == {card_id: own_id}
+    
+    # The copy's own card is edited in place from then on
+    assert db.update_set_card(copy_id, own_id, term="again") == own_id
+    assert db.sync_copied_set(copy_id, copier)['kept_local'] == 0
+
+def test_deleting_a_copied_card_hides_it_from_the_copy_only(db):
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    db.update_study_progress(copier, card_id, copy_id, 'hard', 0)
+    
+    assert db.delete_set_card(copy_id, card_id)
+    assert db.get_card_ids(copy_id) == []
+    assert db.get_card_count(copy_id) == 0
+    assert db.get_card_ids(source_id) == [card_id]
+    assert db.get_card_progress(copier, copy_id, card_id) is None
+    assert db.get_current_card_ids(copy_id, [card_id]) == {card_id: None}
+    assert not db.delete_set_card(copy_id, card_id)
+
+def test_deleting_an_edited_copied_card_leaves_a_tombstone(db):
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    own_id = db.update_set_card(copy_id, card_id, definition="mine")
+    
+    assert db.delete_set_card(copy_id, own_id)
+    assert db.get_card_ids(copy_id) == []
+    # Editing the source does not bring the card back either
+    db.update_card(card_id, definition="second")
+    assert db.get_card_ids(copy_id) == []
+
+def test_editing_a_source_card_is_followed_to_its_new_version(db):
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    
+    new_id = db.update_set_card(source_id, card_id, definition="second")
+    assert new_id != card_id
+    assert db.get_current_card_ids(source_id, [card_id]) == {card_id: new_id}
+    # The copy keeps the version it synced until it syncs again
+    assert db.get_current_card_ids(copy_id, [card_id]) == {card_id: card_id}
+
+def test_only_the_owner_edits_cards_through_the_data_manager(db):
+    from utils.db_data_manager import DBDataManager
+    
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    assert DBDataManager(owner, db=db).update_card(copy_id, card_id, definition="not mine") is None
+    assert not DBDataManager(owner, db=db).delete_card(copy_id, card_id)
+    
+    own_id = DBDataManager(copier, db=db).update_card(copy_id, card_id, definition="mine")
+    assert db.get_card_ids(copy_id) == [own_id]
+    assert DBDataManager(copier, db=db).delete_card(copy_id, own_id)
+    assert db.get_card_ids(copy_id) == []
+
+def test_listing_flags_copies_whose_source_changed(db):
+    owner, copier, source_id, copy_id, card_id = create_shared_set(db)
+    
+    def flagged():
+        return {s.id: s.has_upstream_changes for s in db.get_study_sets_by_user(copier)}[copy_id]
+    
+    assert not flagged()
+    db.update_card(card_id, definition="second")
+    assert flagged()
+    db.sync_copied_set(copy_id, copier)
+    assert not flagged()
@@ -0,0 +1,144 @@
+"""Guest study sets kept as one JSON file per set plus an index"""
+import json
+import logging
+import os
+
+import pytest
+
+from utils import data_manager
+from utils.data_manager import DataManager
+from utils.study_progress import StudyProgress
+
+def make_set(title="Biology", cards=2):
+    return {
+        'title': title,
+        'description': "Cells and organs",
+        'subject': "Science",
+        'cards': [{'term': f"term {i}", 'definition': f"definition {i}"} for i in range(cards)],
+        'card_count': cards
+    }
+
+@pytest.fixture
+def exit_hooks(monkeypatch):
+    """Collect what DataManager registers to run at exit, and keep its timer from firing"""
+    hooks = []
+    monkeypatch.setattr(data_manager.atexit, 'register', hooks.append)
+    monkeypatch.setattr(data_manager, 'FLUSH_DELAY', 60)
+    return hooks
+
+@pytest.fixture
+def make_manager(tmp_path, exit_hooks):
+    def make():
+        return DataManager(str(tmp_path / "study_sets"), str(tmp_path / "study_sets.json"))
+    return make
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def test_changes_are_written_at_exit(make_manager, exit_hooks, tmp_path):
+    manager = make_manager()
+    assert exit_hooks == [manager.flush]
+    
+    manager.save_study_set("a", make_set())
+    assert not os.path.exists(manager.index_file)
+    
+    for hook in exit_hooks:
+        hook()
+    assert read_json(manager.index_file)["a"]["card_count"] == 2
+    assert read_json(tmp_path / "study_sets" / "a.json") == make_set()
+    assert make_manager().get_study_set("a") == make_set()
+
+def test_deleting_keeps_index_and_set_files_consistent(make_manager, tmp_path):
+    manager = make_manager()
+    manager.save_study_set("a", make_set("A"))
+    manager.save_study_set("b", make_set("B"))
+    manager.flush()
+    
+    assert manager.delete_study_set("a")
+    assert not manager.delete_study_set("a")
+    assert manager.get_study_set("a") is None
+    assert list(manager.list_study_sets()) == ["b"]
+    manager.flush()
+    
+    assert list(read_json(manager.index_file)) == ["b"]
+    assert sorted(os.listdir(tmp_path / "study_sets")) == ["b.json", "index.json"]
+    reloaded = make_manager()
+    assert reloaded.get_study_set("a") is None
+    assert reloaded.get_study_set("b")["title"] == "B"
+
+def test_a_set_deleted_and_saved_again_before_a_flush_is_kept(make_manager, tmp_path):
+    manager = make_manager()
+    manager.save_study_set("a", make_set("A"))
+    manager.flush()
+    
+    manager.delete_study_set("a")
+    manager.save_study_set("a", make_set("A again"))
+    manager.flush()
+    assert make_manager().get_study_set("a")["title"] == "A again"
+
+def test_a_missing_set_file_drops_the_set(make_manager, tmp_path, caplog):
+    manager = make_manager()
+    manager.save_study_set("a", make_set("A"))
+    manager.save_study_set("b", make_set("B"))
+    manager.flush()
+    os.remove(tmp_path / "study_sets" / "a.json")
+    
+    reloaded = make_manager()
+    assert sorted(reloaded.list_study_sets()) == ["a", "b"]
+    with caplog.at_level(logging.WARNING, logger=data_manager.__name__):
+        assert reloaded.get_study_set("a") is None
+    assert "a" in caplog.text
+    assert list(reloaded.list_study_sets()) == ["b"]
+    assert reloaded.get_study_stats()['total_sets'] == 1
+    
+    reloaded.flush()
+    assert list(read_json(reloaded.index_file)) == ["b"]
+
+def test_single_file_storage_is_split_on_first_use(make_manager, tmp_path):
+    with open(tmp_path / "study_sets.json", 'w', encoding='utf-8') as f:
+        json.dump({"a": make_set("A"), "b": make_set("B", cards=3)}, f)
+    
+    manager = make_manager()
+    listing = manager.get_all_sets()
+    assert sorted(listing) == ["a", "b"]
+    assert "cards" not in listing["b"] and listing["b"]["card_count"] == 3
+    assert read_json(tmp_path / "study_sets" / "b.json") == make_set("B", cards=3)
+    assert make_manager().get_study_set("a") == make_set("A")
+
+def test_loaded_sets_are_bounded_by_card_count(tmp_path, exit_hooks, monkeypatch):
+    monkeypatch.setattr(data_manager, 'LOADED_CARDS', 5)
+    manager = DataManager(str(tmp_path / "study_sets"), str(tmp_path / "study_sets.json"))
+    for set_id in "abc":
+        manager.save_study_set(set_id, make_set(set_id, cards=2))
+    manager.flush()
+    
+    assert all(manager.get_study_set(set_id)["title"] == set_id for set_id in "abc")
+    assert manager._sets.stats()['size'] <= 5
+
+def test_dashboard_summary_reads_only_the_index(make_manager, tmp_path, monkeypatch):
+    pytest.importorskip("streamlit")
+    from utils import session_utils
+    
+    manager = make_manager()
+    for set_id, cards in (("a", 2), ("b", 3)):
+        manager.save_study_set(set_id, make_set(set_id.upper(), cards=cards))
+    manager.flush()
+    
+    class State(dict):
+        __getattr__ = dict.__getitem__
+    
+    class Guest:
+        def is_authenticated(self):
+            return False
+    
+    reloaded = make_manager()
+    monkeypatch.setattr(reloaded, '_load_set', lambda set_id: pytest.fail("a set file was read"))
+    state = State(auth=Guest(), data_manager=reloaded,
+                  study_progress=StudyProgress(str(tmp_path / "study_progress.json")))
+    monkeypatch.setattr(session_utils.st, 'session_state', state)
+    
+    summary = session_utils.get_dashboard_summary()
+    assert summary['total_sets'] == 2 and summary['total_cards'] == 5
+    assert [recent['title'] for recent in summary['recent_sets']] == ["A", "B"]
+    assert summary['mastered'] == summary['learning'] == 0
@@ -0,0 +1,36 @@
+"""Moving through a deck window by window, and following edits to it"""
+from utils.deck_cursor import DeckCursor, ListDeckSource
+
+def make_cursor(count=10, window_size=4):
+    cards = [{'term': f"term {i}", 'definition': f"definition {i}"} for i in range(count)]
+    return DeckCursor(ListDeckSource(cards), window_size=window_size), cards
+
+def test_windows_cover_the_deck_in_order():
+    cursor, _ = make_cursor()
+    seen = []
+    for start in range(0, len(cursor), cursor.window_size):
+        cursor.seek(start)
+        seen.extend(card['term'] for card in cursor.window())
+    assert seen == [f"term {i}" for i in range(10)]
+
+def test_replace_follows_an_edited_card_in_a_shuffled_deck():
+    cursor, _ = make_cursor()
+    cursor.restrict([5, 2, 7])
+    cursor.seek(1)
+    generation = cursor.generation
+    
+    cursor.replace(2, 9)
+    assert cursor.current()['term'] == "term 9"
+    assert cursor.generation == generation + 1
+    
+    cursor.replace(9, None)
+    assert len(cursor) == 2
+    assert cursor.current()['term'] == "term 7"
+
+def test_replace_drops_a_removed_card_in_set_order():
+    cursor, cards = make_cursor()
+    cursor.seek(9)
+    del cards[9]
+    cursor.replace(9, None)
+    assert len(cursor) == 9 and cursor.position == 8
+    assert cursor.current()['term'] == "term 8"
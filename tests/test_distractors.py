@@ -0,0 +1,52 @@
+"""Similar-definition distractors, built once per deck version however many sessions ask"""
+import threading
+import uuid
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils import distractors
+from utils.deck_cursor import ListDeckSource
+from utils.distractors import get_distractor_engine
+
+def make_source():
+    definitions = ["a large cat", "a big cat", "a small dog", "a tiny dog", "a fast car", "a quick car"]
+    return ListDeckSource([{'term': str(i), 'definition': definition}
+                           for i, definition in enumerate(definitions * 5)])
+
+def test_nearest_definitions_come_first():
+    engine = get_distractor_engine(make_source(), str(uuid.uuid4()))
+    assert engine.candidates(0)[0] == 1
+
+def test_concurrent_sessions_build_one_index(monkeypatch):
+    built = []
+    index_class = distractors.SimilarityIndex
+    
+    def counting_index(cards):
+        built.append(len(cards))
+        return index_class(cards)
+    
+    monkeypatch.setattr(distractors, 'SimilarityIndex', counting_index)
+    set_id, source = str(uuid.uuid4()), make_source()
+    barrier = threading.Barrier(6)
+    engines = []
+    
+    def start_test():
+        barrier.wait()
+        engines.append(get_distractor_engine(source, set_id, "v1"))
+    
+    threads = [threading.Thread(target=start_test) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    
+    assert not any(thread.is_alive() for thread in threads), "deadlocked"
+    assert built == [30]
+    assert len({id(engine.index) for engine in engines}) == 1
+    assert distractors._building == {}
+    
+    # A new version of the deck is indexed again
+    assert get_distractor_engine(source, set_id, "v2").index is not engines[0].index
+    assert built == [30, 30]
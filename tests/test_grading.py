@@ -0,0 +1,62 @@
+"""Grading of written practice test answers"""
+from utils.grading import PASS_THRESHOLD, WrittenAnswerGrader, _stem, _within_distance
+
+def test_stemming_matches_word_forms():
+    assert _stem("studies") == "study"
+    assert _stem("planets") == _stem("planet")
+    assert _stem("walked") == _stem("walking") == "walk"
+    # Too short to strip without losing the word
+    assert _stem("bus") == "bus"
+    
+    assert WrittenAnswerGrader().grade("Plants making sugars", "plant makes sugar") == (1.0, True)
+
+def test_stopwords_are_ignored_unless_nothing_else_is_left():
+    grader = WrittenAnswerGrader()
+    assert grader.tokens("The cell of the body") == {"cell", "body"}
+    assert grader.tokens("to be or not to be") == {"to", "be", "or", "not"}
+    assert grader.grade("the powerhouse of the cell", "powerhouse cell") == (1.0, True)
+
+def test_typos_allowed_grow_with_word_length():
+    grader = WrittenAnswerGrader()
+    # No typos in words of up to three letters
+    assert grader.grade("cat", "cot") == (0.0, False)
+    # One in words of up to six
+    assert grader.grade("planet", "planit")[1]
+    assert not grader.grade("planet", "plinit")[1]
+    # Two in longer words
+    assert grader.grade("photosynthesis", "fotosynthesis")[1]
+    assert not grader.grade("photosynthesis", "fotosynthesys")[1]
+    
+    assert _within_distance("kitten", "sitting", 3)
+    assert not _within_distance("kitten", "sitting", 2)
+
+def test_partial_answers_pass_at_the_threshold():
+    grader = WrittenAnswerGrader()
+    similarity, is_correct = grader.grade("red green blue yellow purple", "red green blue")
+    assert similarity == 0.6 and is_correct == (0.6 >= PASS_THRESHOLD)
+    assert grader.grade("red green blue yellow purple", "red green") == (0.4, False)
+
+def test_empty_answers_and_definitions_fail():
+    grader = WrittenAnswerGrader()
+    assert grader.grade("mitochondria", "") == (0.0, False)
+    assert grader.grade("mitochondria", None) == (0.0, False)
+    assert grader.grade("", "anything") == (0.0, False)
+    assert grader.grade("...", "anything") == (0.0, False)
+
+def test_batch_grades_like_single_answers_in_order():
+    pairs = [
+        ("the largest planet", "largest planit"),
+        ("a unit of heat", "heat unit"),
+        ("the largest planet", "smallest moon"),
+        ("a unit of heat", ""),
+    ]
+    batch = WrittenAnswerGrader().grade_batch(iter(pairs))
+    single = WrittenAnswerGrader()
+    assert batch == [single.grade(definition, answer) for definition, answer in pairs]
+    assert [is_correct for _, is_correct in batch] == [True, True, False, False]
+
+def test_batch_caches_each_definitions_tokens():
+    grader = WrittenAnswerGrader()
+    grader.grade_batch([("Rivers flowing", "river"), ("Rivers flowing", "flow")])
+    assert grader._expected.get("Rivers flowing") == {"river", "flow"}
+    assert grader.expected_tokens("Rivers flowing") is grader._expected.get("Rivers flowing")
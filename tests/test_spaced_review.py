@@ -0,0 +1,33 @@
+"""Which cards Spaced Review treats as due, from the progress each backend returns"""
+from datetime import datetime, timedelta
+
+from utils.models import Progress
+from utils.spaced_repetition import SpacedRepetition
+
+def progress_row(next_review_date):
+    return (1, 2, 3, None, '["good"]', next_review_date)
+
+def test_database_progress_carries_next_review_date():
+    scheduled = datetime.now() + timedelta(days=3)
+    progress = Progress.from_row(progress_row(scheduled))
+    assert progress.get('next_review_date') == scheduled
+    assert progress.difficulty_history == ["good"]
+
+def test_card_scheduled_for_later_is_not_due():
+    # Before progress rows carried next_review_date, every studied card was due
+    progress = Progress.from_row(progress_row(datetime.now() + timedelta(days=3)))
+    assert not SpacedRepetition.is_card_due(progress)
+
+def test_card_past_its_review_date_is_due():
+    progress = Progress.from_row(progress_row(datetime.now() - timedelta(minutes=1)))
+    assert SpacedRepetition.is_card_due(progress)
+
+def test_card_without_a_schedule_is_due():
+    assert SpacedRepetition.is_card_due(Progress())
+    assert SpacedRepetition.is_card_due(Progress.from_row(progress_row(None)))
+    assert SpacedRepetition.is_card_due({'times_studied': 4})
+
+def test_json_progress_dates_are_parsed():
+    later = (datetime.now() + timedelta(days=1)).isoformat()
+    assert not SpacedRepetition.is_card_due({'next_review_date': later})
+    assert SpacedRepetition.is_card_due({'next_review_date': 'not a date'})
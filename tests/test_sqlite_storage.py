@@ -0,0 +1,171 @@
+"""Guest storage in SQLite: connection setup, the shared pool, and parity with JSON storage"""
+import threading
+import time
+
+import pytest
+
+from utils.data_manager import DataManager
+from utils.sqlite_data_manager import SQLiteDataManager
+from utils.sqlite_db import SQLiteDatabase
+from utils.sqlite_study_progress import SQLiteStudyProgress
+from utils.study_progress import StudyProgress
+
+def make_set(set_id, title="Biology", subject="Science", cards=2):
+    # Shaped as Create Study Set saves it
+    return {
+        'id': set_id,
+        'title': title,
+        'description': "Cells and organs",
+        'subject': subject,
+        'privacy': "Private",
+        'cards': [{'term': f"term {i}", 'definition': f"definition {i}"} for i in range(cards)],
+        'created_date': "2026-01-01 00:00:00",
+        'card_count': cards
+    }
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteDatabase(str(tmp_path / "guest.db"), pool_size=2)
+
+@pytest.fixture
+def managers(tmp_path, db):
+    return DataManager(str(tmp_path / "study_sets"), str(tmp_path / "study_sets.json")), SQLiteDataManager(db)
+
+@pytest.fixture
+def trackers(tmp_path, db):
+    return StudyProgress(str(tmp_path / "study_progress.json")), SQLiteStudyProgress(db)
+
+def test_connections_use_wal_and_foreign_keys(db):
+    with db.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'study_sets', 'cards', 'study_progress', 'test_attempts'} <= tables
+
+def test_deleting_a_set_deletes_its_cards(db):
+    manager = SQLiteDataManager(db)
+    manager.save_study_set("a", make_set("a"))
+    assert manager.delete_study_set("a")
+    assert db.execute_query("SELECT COUNT(*) FROM cards", fetch='one')[0] == 0
+
+def test_a_failed_transaction_is_rolled_back(db):
+    manager = SQLiteDataManager(db)
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            manager._write_set(conn, "a", make_set("a"))
+            raise RuntimeError("interrupted")
+    assert manager.get_study_set("a") is None
+
+def test_connections_are_reused_and_bounded(db, monkeypatch):
+    opened = []
+    connect = db._connect
+    monkeypatch.setattr(db, '_connect', lambda: opened.append(1) or connect())
+    
+    for _ in range(20):
+        db.execute_query("SELECT 1", fetch='one')
+    assert len(opened) == 1
+    
+    in_use, peak, lock = [0], [0], threading.Lock()
+    barrier = threading.Barrier(8)
+    
+    def query():
+        barrier.wait()
+        with db.connection():
+            with lock:
+                in_use[0] += 1
+                peak[0] = max(peak[0], in_use[0])
+            time.sleep(0.01)
+            with lock:
+                in_use[0] -= 1
+    
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 2 and len(opened) <= 2
+
+def test_concurrent_writers_through_the_pool(db):
+    progress = SQLiteStudyProgress(db)
+    manager = SQLiteDataManager(db)
+    manager.save_study_set("shared", make_set("shared", cards=5))
+    errors = []
+    
+    def study(worker):
+        try:
+            manager.save_study_set(f"own {worker}", make_set(f"own {worker}"))
+            for i in range(25):
+                assert progress.apply_ratings("shared", [(i % 5, 'good'), ((i + 1) % 5, 'easy')])
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=study, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert len(manager.list_study_sets()) == 9
+    assert progress.get_study_statistics()['total_study_sessions'] == 8 * 25 * 2
+    assert sum(progress.get_card_progress("shared", i)['times_studied'] for i in range(5)) == 400
+
+def public_methods(cls):
+    return {name for name in dir(cls) if not name.startswith('_') and callable(getattr(cls, name))}
+
+def test_same_public_methods_as_json_storage():
+    assert public_methods(SQLiteDataManager) == public_methods(DataManager) - {'flush'}
+    assert public_methods(SQLiteStudyProgress) == public_methods(StudyProgress)
+
+def test_data_managers_answer_alike(managers):
+    for manager in managers:
+        manager.save_study_set("a", make_set("a"))
+        manager.save_study_set("b", make_set("b", title="Algebra", subject="Math", cards=3))
+        manager.save_study_set("c", make_set("c", title="Old", cards=1))
+        assert manager.update_study_set("b", {'title': "Linear Algebra"})
+        assert manager.update_study_set("a", {'cards': [{'term': "cell", 'definition': "unit of life"}],
+                                              'card_count': 1})
+        assert manager.delete_study_set("c")
+        assert not manager.delete_study_set("missing")
+        assert not manager.update_study_set("missing", {'title': "x"})
+    
+    json_manager, sqlite_manager = managers
+    for method, args in [
+        ('get_study_set', ("a",)), ('get_study_set', ("missing",)), ('get_study_set_info', ("b",)),
+        ('get_all_sets', ()), ('list_study_sets', ()), ('search_study_sets', ("algebra",)),
+        ('search_study_sets', ("organs",)), ('get_sets_by_subject', ("science",)),
+        ('get_study_stats', ()), ('get_item_statistics', ("a",)),
+    ]:
+        assert getattr(sqlite_manager, method)(*args) == getattr(json_manager, method)(*args), method
+    
+    json_cards, sqlite_cards = ([card.to_dict() for card in manager.get_deck_source("b").cards_after(None, 10)]
+                                for manager in managers)
+    assert json_cards == sqlite_cards and len(json_cards) == 3
+
+def without_timestamps(progress):
+    return {**progress, 'last_studied': None,
+            'difficulty_history': [entry['difficulty'] for entry in progress['difficulty_history']]}
+
+def test_progress_trackers_answer_alike(trackers):
+    for tracker in trackers:
+        tracker.apply_ratings("a", [(0, 'easy')] * 4 + [(1, 'good'), (1, 'good'), (1, 'easy'), (2, 'hard')])
+        tracker.update_card_difficulty("b", 0, 'good')
+        assert tracker.record_test_results("a", {'id': "attempt"}, [(3, 'easy')])
+        assert not tracker.record_test_results("a", {'id': "attempt"}, [(3, 'easy')])
+        assert not tracker.apply_ratings("a", [])
+    
+    json_tracker, sqlite_tracker = trackers
+    for card_index in range(5):
+        assert without_timestamps(sqlite_tracker.get_card_progress("a", card_index)) == \
+            without_timestamps(json_tracker.get_card_progress("a", card_index))
+    
+    for method, args in [
+        ('get_set_progress', ("a",)), ('get_set_progress', ("missing",)), ('get_all_set_progress', ()),
+        ('get_study_streak', ("a",)), ('get_total_mastered', ()), ('get_total_learning', ()),
+        ('get_study_statistics', ()),
+    ]:
+        assert getattr(sqlite_tracker, method)(*args) == getattr(json_tracker, method)(*args), method
+    
+    assert {group: sorted(keys) for group, keys in sqlite_tracker.get_cards_by_difficulty("a").items()} == \
+        {group: sorted(keys) for group, keys in json_tracker.get_cards_by_difficulty("a").items()}
@@ -0,0 +1,80 @@
+"""Guest progress kept as a JSON snapshot plus a journal of ratings"""
+import json
+import logging
+
+from utils import study_progress
+from utils.study_progress import StudyProgress
+
+def make_progress(tmp_path):
+    return StudyProgress(str(tmp_path / "progress.json"))
+
+def journal_line(sequence, card_index, difficulty="easy"):
+    return json.dumps([sequence, "set", card_index, difficulty, "2026-01-01T00:00:00"]) + "\n"
+
+def test_ratings_survive_a_reload(tmp_path):
+    progress = make_progress(tmp_path)
+    progress.apply_ratings("set", [(0, 'easy'), (1, 'hard')])
+    progress.update_card_difficulty("set", 0, 'good')
+    
+    reloaded = make_progress(tmp_path)
+    assert reloaded.get_card_progress("set", 0)['times_studied'] == 2
+    assert reloaded.get_card_progress("set", 0)['mastery_level'] == 3
+    assert reloaded.get_card_progress("set", 1)['times_studied'] == 1
+
+def test_torn_last_line_is_dropped_silently(tmp_path, caplog):
+    progress = make_progress(tmp_path)
+    with open(progress.journal_file, 'w') as f:
+        f.write(journal_line(1, 0) + journal_line(2, 1)[:10])
+    
+    with caplog.at_level(logging.WARNING):
+        assert progress.get_card_progress("set", 0)['times_studied'] == 1
+    assert not caplog.records
+    
+    # The next rating starts on a line of its own
+    progress.update_card_difficulty("set", 1, 'good')
+    assert make_progress(tmp_path).get_card_progress("set", 1)['times_studied'] == 1
+
+def test_unreadable_lines_are_skipped_logged_and_compacted(tmp_path, caplog):
+    progress = make_progress(tmp_path)
+    with open(progress.journal_file, 'w') as f:
+        f.write(journal_line(1, 0) + "{not json\n" + '"a string"\n' + journal_line(4, 1))
+    
+    with caplog.at_level(logging.WARNING, logger=study_progress.__name__):
+        assert progress.get_card_progress("set", 1)['times_studied'] == 1
+    assert len(caplog.records) == 2
+    
+    with open(progress.journal_file) as f:
+        assert f.read() == ""
+    with open(progress.progress_file) as f:
+        assert json.load(f)['journal_sequence'] == 4
+    
+    progress.update_card_difficulty("set", 0, 'easy')
+    reloaded = make_progress(tmp_path)
+    assert reloaded.get_card_progress("set", 0)['times_studied'] == 2
+    assert reloaded.get_card_progress("set", 1)['times_studied'] == 1
+
+def test_failed_append_leaves_progress_unchanged(tmp_path):
+    progress = StudyProgress(str(tmp_path / "progress.json"), journal_file=str(tmp_path / "missing" / "journal"))
+    assert not progress.apply_ratings("set", [(0, 'easy')])
+    assert progress.get_card_progress("set", 0)['times_studied'] == 0
+    assert not progress.record_test_results("set", {'id': "attempt"}, [(0, 'easy')])
+    
+    # The attempt can be recorded once saving works again
+    progress.journal_file = str(tmp_path / "journal")
+    assert progress.record_test_results("set", {'id': "attempt"}, [(0, 'easy')])
+    assert not progress.record_test_results("set", {'id': "attempt"}, [(0, 'easy')])
+    reloaded = StudyProgress(str(tmp_path / "progress.json"), journal_file=progress.journal_file)
+    assert reloaded.get_card_progress("set", 0)['times_studied'] == 1
+
+def test_journal_is_compacted_into_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(study_progress, 'COMPACT_AFTER', 3)
+    progress = make_progress(tmp_path)
+    progress.apply_ratings("set", [(0, 'easy'), (1, 'easy'), (2, 'easy')])
+    
+    with open(progress.journal_file) as f:
+        assert f.read() == ""
+    progress.update_card_difficulty("set", 0, 'hard')
+    
+    reloaded = make_progress(tmp_path)
+    assert reloaded.get_card_progress("set", 0)['times_studied'] == 2
+    assert reloaded.get_set_progress("set")['studied'] == 3
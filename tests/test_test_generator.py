@@ -0,0 +1,148 @@
+"""Practice test generation: deck indexes, question banks and their caches"""
+import threading
+import time
+import uuid
+
+from utils import test_generator
+from utils.deck_cursor import ListDeckSource
+from utils.test_generator import DeckIndex, QuestionBank, get_deck_index, get_question_bank
+
+def make_source(definitions):
+    return ListDeckSource([{'term': f"term {i}", 'definition': definition}
+                           for i, definition in enumerate(definitions)])
+
+def make_bank(definitions):
+    source = make_source(definitions)
+    return QuestionBank(source, DeckIndex(source.card_keys()))
+
+def generate(bank, num_questions, test_type="Multiple Choice"):
+    return test_generator.TestGenerator(bank).generate(num_questions, test_type)
+
+def test_sample_on_a_small_deck_returns_what_is_left():
+    index = DeckIndex([10, 11, 12])
+    assert sorted(index.sample(5)) == [10, 11, 12]
+    assert sorted(index.sample(3, exclude=[11])) == [10, 12]
+    assert index.sample(2, exclude=[10, 11, 12]) == []
+    assert index.first(2) == [10, 11]
+
+def test_sample_on_a_large_deck_draws_distinct_keys():
+    index = DeckIndex(range(1000))
+    for _ in range(50):
+        keys = index.sample(20, exclude=range(10))
+        assert len(keys) == len(set(keys)) == 20
+        assert all(key >= 10 for key in keys)
+
+def test_decks_under_four_cards_offer_every_other_card():
+    bank = make_bank(["one", "two", "three"])
+    questions = generate(bank, 3)
+    assert len(questions) == 3
+    for question in questions:
+        assert sorted(question['options']) == [0, 1, 2]
+
+def test_duplicate_definitions_are_never_offered_together():
+    # Case and spacing do not make a definition different
+    bank = make_bank(["same", "Same ", "same", "other", "  SAME"])
+    pools = bank.pools([0, 3])
+    assert list(pools[0]) == [3]
+    assert len(pools[3]) == 1 and pools[3][0] in (0, 1, 2, 4)
+
+def test_a_deck_of_identical_definitions_gives_up_after_max_rounds():
+    bank = make_bank(["same"] * 50)
+    assert list(bank.pools([7])[7]) == []
+    question, = generate(bank, 1)
+    assert list(question['options']) == [question['card']]
+
+def test_written_tests_need_no_pools():
+    bank = make_bank(["one", "two", "three", "four"])
+    questions = generate(bank, 4, "Written Response")
+    assert all(question['type'] == 'written' and 'options' not in question for question in questions)
+    assert bank._pools == {}
+
+def test_pools_are_built_once_and_reused():
+    bank = make_bank([f"definition {i}" for i in range(30)])
+    first = bank.pools([1, 2])
+    assert bank.pools([2, 1]) == first
+    assert bank.pools([1])[1] is first[1]
+    assert len(first[1]) == test_generator.POOL_SIZE and 1 not in first[1]
+
+def test_banks_are_cached_per_set_and_version():
+    set_id = str(uuid.uuid4())
+    source = make_source([f"definition {i}" for i in range(10)])
+    
+    bank = get_question_bank(source, set_id, "v1")
+    assert get_question_bank(source, set_id, "v1") is bank
+    assert get_question_bank(source, str(uuid.uuid4()), "v1") is not bank
+    # Decks without a version (JSON storage) are not cached
+    assert get_question_bank(source, set_id) is not get_question_bank(source, set_id)
+
+def test_a_new_updated_at_gets_a_new_bank_and_index():
+    set_id = str(uuid.uuid4())
+    cards = [{'term': f"term {i}", 'definition': f"definition {i}"} for i in range(10)]
+    source = ListDeckSource(cards)
+    
+    bank = get_question_bank(source, set_id, "v1")
+    assert len(bank.index) == 10
+    
+    cards.append({'term': "term 10", 'definition': "definition 10"})
+    assert get_question_bank(source, set_id, "v1") is bank
+    updated = get_question_bank(source, set_id, "v2")
+    assert updated is not bank and len(updated.index) == 11
+    assert get_deck_index(source, set_id, "v2") is updated.index
+
+def test_invalidating_a_set_drops_its_banks():
+    set_id = str(uuid.uuid4())
+    source = make_source(["one", "two"])
+    bank = get_question_bank(source, set_id, "v1")
+    
+    test_generator._question_banks.invalidate_tag(set_id)
+    test_generator._deck_indexes.invalidate_tag(set_id)
+    assert get_question_bank(source, set_id, "v1") is not bank
+
+def run_together(target, threads=2):
+    """Run target in several threads released at once; returns their results"""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+    
+    def run(i):
+        barrier.wait()
+        results[i] = target()
+    
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=10)
+    assert not any(worker.is_alive() for worker in workers), "deadlocked"
+    return results
+
+def test_two_tests_building_the_same_pools_agree():
+    class SlowEngine:
+        def candidates(self, key):
+            time.sleep(0.05)
+            return [(key + 1) % 30, (key + 2) % 30]
+    
+    engines = []
+    source = make_source([f"definition {i}" for i in range(30)])
+    bank = QuestionBank(source, DeckIndex(source.card_keys()),
+                        distractors=lambda: engines.append(SlowEngine()) or engines[-1])
+    
+    first, second = run_together(lambda: bank.pools([3, 4, 5]))
+    assert first == second
+    assert all(first[key] is second[key] for key in first)
+    assert [first[key][:2].tolist() for key in (3, 4, 5)] == [[4, 5], [5, 6], [6, 7]]
+    
+    # Built pools are reused without asking for the engine again
+    built = len(engines)
+    assert bank.pools([5, 3]) == {5: first[5], 3: first[3]}
+    assert len(engines) == built
+
+def test_sessions_starting_the_same_test_share_one_bank():
+    set_id = str(uuid.uuid4())
+    source = make_source([f"definition {i}" for i in range(30)])
+    
+    banks = run_together(lambda: get_question_bank(source, set_id, "v1"), threads=4)
+    bank = get_question_bank(source, set_id, "v1")
+    questions = run_together(lambda: generate(bank, 10), threads=4)
+    assert all(len(test) == 10 for test in questions)
+    # Banks raced before the first was cached may differ; the cache keeps one
+    assert bank in banks
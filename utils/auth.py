@@ -1,4 +1,3 @@
-import bcrypt
 import streamlit as st
 from utils.db import Database
 from typing import Optional, Dict
@@ -6,17 +5,21 @@ from typing import Optional, Dict
 class Auth:
     """Authentication handler for Amarsite.Online"""
     
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Database = None):
+        self.db = db or Database()
     
     def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
+        import bcrypt
+        
         salt = bcrypt.gensalt()
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
     def verify_password(self, password: str, password_hash: str) -> bool:
         """Verify a password against its hash"""
+        import bcrypt
+        
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     
     def register_user(self, username: str, email: str, password: str) -> tuple[bool, str]:
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+class TTLCache:
+    """Thread-safe process-wide cache whose entries expire after a fixed time
+    
+    Entries can carry a tag (e.g. a study set id) so every entry derived from
+    the same object can be dropped at once when that object changes.
+    """
+    
+    def __init__(self, ttl: float = 60, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Hashable, tuple] = {}
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at, tag = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            return value
+    
+    def set(self, key: Hashable, value: Any, tag: Hashable = None):
+        """Cache a value, optionally under a tag for invalidation"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            elif len(self._entries) >= self.maxsize:
+                self._evict()
+            
+            self._entries[key] = (value, time.monotonic() + self.ttl, tag)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+    
+    def invalidate_tag(self, tag: Hashable):
+        """Drop every entry cached under a tag"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+    
+    def _remove(self, key: Hashable):
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+    
+    def _evict(self):
+        """Make room by dropping expired entries, or the oldest one if none expired"""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at < now]
+        for key in expired:
+            self._remove(key)
+        
+        if len(self._entries) >= self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+class LRUCache:
+    """Thread-safe process-wide least-recently-used cache with hit statistics
+    
+    The bound is on the total size of the cached values as measured by
+    `sizeof` (one per entry by default), so large values take more room.
+    Values are shared between sessions and must be treated as read-only.
+    """
+    
+    def __init__(self, maxsize: int = 1024, sizeof: Callable[[Any], int] = None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof or (lambda value: 1)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value and mark it recently used, or None if missing"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+    
+    def set(self, key: Hashable, value: Any, tag: Hashable = None):
+        """Cache a value, evicting least recently used entries to stay in bounds"""
+        size = max(1, self.sizeof(value))
+        if size > self.maxsize:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            while self._entries and self._size + size > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            
+            self._entries[key] = (value, size, tag)
+            self._size += size
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+    
+    def invalidate_tag(self, tag: Hashable):
+        """Drop every entry cached under a tag"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+    
+    def clear(self):
+        """Drop all entries (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+    
+    def stats(self) -> Dict:
+        """Get hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups > 0 else 0,
+                'entries': len(self._entries),
+                'size': self._size,
+                'maxsize': self.maxsize
+            }
+    
+    def _remove(self, key: Hashable):
+        _, size, tag = self._entries.pop(key)
+        self._size -= size
+        if tag is not None:
+            keys = self._tags.get(tag)
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
@@ -0,0 +1,43 @@
+from typing import Dict, Hashable, List
+from utils.cache import LRUCache
+from utils.models import Card
+
+class CardStore:
+    """Process-wide store of Card models, so sessions only need to keep card keys
+    
+    Records are keyed by (scope, version, card key), where version changes with
+    every write to the set (its updated_at), so a stale record is never returned.
+    """
+    
+    def __init__(self, maxsize: int = 500000):
+        self._records = LRUCache(maxsize=maxsize)
+    
+    def get_many(self, scope: Hashable, version: Hashable, keys: List[int]) -> Dict[int, Card]:
+        """Get the stored records among the given keys"""
+        records = {}
+        for key in keys:
+            record = self._records.get((scope, version, key))
+            if record is not None:
+                records[key] = record
+        return records
+    
+    def put_many(self, scope: Hashable, version: Hashable, cards: List[Card]) -> List[Card]:
+        """Store cards and get the stored ones back, reusing cards already stored"""
+        records = []
+        for card in cards:
+            store_key = (scope, version, card.id)
+            record = self._records.get(store_key)
+            if record is None:
+                record = card
+                self._records.set(store_key, record, tag=scope)
+            records.append(record)
+        return records
+    
+    def invalidate(self, scope: Hashable):
+        """Drop every record stored for a scope (e.g. a study set)"""
+        self._records.invalidate_tag(scope)
+    
+    def stats(self) -> Dict:
+        return self._records.stats()
+
+card_store = CardStore()
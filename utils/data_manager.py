@@ -1,72 +1,240 @@
+import atexit
 import json
+import logging
 import os
+import threading
 from typing import Dict, List, Optional
+from utils.cache import LRUCache
+from utils.deck_cursor import ListDeckSource
+
+logger = logging.getLogger(__name__)
+
+# Seconds changes are gathered for before they are written to the files
+FLUSH_DELAY = 1.0
+
+# Cards of recently read sets kept in memory, across all sets
+LOADED_CARDS = 50000
+
+def _write_json(path: str, data) -> None:
+    """Write JSON to a temporary file that then replaces the old one, so the file is never half written"""
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, path)
+
+def _set_info(study_set: Dict) -> Dict:
+    info = {key: value for key, value in study_set.items() if key != 'cards'}
+    info['card_count'] = len(study_set.get('cards', []))
+    return info
 
 class DataManager:
-    """Manages study sets data persistence using JSON files"""
+    """Manages study sets data persistence using JSON files
+    
+    Each set is kept in a file of its own in data_dir, next to an index of
+    every set's details and card count (everything but the cards). Listing,
+    searching and statistics read only the index; a set's file is read when
+    its cards are needed and kept in a bounded cache, and a change rewrites
+    only that set's file and the index.
+    
+    One instance is shared by every guest session (see utils.resources). The
+    index is read on first use, and changes are made under a lock, so sessions
+    never overwrite each other's changes with a stale copy. Changes are
+    written back together shortly after they are made (and at exit), each
+    file to a temporary file that then replaces it. Sets are written before
+    the index, so the index never lists a set whose file is missing.
+    
+    A study_sets.json file from before sets were split is split on first use.
+    """
+    
+    def __init__(self, data_dir: str = "study_sets", legacy_file: str = "study_sets.json"):
+        self.data_dir = data_dir
+        self.index_file = os.path.join(data_dir, "index.json")
+        self.legacy_file = legacy_file
+        self._index = None
+        self._sets = LRUCache(maxsize=LOADED_CARDS, sizeof=lambda study_set: len(study_set.get('cards', [])))
+        # Changed sets not yet written, by id; None for a deleted set. Reads see
+        # them until they are, however the cache evicts
+        self._pending: Dict[str, Optional[Dict]] = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        atexit.register(self.flush)
+    
+    @property
+    def index(self) -> Dict:
+        """Every study set's details and card count by id, loaded from the index file on first use"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load_index()
+        return self._index
     
-    def __init__(self, data_file: str = "study_sets.json"):
-        self.data_file = data_file
-        self.study_sets = self._load_data()
+    def _set_file(self, set_id: str) -> str:
+        return os.path.join(self.data_dir, f"{set_id}.json")
     
-    def _load_data(self) -> Dict:
-        """Load study sets from JSON file"""
-        if os.path.exists(self.data_file):
+    def _load_index(self) -> Dict:
+        """Load the index, splitting the single-file storage into set files if there is no index yet"""
+        if os.path.exists(self.index_file):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except (json.JSONDecodeError, FileNotFoundError):
                 return {}
-        return {}
+        
+        study_sets = {}
+        if os.path.exists(self.legacy_file):
+            try:
+                with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                    study_sets = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                pass
+        
+        index = {set_id: _set_info(study_set) for set_id, study_set in study_sets.items()}
+        if study_sets:
+            os.makedirs(self.data_dir, exist_ok=True)
+            for set_id, study_set in study_sets.items():
+                _write_json(self._set_file(set_id), study_set)
+            _write_json(self.index_file, index)
+        return index
     
-    def _save_data(self) -> bool:
-        """Save study sets to JSON file"""
+    def _load_set(self, set_id: str) -> Optional[Dict]:
+        """Read a set's file, or None if the set does not exist
+        
+        A set whose file is missing or unreadable is dropped from the index, so
+        it is no longer listed; an unreadable file is left in place.
+        """
+        if set_id not in self.index:
+            return None
+        
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.study_sets, f, ensure_ascii=False, indent=2)
+            with open(self._set_file(set_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            logger.warning("Dropping study set %s from the index: %s", set_id, e)
+            del self.index[set_id]
+            self._save_data()
+            return None
+    
+    def _save_data(self) -> bool:
+        """Schedule pending changes to be written to the JSON files with other pending changes"""
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return True
+    
+    def flush(self) -> bool:
+        """Write pending changes to the JSON files now"""
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is None:
+                    return True
+                self._flush_timer.cancel()
+                self._flush_timer = None
+                pending = dict(self._pending)
+                index = dict(self._index)
+            
+            try:
+                os.makedirs(self.data_dir, exist_ok=True)
+                for set_id, study_set in pending.items():
+                    if study_set is not None:
+                        _write_json(self._set_file(set_id), study_set)
+                _write_json(self.index_file, index)
+                for set_id, study_set in pending.items():
+                    if study_set is None and os.path.exists(self._set_file(set_id)):
+                        os.remove(self._set_file(set_id))
+            except Exception as e:
+                print(f"Error saving data: {e}")
+                return False
+            
+            # Written sets are read from their files again, unless they changed meanwhile
+            with self._lock:
+                for set_id, study_set in pending.items():
+                    if self._pending.get(set_id, study_set) is study_set:
+                        self._pending.pop(set_id, None)
             return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            return False
+    
+    def _store_set(self, set_id: str, study_set: Optional[Dict]) -> bool:
+        """Replace a set in memory (None deletes it) and schedule it to be written"""
+        if study_set is None:
+            del self.index[set_id]
+            self._sets.invalidate_tag(set_id)
+        else:
+            self.index[set_id] = _set_info(study_set)
+            self._sets.set(set_id, study_set, tag=set_id)
+        self._pending[set_id] = study_set
+        return self._save_data()
     
     def save_study_set(self, set_id: str, study_set: Dict) -> bool:
         """Save a study set"""
-        self.study_sets[set_id] = study_set
-        return self._save_data()
+        with self._lock:
+            return self._store_set(set_id, study_set)
     
     def get_study_set(self, set_id: str) -> Optional[Dict]:
-        """Get a specific study set by ID"""
-        return self.study_sets.get(set_id)
+        """Get a specific study set by ID, reading its file if it is not in memory"""
+        with self._lock:
+            if set_id in self._pending:
+                return self._pending[set_id]
+            
+            study_set = self._sets.get(set_id)
+            if study_set is None:
+                study_set = self._load_set(set_id)
+                if study_set is not None:
+                    self._sets.set(set_id, study_set, tag=set_id)
+            return study_set
+    
+    def get_study_set_info(self, set_id: str) -> Optional[Dict]:
+        """Get a study set's details and card count"""
+        info = self.index.get(set_id)
+        return dict(info) if info is not None else None
+    
+    def get_deck_source(self, set_id: str) -> ListDeckSource:
+        """Get a source for reading a study set's cards window by window (see DeckCursor)"""
+        study_set = self.get_study_set(set_id) or {}
+        return ListDeckSource(study_set.get('cards', []))
     
     def get_all_sets(self) -> Dict:
-        """Get all study sets"""
-        return self.study_sets.copy()
+        """Get all study sets with card counts, without their cards"""
+        return self.list_study_sets()
+    
+    def list_study_sets(self) -> Dict:
+        """Get all study sets with card counts, without their cards"""
+        with self._lock:
+            return {set_id: dict(info) for set_id, info in self.index.items()}
+    
+    def get_item_statistics(self, set_id: str) -> List[Dict]:
+        """Item analysis is only kept for logged-in users' sets"""
+        return []
     
     def delete_study_set(self, set_id: str) -> bool:
         """Delete a study set"""
-        if set_id in self.study_sets:
-            del self.study_sets[set_id]
-            return self._save_data()
-        return False
+        with self._lock:
+            if set_id in self.index:
+                return self._store_set(set_id, None)
+            return False
     
     def update_study_set(self, set_id: str, updates: Dict) -> bool:
         """Update a study set with new data"""
-        if set_id in self.study_sets:
-            self.study_sets[set_id].update(updates)
-            return self._save_data()
-        return False
+        with self._lock:
+            study_set = self.get_study_set(set_id)
+            if study_set is not None:
+                # Cached sets are shared, so the update makes a new one
+                return self._store_set(set_id, {**study_set, **updates})
+            return False
     
     def search_study_sets(self, query: str) -> Dict:
         """Search study sets by title or description"""
         query = query.lower()
         results = {}
         
-        for set_id, study_set in self.study_sets.items():
-            title_match = query in study_set.get('title', '').lower()
-            desc_match = query in study_set.get('description', '').lower()
-            
-            if title_match or desc_match:
-                results[set_id] = study_set
+        with self._lock:
+            for set_id, info in self.index.items():
+                title_match = query in info.get('title', '').lower()
+                desc_match = query in info.get('description', '').lower()
+                
+                if title_match or desc_match:
+                    results[set_id] = dict(info)
         
         return results
     
@@ -74,21 +242,23 @@ class DataManager:
         """Get all study sets for a specific subject"""
         results = {}
         
-        for set_id, study_set in self.study_sets.items():
-            if study_set.get('subject', '').lower() == subject.lower():
-                results[set_id] = study_set
+        with self._lock:
+            for set_id, info in self.index.items():
+                if info.get('subject', '').lower() == subject.lower():
+                    results[set_id] = dict(info)
         
         return results
     
     def get_study_stats(self) -> Dict:
         """Get overall statistics about study sets"""
-        total_sets = len(self.study_sets)
-        total_cards = sum(len(study_set.get('cards', [])) for study_set in self.study_sets.values())
-        
-        subjects = {}
-        for study_set in self.study_sets.values():
-            subject = study_set.get('subject', 'Other')
-            subjects[subject] = subjects.get(subject, 0) + 1
+        with self._lock:
+            total_sets = len(self.index)
+            total_cards = sum(info['card_count'] for info in self.index.values())
+            
+            subjects = {}
+            for info in self.index.values():
+                subject = info.get('subject', 'Other')
+                subjects[subject] = subjects.get(subject, 0) + 1
         
         return {
             'total_sets': total_sets,
@@ -1,19 +1,102 @@
-import psycopg2
 import os
-from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import json
+from utils.cache import LRUCache, TTLCache
+from utils.card_store import card_store
+from utils.models import Card, Progress, StudySet
+
+# Share-link previews (set summary plus the first few cards) shared by every
+# session of this process, since viral links are opened by many visitors at once
+share_preview_cache = TTLCache(ttl=60, maxsize=1024)
+
+# Parsed card tuples keyed by (set_id, updated_at), bounded by total number of
+# cards. Every write to a set or its cards bumps updated_at, so other processes
+# miss on the new version while this one also drops the old entry right away.
+deck_cache = LRUCache(maxsize=200000, sizeof=len)
+
+def invalidate_set_caches(set_id: str):
+    """Drop everything this process caches for a study set"""
+    deck_cache.invalidate_tag(set_id)
+    share_preview_cache.invalidate_tag(set_id)
+    card_store.invalidate(set_id)
+
+# Whether source card `c` is part of the snapshot copied set `s` was last synced
+# to. Source cards are versioned while copies exist: an edit or removal marks the
+# old row superseded instead of changing it in place.
+SNAPSHOT_SQL = "c.created_at <= s.synced_at AND (c.superseded_at IS NULL OR c.superseded_at > s.synced_at)"
+
+# Cards visible in a study set, in order. A copied set shares its source set's
+# cards (copy-on-write); its own rows are new cards, overrides of a shared card
+# (source_card_id set) or tombstones hiding one (is_deleted).
+VISIBLE_CARDS_SQL = f"""
+    SELECT id, term, definition, term_image_url, definition_image_url, card_order
+    FROM cards
+    WHERE study_set_id = %(set_id)s AND NOT is_deleted AND superseded_at IS NULL
+    UNION ALL
+    SELECT c.id, c.term, c.definition, c.term_image_url, c.definition_image_url, c.card_order
+    FROM cards c
+    JOIN study_sets s ON s.source_set_id = c.study_set_id
+    WHERE s.id = %(set_id)s AND {SNAPSHOT_SQL}
+      AND NOT EXISTS (
+          SELECT 1 FROM cards o WHERE o.study_set_id = s.id AND o.source_card_id = c.id
+      )
+"""
+VISIBLE_CARDS_QUERY = VISIBLE_CARDS_SQL + "    ORDER BY card_order, id\n"
+
+# Number of visible cards of the study set aliased as `s` in the outer query
+CARD_COUNT_SQL = f"""(
+    (SELECT COUNT(*) FROM cards c WHERE c.study_set_id = s.source_set_id AND {SNAPSHOT_SQL})
+    + (SELECT COALESCE(SUM(CASE WHEN oc.is_deleted AND oc.source_card_id IS NOT NULL THEN -1
+                                WHEN oc.is_deleted OR oc.source_card_id IS NOT NULL THEN 0
+                                ELSE 1 END), 0)
+       FROM cards oc WHERE oc.study_set_id = s.id AND oc.superseded_at IS NULL)
+)"""
+
+# Whether a copied set's source set changed since the copy was last synced
+UPSTREAM_CHANGES_SQL = """EXISTS (
+    SELECT 1 FROM cards uc
+    WHERE uc.study_set_id = s.source_set_id
+      AND (uc.created_at > s.synced_at OR uc.superseded_at > s.synced_at)
+)"""
 
 class Database:
     """Database connection and operations handler"""
     
-    def __init__(self):
+    def __init__(self, pool_factory: Callable = None):
         self.connection_string = os.environ.get('DATABASE_URL')
-        
+        self.pool_factory = pool_factory
+    
     def get_connection(self):
-        """Get a new database connection"""
+        """Get a database connection, from the pool if there is one
+        
+        Opens a separate connection when the pool is exhausted rather than failing.
+        psycopg2 is imported here rather than at module level so pages that never
+        touch the database don't pay for loading it.
+        """
+        import psycopg2
+        import psycopg2.pool
+        
+        if self.pool_factory:
+            try:
+                return self.pool_factory().getconn()
+            except psycopg2.pool.PoolError:
+                pass
         return psycopg2.connect(self.connection_string)
     
+    def release_connection(self, conn):
+        """Return a connection from get_connection to the pool, or close it"""
+        import psycopg2.pool
+        
+        if self.pool_factory:
+            try:
+                self.pool_factory().putconn(conn, close=bool(conn.closed))
+                return
+            except psycopg2.pool.PoolError:
+                pass
+        conn.close()
+    
     def execute_query(self, query: str, params: tuple = None, fetch: str = None):
         """Execute a query and optionally fetch results"""
         conn = self.get_connection()
@@ -36,7 +119,23 @@ class Database:
             raise e
         finally:
             cursor.close()
-            conn.close()
+            self.release_connection(conn)
+    
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor whose statements are committed together or rolled back"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            self.release_connection(conn)
     
     def create_user(self, username: str, email: str, password_hash: str) -> Optional[int]:
         """Create a new user"""
@@ -78,82 +177,106 @@ class Database:
         self.execute_query(query, (set_id, user_id, title, description, subject, is_public, now, now))
         return True
     
-    def get_study_sets_by_user(self, user_id: int) -> List[Dict]:
-        """Get all study sets for a user"""
+    def get_study_sets_by_user(self, user_id: int) -> List[StudySet]:
+        """Get all study sets for a user, with card counts and whether copies have
+        upstream changes, but without cards"""
         query = """
-            SELECT s.id, s.title, s.description, s.subject, s.is_public, s.created_at,
-                   COUNT(c.id) as card_count
+            SELECT s.id, s.user_id, s.title, s.description, s.subject, s.is_public, s.created_at,
+                   s.source_set_id, s.updated_at, {card_count} as card_count,
+                   {upstream_changes} as has_upstream_changes
             FROM study_sets s
-            LEFT JOIN cards c ON s.id = c.study_set_id
             WHERE s.user_id = %s
-            GROUP BY s.id
             ORDER BY s.created_at DESC
-        """
+        """.format(card_count=CARD_COUNT_SQL, upstream_changes=UPSTREAM_CHANGES_SQL)
         results = self.execute_query(query, (user_id,), fetch='all')
         
-        study_sets = []
-        for row in results or []:
-            study_sets.append({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'subject': row[3],
-                'is_public': row[4],
-                'created_at': row[5].isoformat() if row[5] else None,
-                'card_count': row[6] or 0
-            })
-        return study_sets
+        return [StudySet.from_row(row) for row in results or []]
     
-    def get_study_set(self, set_id: str, user_id: int = None) -> Optional[Dict]:
-        """Get a specific study set with cards"""
-        if user_id:
-            query = """
-                SELECT id, user_id, title, description, subject, is_public, created_at
-                FROM study_sets
-                WHERE id = %s AND (user_id = %s OR is_public = TRUE)
-            """
-            result = self.execute_query(query, (set_id, user_id), fetch='one')
-        else:
-            query = """
-                SELECT id, user_id, title, description, subject, is_public, created_at
-                FROM study_sets
-                WHERE id = %s AND is_public = TRUE
-            """
-            result = self.execute_query(query, (set_id,), fetch='one')
+    def get_dashboard_summary(self, user_id: int, recent_limit: int = 3) -> Dict:
+        """Get everything the Home page shows for a user in one query
+        
+        Returns set and card counts, mastered/learning card counts and the most
+        recently created sets as {'id', 'title', 'description', 'created_date', 'card_count'}.
+        """
+        query = f"""
+            WITH user_sets AS (
+                SELECT s.id, s.title, s.description, s.created_at, {CARD_COUNT_SQL} AS card_count
+                FROM study_sets s
+                WHERE s.user_id = %(user_id)s
+            ), progress AS (
+                SELECT COUNT(*) FILTER (WHERE mastery_level >= 8) AS mastered,
+                       COUNT(*) FILTER (WHERE mastery_level >= 3 AND mastery_level < 8) AS learning
+                FROM study_progress
+                WHERE user_id = %(user_id)s
+            )
+            SELECT (SELECT COUNT(*) FROM user_sets),
+                   (SELECT COALESCE(SUM(card_count), 0) FROM user_sets),
+                   progress.mastered, progress.learning,
+                   (SELECT COALESCE(json_agg(recent), '[]'::json) FROM (
+                        SELECT id, title, description, created_at AS created_date, card_count
+                        FROM user_sets
+                        ORDER BY created_at DESC
+                        LIMIT %(recent_limit)s
+                   ) recent)
+            FROM progress
+        """
+        result = self.execute_query(query, {'user_id': user_id, 'recent_limit': recent_limit}, fetch='one')
         
         if not result:
-            return None
+            return {'total_sets': 0, 'total_cards': 0, 'mastered': 0, 'learning': 0, 'recent_sets': []}
+        
+        recent_sets = result[4]
+        if isinstance(recent_sets, str):
+            recent_sets = json.loads(recent_sets)
         
-        study_set = {
-            'id': result[0],
-            'user_id': result[1],
-            'title': result[2],
-            'description': result[3],
-            'subject': result[4],
-            'is_public': result[5],
-            'created_at': result[6].isoformat() if result[6] else None,
-            'cards': []
+        return {
+            'total_sets': result[0] or 0,
+            'total_cards': int(result[1] or 0),
+            'mastered': result[2] or 0,
+            'learning': result[3] or 0,
+            'recent_sets': recent_sets
         }
+    
+    def get_study_set(self, set_id: str, user_id: int = None) -> Optional[StudySet]:
+        """Get a specific study set with cards
         
-        cards_query = """
-            SELECT id, term, definition, term_image_url, definition_image_url, card_order
-            FROM cards
-            WHERE study_set_id = %s
-            ORDER BY card_order
+        The cards tuple is shared with the deck cache and other callers; it is
+        returned as is rather than copied.
         """
-        cards = self.execute_query(cards_query, (set_id,), fetch='all')
-        
-        for card in cards or []:
-            study_set['cards'].append({
-                'id': card[0],
-                'term': card[1],
-                'definition': card[2],
-                'term_image_url': card[3],
-                'definition_image_url': card[4],
-                'card_order': card[5]
-            })
+        study_set = self.get_study_set_summary(set_id, user_id)
+        if not study_set:
+            return None
         
-        return study_set
+        version = (set_id, study_set.updated_at)
+        cards = deck_cache.get(version)
+        if cards is None:
+            cards = tuple(self.get_cards(set_id))
+            deck_cache.set(version, cards, tag=set_id)
+        
+        return study_set.with_cards(cards)
+    
+    def get_study_set_summary(self, set_id: str, user_id: int = None,
+                              with_card_count: bool = False) -> Optional[StudySet]:
+        """Get a study set's details without its cards, if the user may see it"""
+        card_count = f", {CARD_COUNT_SQL}" if with_card_count else ""
+        if user_id:
+            query = f"""
+                SELECT s.id, s.user_id, s.title, s.description, s.subject, s.is_public, s.created_at,
+                       s.source_set_id, s.updated_at{card_count}
+                FROM study_sets s
+                WHERE s.id = %s AND (s.user_id = %s OR s.is_public = TRUE)
+            """
+            result = self.execute_query(query, (set_id, user_id), fetch='one')
+        else:
+            query = f"""
+                SELECT s.id, s.user_id, s.title, s.description, s.subject, s.is_public, s.created_at,
+                       s.source_set_id, s.updated_at{card_count}
+                FROM study_sets s
+                WHERE s.id = %s AND s.is_public = TRUE
+            """
+            result = self.execute_query(query, (set_id,), fetch='one')
+        
+        return StudySet.from_row(result) if result else None
     
     def add_card_to_set(self, study_set_id: str, term: str, definition: str, 
                         card_order: int, term_image_url: str = None, 
@@ -165,17 +288,73 @@ class Database:
             VALUES (%s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """
+        with self.transaction() as cursor:
+            cursor.execute(
+                query, 
+                (study_set_id, term, definition, term_image_url, definition_image_url, 
+                 card_order, datetime.now())
+            )
+            result = cursor.fetchone()
+            self._touch_set(cursor, study_set_id)
+        return result[0] if result else None
+    
+    def _touch_set(self, cursor, set_id: str):
+        """Mark a study set's cards as changed so cached copies of them go stale"""
+        cursor.execute("UPDATE study_sets SET updated_at = %s WHERE id = %s", (datetime.now(), set_id))
+        invalidate_set_caches(set_id)
+    
+    def _touch_progress(self, cursor, study_set_id: str):
+        """Mark the progress of everyone studying a set as changed (before it is removed)"""
+        cursor.execute(
+            """
+            UPDATE users SET progress_updated_at = %s
+            WHERE id IN (SELECT user_id FROM study_progress WHERE study_set_id = %s)
+            """,
+            (datetime.now(), study_set_id)
+        )
+    
+    def _delete_progress(self, cursor, study_set_id: str, card_ids: List[int]):
+        """Delete progress on cards that left a set and mark the affected users' progress as changed"""
+        cursor.execute(
+            "DELETE FROM study_progress WHERE study_set_id = %s AND card_id = ANY(%s) RETURNING user_id",
+            (study_set_id, card_ids)
+        )
+        user_ids = list({row[0] for row in cursor.fetchall()})
+        if user_ids:
+            cursor.execute(
+                "UPDATE users SET progress_updated_at = %s WHERE id = ANY(%s)",
+                (datetime.now(), user_ids)
+            )
+    
+    def get_set_version(self, set_id: str) -> Optional[str]:
+        """Get a study set's updated_at, which changes with every write to the set or its cards"""
         result = self.execute_query(
-            query, 
-            (study_set_id, term, definition, term_image_url, definition_image_url, 
-             card_order, datetime.now()),
-            fetch='one'
+            "SELECT updated_at FROM study_sets WHERE id = %s", (set_id,), fetch='one'
         )
-        return result[0] if result else None
+        return result[0].isoformat() if result and result[0] else None
+    
+    def get_progress_version(self, user_id: int) -> Optional[str]:
+        """Get when a user's study progress last changed"""
+        result = self.execute_query(
+            "SELECT progress_updated_at FROM users WHERE id = %s", (user_id,), fetch='one'
+        )
+        return result[0].isoformat() if result and result[0] else None
     
     def update_card(self, card_id: int, term: str = None, definition: str = None,
                    term_image_url: str = None, definition_image_url: str = None) -> bool:
         """Update a card's content"""
+        updates, params = self._card_updates(term, definition, term_image_url, definition_image_url)
+        
+        if not updates:
+            return False
+        
+        with self.transaction() as cursor:
+            self._write_card(cursor, card_id, updates, params)
+        return True
+    
+    def _card_updates(self, term: str = None, definition: str = None,
+                      term_image_url: str = None, definition_image_url: str = None) -> Tuple[List[str], List]:
+        """Build the SET clauses and parameters for a card update"""
         updates = []
         params = []
         
@@ -192,18 +371,174 @@ class Database:
             updates.append("definition_image_url = %s")
             params.append(definition_image_url)
         
-        if not updates:
-            return False
-        
-        query = f"UPDATE cards SET {', '.join(updates)} WHERE id = %s"
-        params.append(card_id)
-        self.execute_query(query, tuple(params))
-        return True
+        return updates, params
     
     def delete_card(self, card_id: int) -> bool:
         """Delete a single card"""
-        query = "DELETE FROM cards WHERE id = %s"
-        self.execute_query(query, (card_id,))
+        with self.transaction() as cursor:
+            self._remove_card(cursor, card_id)
+        return True
+    
+    def _shared_card_set(self, cursor, card_id: int) -> Optional[str]:
+        """Get the card's study set id if copies of that set may still see the card"""
+        cursor.execute(
+            """
+            SELECT c.study_set_id FROM cards c
+            WHERE c.id = %s
+              AND EXISTS (SELECT 1 FROM study_sets s WHERE s.source_set_id = c.study_set_id)
+            """,
+            (card_id,)
+        )
+        result = cursor.fetchone()
+        return result[0] if result else None
+    
+    def _write_card(self, cursor, card_id: int, updates: List[str], params: List) -> int:
+        """Apply card updates, keeping the old version while copies still see it
+        
+        Returns the id of the card's current version.
+        """
+        if not updates:
+            return card_id
+        
+        study_set_id = self._shared_card_set(cursor, card_id)
+        if not study_set_id:
+            cursor.execute(
+                f"UPDATE cards SET {', '.join(updates)} WHERE id = %s RETURNING study_set_id",
+                tuple(params + [card_id])
+            )
+            result = cursor.fetchone()
+            if result:
+                self._touch_set(cursor, result[0])
+            return card_id
+        
+        now = datetime.now()
+        cursor.execute(
+            """
+            INSERT INTO cards (study_set_id, term, definition, term_image_url,
+                               definition_image_url, card_order, created_at)
+            SELECT study_set_id, term, definition, term_image_url, definition_image_url, card_order, %s
+            FROM cards WHERE id = %s
+            RETURNING id
+            """,
+            (now, card_id)
+        )
+        new_id = cursor.fetchone()[0]
+        cursor.execute(f"UPDATE cards SET {', '.join(updates)} WHERE id = %s", tuple(params + [new_id]))
+        cursor.execute(
+            "UPDATE cards SET superseded_at = %s, replaced_by = %s WHERE id = %s",
+            (now, new_id, card_id)
+        )
+        cursor.execute(
+            "UPDATE study_progress SET card_id = %s WHERE study_set_id = %s AND card_id = %s",
+            (new_id, study_set_id, card_id)
+        )
+        self._touch_set(cursor, study_set_id)
+        return new_id
+    
+    def _remove_card(self, cursor, card_id: int):
+        """Delete a card, keeping it as a superseded version while copies still see it"""
+        study_set_id = self._shared_card_set(cursor, card_id)
+        if not study_set_id:
+            cursor.execute("SELECT study_set_id FROM cards WHERE id = %s", (card_id,))
+            result = cursor.fetchone()
+            if result:
+                self._delete_progress(cursor, result[0], [card_id])
+                cursor.execute("DELETE FROM cards WHERE id = %s", (card_id,))
+                self._touch_set(cursor, result[0])
+            return
+        
+        cursor.execute("UPDATE cards SET superseded_at = %s WHERE id = %s", (datetime.now(), card_id))
+        self._delete_progress(cursor, study_set_id, [card_id])
+        self._touch_set(cursor, study_set_id)
+    
+    def _materialize_card(self, cursor, study_set_id: str, card_id: int,
+                          is_deleted: bool = False) -> Optional[int]:
+        """Give a copied set its own row for a card it shares with its source set
+        
+        Progress the set's learners have on the shared card moves to the new row.
+        With is_deleted the row is a tombstone hiding the shared card instead.
+        """
+        cursor.execute(
+            """
+            INSERT INTO cards (study_set_id, term, definition, term_image_url,
+                               definition_image_url, card_order, source_card_id, is_deleted, created_at)
+            SELECT s.id, c.term, c.definition, c.term_image_url, c.definition_image_url,
+                   c.card_order, c.id, %s, %s
+            FROM cards c
+            JOIN study_sets s ON s.source_set_id = c.study_set_id
+            WHERE s.id = %s AND c.id = %s AND {snapshot}
+              AND NOT EXISTS (
+                  SELECT 1 FROM cards o WHERE o.study_set_id = s.id AND o.source_card_id = c.id
+              )
+            RETURNING id
+            """.format(snapshot=SNAPSHOT_SQL),
+            (is_deleted, datetime.now(), study_set_id, card_id)
+        )
+        result = cursor.fetchone()
+        if not result:
+            return None
+        
+        if is_deleted:
+            self._delete_progress(cursor, study_set_id, [card_id])
+        else:
+            cursor.execute(
+                "UPDATE study_progress SET card_id = %s WHERE study_set_id = %s AND card_id = %s",
+                (result[0], study_set_id, card_id)
+            )
+        return result[0]
+    
+    def _own_card(self, cursor, study_set_id: str, card_id: int) -> Optional[Tuple]:
+        """Get (id, source_card_id) if the card row belongs to the study set itself"""
+        cursor.execute(
+            """
+            SELECT id, source_card_id FROM cards
+            WHERE id = %s AND study_set_id = %s AND NOT is_deleted AND superseded_at IS NULL
+            """,
+            (card_id, study_set_id)
+        )
+        return cursor.fetchone()
+    
+    def update_set_card(self, study_set_id: str, card_id: int, term: str = None,
+                        definition: str = None, term_image_url: str = None,
+                        definition_image_url: str = None) -> Optional[int]:
+        """Update a card as seen from a study set, copying a shared card on first write
+        
+        Returns the id the card has in the set afterwards, or None if it is not in the set.
+        """
+        updates, params = self._card_updates(term, definition, term_image_url, definition_image_url)
+        
+        with self.transaction() as cursor:
+            own_card = self._own_card(cursor, study_set_id, card_id)
+            if own_card:
+                return self._write_card(cursor, own_card[0], updates, params)
+            
+            target_id = self._materialize_card(cursor, study_set_id, card_id)
+            if target_id is not None:
+                if updates:
+                    cursor.execute(
+                        f"UPDATE cards SET {', '.join(updates)} WHERE id = %s",
+                        tuple(params + [target_id])
+                    )
+                self._touch_set(cursor, study_set_id)
+        
+        return target_id
+    
+    def delete_set_card(self, study_set_id: str, card_id: int) -> bool:
+        """Remove a card from a study set without touching the set it is shared from"""
+        with self.transaction() as cursor:
+            own_card = self._own_card(cursor, study_set_id, card_id)
+            if not own_card:
+                if self._materialize_card(cursor, study_set_id, card_id, is_deleted=True) is None:
+                    return False
+                self._touch_set(cursor, study_set_id)
+            elif own_card[1] is not None:
+                # Overrides stay behind as tombstones so the shared card stays hidden
+                cursor.execute("UPDATE cards SET is_deleted = TRUE WHERE id = %s", (card_id,))
+                self._delete_progress(cursor, study_set_id, [card_id])
+                self._touch_set(cursor, study_set_id)
+            else:
+                self._remove_card(cursor, card_id)
+        
         return True
     
     def update_study_set(self, set_id: str, user_id: int, title: str = None,
@@ -235,29 +570,250 @@ class Database:
             query = f"UPDATE study_sets SET {', '.join(updates)} WHERE id = %s AND user_id = %s"
             params.extend([set_id, user_id])
             self.execute_query(query, tuple(params))
+            invalidate_set_caches(set_id)
         
         return True
     
     def delete_study_set(self, set_id: str, user_id: int) -> bool:
         """Delete a study set (cascade deletes cards and progress)"""
-        query = "DELETE FROM study_sets WHERE id = %s AND user_id = %s"
-        self.execute_query(query, (set_id, user_id))
+        with self.transaction() as cursor:
+            cursor.execute(
+                "SELECT source_set_id FROM study_sets WHERE id = %s AND user_id = %s",
+                (set_id, user_id)
+            )
+            result = cursor.fetchone()
+            if result:
+                self._detach_copies(cursor, set_id)
+                self._touch_progress(cursor, set_id)
+                cursor.execute(
+                    "DELETE FROM study_sets WHERE id = %s AND user_id = %s",
+                    (set_id, user_id)
+                )
+                if result[0]:
+                    self._collect_superseded_cards(cursor, result[0])
+        invalidate_set_caches(set_id)
         return True
     
+    def _detach_copies(self, cursor, set_id: str):
+        """Materialize the cards copies still share with a set that is about to go away"""
+        cursor.execute(
+            """
+            INSERT INTO cards (study_set_id, term, definition, term_image_url,
+                               definition_image_url, card_order, source_card_id, created_at)
+            SELECT s.id, c.term, c.definition, c.term_image_url, c.definition_image_url,
+                   c.card_order, c.id, %s
+            FROM study_sets s
+            JOIN cards c ON c.study_set_id = s.source_set_id
+            WHERE s.source_set_id = %s AND {snapshot}
+              AND NOT EXISTS (
+                  SELECT 1 FROM cards o WHERE o.study_set_id = s.id AND o.source_card_id = c.id
+              )
+            """.format(snapshot=SNAPSHOT_SQL),
+            (datetime.now(), set_id)
+        )
+        cursor.execute(
+            """
+            UPDATE study_progress p SET card_id = c.id
+            FROM study_sets s, cards c
+            WHERE s.source_set_id = %s AND c.study_set_id = s.id
+              AND p.study_set_id = s.id AND p.card_id = c.source_card_id
+            """,
+            (set_id,)
+        )
+        cursor.execute(
+            """
+            DELETE FROM cards
+            WHERE is_deleted AND study_set_id IN (SELECT id FROM study_sets WHERE source_set_id = %s)
+            """,
+            (set_id,)
+        )
+        # The copies' cards get new ids, so their cached card lists are stale
+        cursor.execute(
+            "UPDATE study_sets SET source_set_id = NULL, updated_at = %s WHERE source_set_id = %s RETURNING id",
+            (datetime.now(), set_id)
+        )
+        for (copy_id,) in cursor.fetchall():
+            invalidate_set_caches(copy_id)
+    
+    def _collect_superseded_cards(self, cursor, source_set_id: str):
+        """Drop old versions of a set's cards that no copy can reach any more
+        
+        A copy's next sync follows replaced_by from the versions in its snapshot
+        to the current ones, through every version superseded after it last
+        synced, so those are kept too, not only the versions it still sees.
+        Anything superseded before every copy's snapshot is unreachable.
+        """
+        cursor.execute(
+            """
+            DELETE FROM cards c
+            WHERE c.study_set_id = %s AND c.superseded_at IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM study_sets s
+                  WHERE s.source_set_id = c.study_set_id AND c.superseded_at > s.synced_at
+              )
+            """,
+            (source_set_id,)
+        )
+    
     def update_study_progress(self, user_id: int, card_id: int, study_set_id: str,
                              difficulty: str, mastery_level: int) -> bool:
         """Update or create study progress for a card using spaced repetition"""
+        return self.update_study_progress_batch(user_id, study_set_id, [(card_id, difficulty)])
+    
+    def update_study_progress_batch(self, user_id: int, study_set_id: str,
+                                    ratings: List[Tuple[int, str]]) -> bool:
+        """Apply several (card_id, difficulty) ratings in one transaction
+        
+        Ratings of the same card are applied in the order given.
+        """
+        if not ratings:
+            return True
+        
+        with self.transaction() as cursor:
+            self._apply_study_ratings(cursor, user_id, study_set_id, ratings)
+        
+        return True
+    
+    def record_test_attempt(self, attempt_id: str, user_id: int, study_set_id: str,
+                            ratings: List[Tuple[int, str]], started_at: datetime = None,
+                            score: int = None, responses: List[Dict] = ()) -> bool:
+        """Record a finished practice test and apply its (card_id, difficulty) ratings, once
+        
+        responses are the answered questions, as dicts with card, type, is_correct,
+        and optionally chosen (the card whose definition was picked), options (the
+        cards offered), similarity and seconds. They are bulk inserted and folded
+        into the set's item statistics.
+        
+        Everything is written in one transaction. Recording an attempt id that is
+        already recorded changes nothing and returns False.
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                """INSERT INTO test_attempts (id, user_id, study_set_id, started_at, finished_at,
+                                              score, question_count)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (id) DO NOTHING
+                   RETURNING id""",
+                (attempt_id, user_id, study_set_id, started_at, datetime.now(), score, len(responses))
+            )
+            if cursor.fetchone() is None:
+                return False
+            
+            if responses:
+                self._record_test_responses(cursor, attempt_id, study_set_id, responses)
+            if ratings:
+                self._apply_study_ratings(cursor, user_id, study_set_id, ratings)
+        
+        return True
+    
+    def _record_test_responses(self, cursor, attempt_id: str, study_set_id: str, responses: List[Dict]):
+        """Insert an attempt's responses and add them to the item statistics, inside a transaction"""
+        from psycopg2.extras import execute_values
+        
+        execute_values(
+            cursor,
+            """INSERT INTO test_responses (attempt_id, position, card_id, question_type, is_correct,
+                                           chosen_card_id, similarity, seconds)
+               VALUES %s""",
+            [(attempt_id, position, response['card'], response['type'], response['is_correct'],
+              response.get('chosen'), response.get('similarity'), response.get('seconds'))
+             for position, response in enumerate(responses)]
+        )
+        
+        items: Dict[int, List] = {}
+        distractors: Dict[Tuple[int, int], List[int]] = {}
+        for response in responses:
+            item = items.setdefault(response['card'], [0, 0, 0.0])
+            item[0] += 1
+            item[1] += 1 if response['is_correct'] else 0
+            item[2] += response.get('seconds') or 0
+            
+            for option in response.get('options') or ():
+                if option != response['card']:
+                    counts = distractors.setdefault((response['card'], option), [0, 0])
+                    counts[0] += 1
+                    counts[1] += 1 if option == response.get('chosen') else 0
+        
+        # Rows are upserted in key order so concurrent attempts lock them in the same order
+        execute_values(
+            cursor,
+            """INSERT INTO card_item_stats (study_set_id, card_id, responses, correct, total_seconds)
+               VALUES %s
+               ON CONFLICT (study_set_id, card_id) DO UPDATE
+               SET responses = card_item_stats.responses + EXCLUDED.responses,
+                   correct = card_item_stats.correct + EXCLUDED.correct,
+                   total_seconds = card_item_stats.total_seconds + EXCLUDED.total_seconds""",
+            [(study_set_id, card_id, *item) for card_id, item in sorted(items.items())]
+        )
+        if distractors:
+            execute_values(
+                cursor,
+                """INSERT INTO card_distractor_stats (study_set_id, card_id, distractor_card_id, offered, picked)
+                   VALUES %s
+                   ON CONFLICT (study_set_id, card_id, distractor_card_id) DO UPDATE
+                   SET offered = card_distractor_stats.offered + EXCLUDED.offered,
+                       picked = card_distractor_stats.picked + EXCLUDED.picked""",
+                [(study_set_id, card_id, option, *counts)
+                 for (card_id, option), counts in sorted(distractors.items())]
+            )
+    
+    def get_item_statistics(self, study_set_id: str) -> List[Dict]:
+        """Get per-card item analysis of a set's practice tests, hardest cards first
+        
+        p_value is the share of responses that were correct. The most picked
+        wrong answer of each card comes with its pick rate (picked / offered).
+        Reads the maintained statistics only, however many attempts there were.
+        """
+        query = """
+            SELECT s.card_id, c.term, s.responses, s.correct, s.total_seconds,
+                   d.definition, d.picked, d.offered
+            FROM card_item_stats s
+            JOIN cards c ON c.id = s.card_id
+            LEFT JOIN LATERAL (
+                SELECT dc.definition, ds.picked, ds.offered
+                FROM card_distractor_stats ds
+                JOIN cards dc ON dc.id = ds.distractor_card_id
+                WHERE ds.study_set_id = s.study_set_id AND ds.card_id = s.card_id AND ds.picked > 0
+                ORDER BY ds.picked DESC, ds.offered
+                LIMIT 1
+            ) d ON TRUE
+            WHERE s.study_set_id = %s AND s.responses > 0
+            ORDER BY s.correct::float / s.responses, s.responses DESC
+        """
+        results = self.execute_query(query, (study_set_id,), fetch='all')
+        
+        return [
+            {
+                'card_id': row[0],
+                'term': row[1],
+                'responses': row[2],
+                'p_value': row[3] / row[2],
+                'avg_seconds': row[4] / row[2],
+                'top_distractor': row[5],
+                'top_distractor_pick_rate': row[6] / row[7] if row[7] else None
+            }
+            for row in results or []
+        ]
+    
+    def _apply_study_ratings(self, cursor, user_id: int, study_set_id: str, ratings: List[Tuple[int, str]]):
+        """Apply ratings inside a transaction; see update_study_progress_batch"""
         from utils.spaced_repetition import SpacedRepetition
         
         now = datetime.now()
+        card_ids = list({card_id for card_id, _ in ratings})
         
-        check_query = """SELECT id, difficulty_history, times_studied, mastery_level,
-                        easiness_factor, repetitions, interval_days
-                        FROM study_progress WHERE user_id = %s AND card_id = %s"""
-        existing = self.execute_query(check_query, (user_id, card_id), fetch='one')
+        cursor.execute(
+            """SELECT card_id, difficulty_history, times_studied, mastery_level,
+                      easiness_factor, repetitions, interval_days
+               FROM study_progress
+               WHERE user_id = %s AND study_set_id = %s AND card_id = ANY(%s)
+               FOR UPDATE""",
+            (user_id, study_set_id, card_ids)
+        )
         
-        if existing:
-            difficulty_history_raw = existing[1]
+        states = {}
+        for row in cursor.fetchall():
+            difficulty_history_raw = row[1]
             if isinstance(difficulty_history_raw, str):
                 difficulty_history = json.loads(difficulty_history_raw)
             elif isinstance(difficulty_history_raw, list):
@@ -265,59 +821,61 @@ class Database:
             else:
                 difficulty_history = []
             
-            difficulty_history.append({
-                'difficulty': difficulty,
-                'timestamp': now.isoformat()
+            states[row[0]] = {
+                'difficulty_history': difficulty_history,
+                'times_studied': row[2] or 0,
+                'mastery_level': row[3] or 0,
+                'easiness_factor': float(row[4] or 2.5),
+                'repetitions': row[5] or 0,
+                'interval_days': row[6] or 0
+            }
+        
+        for card_id, difficulty in ratings:
+            state = states.setdefault(card_id, {
+                'difficulty_history': [],
+                'times_studied': 0,
+                'mastery_level': 0,
+                'easiness_factor': 2.5,
+                'repetitions': 0,
+                'interval_days': 0
             })
             
-            times_studied = (existing[2] or 0) + 1
-            current_mastery = existing[3] or 0
-            current_easiness = existing[4] or 2.5
-            current_repetitions = existing[5] or 0
-            current_interval = existing[6] or 0
-            
-            mastery_level = current_mastery + (2 if difficulty == 'easy' else 1 if difficulty == 'good' else -1)
-            mastery_level = max(0, min(10, mastery_level))
-            
-            next_review, new_easiness, new_repetitions, new_interval = SpacedRepetition.get_next_review_date(
-                current_easiness, current_repetitions, current_interval, difficulty
-            )
-            
-            update_query = """
-                UPDATE study_progress 
-                SET mastery_level = %s, times_studied = %s, last_studied = %s, 
-                    difficulty_history = %s, next_review_date = %s, easiness_factor = %s,
-                    repetitions = %s, interval_days = %s
-                WHERE user_id = %s AND card_id = %s
-            """
-            self.execute_query(
-                update_query,
-                (mastery_level, times_studied, now, json.dumps(difficulty_history), 
-                 next_review, new_easiness, new_repetitions, new_interval, user_id, card_id)
-            )
-        else:
-            difficulty_history = [{
+            state['difficulty_history'].append({
                 'difficulty': difficulty,
                 'timestamp': now.isoformat()
-            }]
+            })
+            state['times_studied'] += 1
             
-            next_review, new_easiness, new_repetitions, new_interval = SpacedRepetition.get_next_review_date(
-                2.5, 0, 0, difficulty
-            )
+            mastery_level = state['mastery_level'] + (2 if difficulty == 'easy' else 1 if difficulty == 'good' else -1)
+            state['mastery_level'] = max(0, min(10, mastery_level))
             
-            insert_query = """
-                INSERT INTO study_progress (user_id, card_id, study_set_id, mastery_level, 
-                                           times_studied, last_studied, difficulty_history, next_review_date,
-                                           easiness_factor, repetitions, interval_days)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            self.execute_query(
-                insert_query,
-                (user_id, card_id, study_set_id, mastery_level, 1, now, 
-                 json.dumps(difficulty_history), next_review, new_easiness, new_repetitions, new_interval)
+            (state['next_review_date'], state['easiness_factor'],
+             state['repetitions'], state['interval_days']) = SpacedRepetition.get_next_review_date(
+                state['easiness_factor'], state['repetitions'], state['interval_days'], difficulty
             )
         
-        return True
+        upsert_query = """
+            INSERT INTO study_progress (user_id, card_id, study_set_id, mastery_level, 
+                                       times_studied, last_studied, difficulty_history, next_review_date,
+                                       easiness_factor, repetitions, interval_days)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (user_id, study_set_id, card_id) DO UPDATE
+            SET mastery_level = EXCLUDED.mastery_level, times_studied = EXCLUDED.times_studied,
+                last_studied = EXCLUDED.last_studied, difficulty_history = EXCLUDED.difficulty_history,
+                next_review_date = EXCLUDED.next_review_date, easiness_factor = EXCLUDED.easiness_factor,
+                repetitions = EXCLUDED.repetitions, interval_days = EXCLUDED.interval_days
+        """
+        cursor.executemany(
+            upsert_query,
+            [(user_id, card_id, study_set_id, state['mastery_level'], state['times_studied'], now,
+              json.dumps(state['difficulty_history']), state['next_review_date'],
+              state['easiness_factor'], state['repetitions'], state['interval_days'])
+             for card_id, state in states.items() if 'next_review_date' in state]
+        )
+        cursor.execute(
+            "UPDATE users SET progress_updated_at = %s WHERE id = %s",
+            (now, user_id)
+        )
     
     def calculate_next_review(self, mastery_level: int, current_time: datetime) -> datetime:
         """Calculate next review date based on mastery level (basic spaced repetition)"""
@@ -340,6 +898,42 @@ class Database:
         interval = intervals.get(mastery_level, timedelta(days=1))
         return current_time + interval
     
+    def get_card_progress(self, user_id: int, study_set_id: str, card_id: int) -> Optional[Progress]:
+        """Get a user's progress on one card of a study set, or None if never studied"""
+        result = self.execute_query(
+            """SELECT card_id, mastery_level, times_studied, last_studied, difficulty_history,
+                      next_review_date
+               FROM study_progress WHERE user_id = %s AND study_set_id = %s AND card_id = %s""",
+            (user_id, study_set_id, card_id),
+            fetch='one'
+        )
+        return Progress.from_row(result) if result else None
+    
+    def get_progress_by_set(self, user_id: int) -> Dict[str, Dict]:
+        """Get a user's progress statistics for every study set they have studied, in one query"""
+        query = """
+            SELECT 
+                study_set_id,
+                COUNT(*) as studied,
+                SUM(CASE WHEN mastery_level >= 8 THEN 1 ELSE 0 END) as mastered,
+                SUM(CASE WHEN mastery_level >= 3 AND mastery_level < 8 THEN 1 ELSE 0 END) as learning,
+                SUM(CASE WHEN mastery_level < 3 THEN 1 ELSE 0 END) as difficult
+            FROM study_progress
+            WHERE user_id = %s
+            GROUP BY study_set_id
+        """
+        results = self.execute_query(query, (user_id,), fetch='all')
+        
+        return {
+            row[0]: {
+                'studied': row[1] or 0,
+                'mastered': row[2] or 0,
+                'learning': row[3] or 0,
+                'difficult': row[4] or 0
+            }
+            for row in results or []
+        }
+    
     def get_user_progress(self, user_id: int, study_set_id: str) -> Dict:
         """Get progress statistics for a user on a specific study set"""
         query = """
@@ -366,15 +960,13 @@ class Database:
         """Get public study sets for the library"""
         query = """
             SELECT s.id, s.title, s.description, s.subject, s.created_at,
-                   u.username, COUNT(c.id) as card_count
+                   u.username, {card_count} as card_count
             FROM study_sets s
             JOIN users u ON s.user_id = u.id
-            LEFT JOIN cards c ON s.id = c.study_set_id
             WHERE s.is_public = TRUE
-            GROUP BY s.id, u.username
             ORDER BY s.created_at DESC
             LIMIT %s
-        """
+        """.format(card_count=CARD_COUNT_SQL)
         results = self.execute_query(query, (limit,), fetch='all')
         
         study_sets = []
@@ -403,15 +995,17 @@ class Database:
             WHERE id = %s AND user_id = %s
         """
         self.execute_query(query, (share_code, study_set_id, user_id))
+        share_preview_cache.invalidate_tag(study_set_id)
         return share_code
     
     def get_study_set_by_share_code(self, share_code: str) -> Optional[Dict]:
         """Get study set by share code (only if public or has valid share code)"""
         query = """
-            SELECT s.id, s.user_id, s.title, s.description, s.subject, s.is_public
+            SELECT s.id, s.user_id, s.title, s.description, s.subject, s.is_public,
+                   {card_count} as card_count
             FROM study_sets s
             WHERE s.share_code = %s AND (s.is_public = TRUE OR s.share_code IS NOT NULL)
-        """
+        """.format(card_count=CARD_COUNT_SQL)
         result = self.execute_query(query, (share_code,), fetch='one')
         if result:
             is_public = result[5]
@@ -423,62 +1017,276 @@ class Database:
                 'title': result[2],
                 'description': result[3],
                 'subject': result[4],
-                'is_public': result[5]
+                'is_public': result[5],
+                'card_count': result[6] or 0
             }
         return None
     
-    def get_cards(self, study_set_id: str) -> List[Dict]:
-        """Get all cards for a study set"""
-        query = """
+    def get_share_preview(self, share_code: str, limit: int = 5) -> Optional[Dict]:
+        """Get a shared study set with its first few cards, cached per process
+        
+        Entries are dropped when the set is updated, deleted or gets a new share
+        code; other processes pick up changes once the entry expires.
+        """
+        cache_key = (share_code, limit)
+        preview = share_preview_cache.get(cache_key)
+        if preview is not None:
+            return preview
+        
+        shared_set = self.get_study_set_by_share_code(share_code)
+        if not shared_set:
+            return None
+        
+        shared_set['preview_cards'] = self.get_card_preview(shared_set['id'], limit)
+        share_preview_cache.set(cache_key, shared_set, tag=shared_set['id'])
+        return shared_set
+    
+    def get_card_preview(self, study_set_id: str, limit: int) -> List[Card]:
+        """Get the first cards of a study set without fetching the whole deck"""
+        query = f"""
             SELECT id, term, definition, term_image_url, definition_image_url, card_order
-            FROM cards
-            WHERE study_set_id = %s
-            ORDER BY card_order
+            FROM ({VISIBLE_CARDS_SQL}) visible
+            ORDER BY card_order, id
+            LIMIT %(limit)s
         """
-        results = self.execute_query(query, (study_set_id,), fetch='all')
+        results = self.execute_query(query, {'set_id': study_set_id, 'limit': limit}, fetch='all')
         
-        cards = []
-        for row in results or []:
-            cards.append({
-                'id': row[0],
-                'term': row[1],
-                'definition': row[2],
-                'term_image_url': row[3],
-                'definition_image_url': row[4],
-                'card_order': row[5]
-            })
-        return cards
+        return [Card.from_row(row) for row in results or []]
+    
+    def get_cards(self, study_set_id: str) -> List[Card]:
+        """Get all cards for a study set, including those shared from its source set"""
+        results = self.execute_query(VISIBLE_CARDS_QUERY, {'set_id': study_set_id}, fetch='all')
+        
+        return [Card.from_row(row) for row in results or []]
+    
+    def get_card_window(self, study_set_id: str, after: Tuple[int, int] = None,
+                        limit: int = 50) -> List[Card]:
+        """Get the next `limit` cards of a study set after a (card_order, id) position
+        
+        Keyset pagination: each window starts where the previous one ended, so
+        reading a deck window by window never scans or transfers the cards before it.
+        """
+        after_order, after_id = after if after else (None, None)
+        query = f"""
+            SELECT id, term, definition, term_image_url, definition_image_url, card_order
+            FROM ({VISIBLE_CARDS_SQL}) visible
+            WHERE %(after_order)s::INTEGER IS NULL
+               OR (card_order, id) > (%(after_order)s::INTEGER, %(after_id)s::INTEGER)
+            ORDER BY card_order, id
+            LIMIT %(limit)s
+        """
+        results = self.execute_query(
+            query,
+            {'set_id': study_set_id, 'after_order': after_order, 'after_id': after_id, 'limit': limit},
+            fetch='all'
+        )
+        return [Card.from_row(row) for row in results or []]
+    
+    def get_cards_by_ids(self, study_set_id: str, card_ids: List[int]) -> List[Card]:
+        """Get the given visible cards of a study set, in the order of `card_ids`"""
+        if not card_ids:
+            return []
+        
+        query = f"""
+            SELECT id, term, definition, term_image_url, definition_image_url, card_order
+            FROM ({VISIBLE_CARDS_SQL}) visible
+            WHERE id = ANY(%(card_ids)s)
+        """
+        results = self.execute_query(query, {'set_id': study_set_id, 'card_ids': list(card_ids)}, fetch='all')
+        
+        cards = {row[0]: Card.from_row(row) for row in results or []}
+        return [cards[card_id] for card_id in card_ids if card_id in cards]
+    
+    def get_current_card_ids(self, study_set_id: str, card_ids: List[int]) -> Dict[int, Optional[int]]:
+        """Map card ids to the id each card is visible under in a study set now
+        
+        An edited card is followed through its newer versions (replaced_by), and
+        a copy's own edit of a source card stands in for it. Cards no longer in
+        the set map to None.
+        """
+        if not card_ids:
+            return {}
+        
+        query = f"""
+            WITH RECURSIVE versions(start_id, id) AS (
+                SELECT id, id FROM cards WHERE id = ANY(%(card_ids)s)
+                UNION ALL
+                SELECT versions.start_id, c.replaced_by
+                FROM versions JOIN cards c ON c.id = versions.id
+                WHERE c.replaced_by IS NOT NULL
+            ), candidates(start_id, id) AS (
+                SELECT start_id, id FROM versions
+                UNION ALL
+                SELECT versions.start_id, o.id
+                FROM versions JOIN cards o ON o.source_card_id = versions.id
+                WHERE o.study_set_id = %(set_id)s
+            )
+            SELECT DISTINCT ON (candidates.start_id) candidates.start_id, visible.id
+            FROM candidates JOIN ({VISIBLE_CARDS_SQL}) visible ON visible.id = candidates.id
+            ORDER BY candidates.start_id, visible.id DESC
+        """
+        results = self.execute_query(query, {'set_id': study_set_id, 'card_ids': list(card_ids)}, fetch='all')
+        
+        current = dict.fromkeys(card_ids)
+        current.update({row[0]: row[1] for row in results or []})
+        return current
+    
+    def get_card_ids(self, study_set_id: str) -> List[int]:
+        """Get the ids of a study set's visible cards, in order"""
+        query = f"SELECT id FROM ({VISIBLE_CARDS_SQL}) visible ORDER BY card_order, id"
+        results = self.execute_query(query, {'set_id': study_set_id}, fetch='all')
+        return [row[0] for row in results or []]
+    
+    def get_card_count(self, study_set_id: str) -> int:
+        """Get the number of visible cards in a study set without fetching them"""
+        query = f"SELECT {CARD_COUNT_SQL} FROM study_sets s WHERE s.id = %s"
+        result = self.execute_query(query, (study_set_id,), fetch='one')
+        return (result[0] or 0) if result else 0
     
     def copy_study_set(self, original_set_id: str, new_user_id: int, new_title: str = None) -> str:
-        """Copy a study set to a new user"""
+        """Copy a study set to a new user
+        
+        The copy shares the original's cards instead of duplicating them; a card is
+        only copied into the new set once the copier edits or deletes it.
+        """
         import uuid
         
-        original_set = self.get_study_set(original_set_id)
+        query = """
+            SELECT title, description, subject, source_set_id, synced_at
+            FROM study_sets
+            WHERE id = %s AND is_public = TRUE
+        """
+        original_set = self.execute_query(query, (original_set_id,), fetch='one')
         if not original_set:
             return None
         
+        original_title, description, subject, original_source_id, original_synced_at = original_set
         new_set_id = str(uuid.uuid4())
-        title = new_title or f"{original_set['title']} (Copy)"
+        title = new_title or f"{original_title} (Copy)"
+        now = datetime.now()
         
-        insert_set_query = """
-            INSERT INTO study_sets (id, user_id, title, description, subject, is_public, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        with self.transaction() as cursor:
+            # A copy of a copy shares the root set's cards at the same snapshot and
+            # inherits the intermediate copy's own overrides, new cards and tombstones
+            cursor.execute(
+                """
+                INSERT INTO study_sets (id, user_id, title, description, subject, is_public,
+                                        source_set_id, synced_at, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (new_set_id, new_user_id, title, description, subject, False,
+                 original_source_id or original_set_id,
+                 original_synced_at if original_source_id else now, now, now)
+            )
+            if original_source_id:
+                cursor.execute(
+                    """
+                    INSERT INTO cards (study_set_id, term, definition, term_image_url,
+                                       definition_image_url, card_order, source_card_id, is_deleted, created_at)
+                    SELECT %s, term, definition, term_image_url, definition_image_url,
+                           card_order, source_card_id, is_deleted, %s
+                    FROM cards
+                    WHERE study_set_id = %s
+                    """,
+                    (new_set_id, now, original_set_id)
+                )
+        
+        return new_set_id
+    
+    def sync_copied_set(self, set_id: str, user_id: int) -> Optional[Dict]:
+        """Bring a copied study set up to date with its source set
+        
+        Only cards added, changed or removed upstream since the last sync are read
+        and written, in one transaction. Progress moves to the new version of a
+        changed card; cards the copier edited or deleted keep the copier's version.
+        Returns counts of the applied delta, or None if the set is not a copy.
         """
-        self.execute_query(
-            insert_set_query,
-            (new_set_id, new_user_id, title, original_set['description'], 
-             original_set['subject'], False, datetime.now())
-        )
+        now = datetime.now()
         
-        cards = self.get_cards(original_set_id)
-        for card in cards:
-            self.add_card_to_set(
-                new_set_id, 
-                card['term'], 
-                card['definition'],
-                card['card_order'],
-                card.get('term_image_url'),
-                card.get('definition_image_url')
+        with self.transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT source_set_id, synced_at FROM study_sets
+                WHERE id = %s AND user_id = %s AND source_set_id IS NOT NULL
+                FOR UPDATE
+                """,
+                (set_id, user_id)
             )
+            copy = cursor.fetchone()
+            if not copy:
+                return None
+            
+            source_set_id, synced_at = copy
+            cursor.execute(
+                """
+                SELECT id, replaced_by, created_at, superseded_at, content_hash
+                FROM cards
+                WHERE study_set_id = %s AND created_at <= %s
+                  AND (created_at > %s OR superseded_at > %s)
+                """,
+                (source_set_id, now, synced_at, synced_at)
+            )
+            versions = {}
+            for card_id, replaced_by, created_at, superseded_at, content_hash in cursor.fetchall():
+                if superseded_at is not None and superseded_at > now:
+                    superseded_at = None
+                versions[card_id] = (replaced_by, created_at, superseded_at, content_hash)
+            
+            # Follow each card the copy saw to its current version (None if removed)
+            latest = {}
+            for card_id, (_, created_at, superseded_at, _) in versions.items():
+                if created_at > synced_at or superseded_at is None:
+                    continue
+                current = card_id
+                while current is not None and versions[current][2] is not None:
+                    current = versions[current][0]
+                latest[card_id] = current
+            
+            changed = [(new_id, old_id) for old_id, new_id in latest.items() if new_id is not None]
+            removed = [old_id for old_id, new_id in latest.items() if new_id is None]
+            successors = set(latest.values())
+            added = [card_id for card_id, (_, created_at, superseded_at, _) in versions.items()
+                     if created_at > synced_at and superseded_at is None and card_id not in successors]
+            
+            kept_local = 0
+            if changed:
+                cursor.executemany(
+                    "UPDATE study_progress SET card_id = %s WHERE study_set_id = %s AND card_id = %s",
+                    [(new_id, set_id, old_id) for new_id, old_id in changed]
+                )
+                cursor.executemany(
+                    "UPDATE cards SET source_card_id = %s WHERE study_set_id = %s AND source_card_id = %s",
+                    [(new_id, set_id, old_id) for new_id, old_id in changed]
+                )
+                cursor.execute(
+                    "SELECT COUNT(*) FROM cards WHERE study_set_id = %s AND source_card_id = ANY(%s)",
+                    (set_id, [new_id for new_id, _ in changed])
+                )
+                kept_local = cursor.fetchone()[0]
+            
+            if removed:
+                self._delete_progress(cursor, set_id, removed)
+                cursor.execute(
+                    "DELETE FROM cards WHERE study_set_id = %s AND is_deleted AND source_card_id = ANY(%s)",
+                    (set_id, removed)
+                )
+                # Cards the copier edited survive upstream removal as their own cards
+                cursor.execute(
+                    "UPDATE cards SET source_card_id = NULL WHERE study_set_id = %s AND source_card_id = ANY(%s)",
+                    (set_id, removed)
+                )
+            
+            cursor.execute(
+                "UPDATE study_sets SET synced_at = %s, updated_at = %s WHERE id = %s",
+                (now, now, set_id)
+            )
+            self._collect_superseded_cards(cursor, source_set_id)
         
-        return new_set_id
+        invalidate_set_caches(set_id)
+        
+        return {
+            'added': len(added),
+            'changed': sum(1 for new_id, old_id in changed if versions[new_id][3] != versions[old_id][3]),
+            'removed': len(removed),
+            'kept_local': kept_local
+        }
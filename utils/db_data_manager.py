@@ -1,16 +1,26 @@
 from typing import Dict, List, Optional
 from utils.db import Database
+from utils.deck_cursor import DatabaseDeckSource
+from utils.models import StudySet
 import uuid
 
 class DBDataManager:
-    """Database-backed data manager for study sets and cards"""
+    """Database-backed data manager for study sets and cards
     
-    def __init__(self, user_id: int = None):
-        self.db = Database()
+    Study sets are cached for the lifetime of the session object. A cached set is
+    reused as long as its updated_at in the database still matches, so writes
+    from other tabs are picked up, and this session's own writes update it in place.
+    """
+    
+    def __init__(self, user_id: int = None, db: Database = None):
+        self.db = db or Database()
         self.user_id = user_id
+        self._sets = {}
     
     def set_user(self, user_id: int):
         """Set the current user ID"""
+        if user_id != self.user_id:
+            self._sets = {}
         self.user_id = user_id
     
     def save_study_set(self, set_id: str, study_set: Dict) -> bool:
@@ -37,34 +47,43 @@ class DBDataManager:
                 definition_image_url=card.get('definition_image_url')
             )
         
+        self._sets.pop(set_id, None)
         return True
     
-    def get_study_set(self, set_id: str) -> Optional[Dict]:
+    def get_study_set(self, set_id: str) -> Optional[StudySet]:
         """Get a specific study set"""
+        cached = self._sets.get(set_id)
+        if cached is not None and cached.updated_at == self.db.get_set_version(set_id):
+            return cached
+        
+        return self._fetch_study_set(set_id)
+    
+    def get_study_set_info(self, set_id: str) -> Optional[StudySet]:
+        """Get a study set's details and card count without loading its cards"""
+        cached = self._sets.get(set_id)
+        if cached is not None and cached.updated_at == self.db.get_set_version(set_id):
+            return cached
+        
+        return self.db.get_study_set_summary(set_id, self.user_id, with_card_count=True)
+    
+    def get_deck_source(self, set_id: str) -> DatabaseDeckSource:
+        """Get a source for reading a study set's cards window by window (see DeckCursor)"""
+        return DatabaseDeckSource(self.db, set_id)
+    
+    def _fetch_study_set(self, set_id: str) -> Optional[StudySet]:
+        """Load a study set from the database into the session cache
+        
+        The set is cached as returned, sharing its cards with the process-wide
+        deck cache instead of copying them for this session.
+        """
         study_set = self.db.get_study_set(set_id, self.user_id)
         
         if not study_set:
+            self._sets.pop(set_id, None)
             return None
         
-        formatted_cards = []
-        for card in study_set.get('cards', []):
-            formatted_cards.append({
-                'term': card['term'],
-                'definition': card['definition'],
-                'term_image_url': card.get('term_image_url'),
-                'definition_image_url': card.get('definition_image_url')
-            })
-        
-        return {
-            'id': study_set['id'],
-            'title': study_set['title'],
-            'description': study_set['description'],
-            'subject': study_set['subject'],
-            'privacy': 'Public' if study_set['is_public'] else 'Private',
-            'cards': formatted_cards,
-            'created_date': study_set['created_at'],
-            'card_count': len(formatted_cards)
-        }
+        self._sets[set_id] = study_set
+        return study_set
     
     def get_all_sets(self) -> Dict:
         """Get all study sets for current user"""
@@ -73,27 +92,64 @@ class DBDataManager:
         
         sets = self.db.get_study_sets_by_user(self.user_id)
         
+        # The listing carries every set's updated_at, so only changed sets are reloaded
         result = {}
         for study_set in sets:
-            full_set = self.get_study_set(study_set['id'])
+            full_set = self._sets.get(study_set['id'])
+            if full_set is None or full_set.updated_at != study_set['updated_at']:
+                full_set = self._fetch_study_set(study_set['id'])
             if full_set:
                 result[study_set['id']] = full_set
         
         return result
     
+    def list_study_sets(self) -> Dict[str, StudySet]:
+        """Get all study sets for current user with card counts, without loading their cards"""
+        if not self.user_id:
+            return {}
+        
+        return {study_set.id: study_set for study_set in self.db.get_study_sets_by_user(self.user_id)}
+    
     def delete_study_set(self, set_id: str) -> bool:
         """Delete a study set"""
         if not self.user_id:
             return False
         
+        self._sets.pop(set_id, None)
         return self.db.delete_study_set(set_id, self.user_id)
     
+    def update_card(self, set_id: str, card_id: int, term: str = None, definition: str = None) -> Optional[int]:
+        """Edit a card of one of the user's sets
+        
+        In a copied set the edit goes to the copy's own version of the card, and
+        the set it was copied from is unchanged. Returns the card's id afterwards
+        (a new one when a version is kept for copies, or the card was shared), or
+        None if the card is not in the set.
+        """
+        study_set = self.get_study_set_info(set_id)
+        if not self.user_id or not study_set or study_set.user_id != self.user_id:
+            return None
+        
+        card_id = self.db.update_set_card(set_id, card_id, term=term, definition=definition)
+        self._sets.pop(set_id, None)
+        return card_id
+    
+    def delete_card(self, set_id: str, card_id: int) -> bool:
+        """Remove a card from one of the user's sets (from a copy only, not the set it was copied from)"""
+        study_set = self.get_study_set_info(set_id)
+        if not self.user_id or not study_set or study_set.user_id != self.user_id:
+            return False
+        
+        deleted = self.db.delete_set_card(set_id, card_id)
+        self._sets.pop(set_id, None)
+        return deleted
+    
     def update_study_set(self, set_id: str, updates: Dict) -> bool:
         """Update a study set"""
         if not self.user_id:
             return False
         
-        return self.db.update_study_set(
+        updated = self.db.update_study_set(
             set_id=set_id,
             user_id=self.user_id,
             title=updates.get('title'),
@@ -101,6 +157,33 @@ class DBDataManager:
             subject=updates.get('subject'),
             is_public=updates.get('privacy') == 'Public' if 'privacy' in updates else None
         )
+        
+        cached = self._sets.get(set_id)
+        if cached is not None:
+            for key in ('title', 'description', 'subject'):
+                if updates.get(key) is not None:
+                    setattr(cached, key, updates[key])
+            if updates.get('privacy') is not None:
+                cached.is_public = updates['privacy'] == 'Public'
+            cached.updated_at = self.db.get_set_version(set_id)
+        
+        return updated
+    
+    def sync_study_set(self, set_id: str) -> Optional[Dict]:
+        """Pull upstream changes into a copied study set"""
+        if not self.user_id:
+            return None
+        
+        self._sets.pop(set_id, None)
+        return self.db.sync_copied_set(set_id, self.user_id)
+    
+    def get_item_statistics(self, set_id: str) -> List[Dict]:
+        """Get item analysis of a study set's practice tests, for the set's owner only"""
+        study_set = self.get_study_set_info(set_id)
+        if not self.user_id or not study_set or study_set.user_id != self.user_id:
+            return []
+        
+        return self.db.get_item_statistics(set_id)
     
     def search_study_sets(self, query: str) -> Dict:
         """Search study sets (basic implementation)"""
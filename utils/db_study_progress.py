@@ -1,18 +1,67 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from utils.db import Database
+from utils.models import Progress
 from datetime import datetime
 
 class DBStudyProgress:
-    """Database-backed study progress tracker"""
+    """Database-backed study progress tracker
     
-    def __init__(self, user_id: int = None):
-        self.db = Database()
+    Progress aggregates are cached for the lifetime of the session object and
+    revalidated against the user's progress_updated_at; ratings made through
+    this object update the cached aggregates in place.
+    """
+    
+    def __init__(self, user_id: int = None, db: Database = None):
+        self.db = db or Database()
         self.user_id = user_id
+        self._cache = {}
+        self._cache_version = None
     
     def set_user(self, user_id: int):
         """Set the current user ID"""
+        if user_id != self.user_id:
+            self._cache = {}
+            self._cache_version = None
         self.user_id = user_id
     
+    def _fresh_cache(self) -> Dict:
+        """Get the aggregate cache, emptied if progress changed elsewhere (e.g. another tab)"""
+        version = self.db.get_progress_version(self.user_id)
+        if version != self._cache_version:
+            self._cache = {}
+            self._cache_version = version
+        return self._cache
+    
+    def _record_rating(self, set_id: str, old_mastery: Optional[int], new_mastery: int):
+        """Apply a rating this session just wrote to the cached aggregates"""
+        def bucket(mastery):
+            if mastery >= 8:
+                return 'mastered'
+            if mastery >= 3:
+                return 'learning'
+            return 'difficult'
+        
+        # A set studied for the first time is not in the all-sets result yet
+        if set_id not in self._cache.get(('all_sets',), {set_id: None}):
+            del self._cache[('all_sets',)]
+        
+        set_progress = self._cache.get(('set', set_id))
+        if set_progress is not None:
+            if old_mastery is None:
+                set_progress['studied'] += 1
+            else:
+                set_progress[bucket(old_mastery)] -= 1
+            set_progress[bucket(new_mastery)] += 1
+        
+        for total in ('mastered', 'learning'):
+            if ('total', total) in self._cache:
+                if old_mastery is not None and bucket(old_mastery) == total:
+                    self._cache[('total', total)] -= 1
+                if bucket(new_mastery) == total:
+                    self._cache[('total', total)] += 1
+        
+        self._cache_version = self.db.get_progress_version(self.user_id)
+    
     def update_card_difficulty(self, set_id: str, card_index: int, difficulty: str) -> bool:
         """Update the difficulty rating for a specific card"""
         if not self.user_id:
@@ -31,8 +80,8 @@ class DBStudyProgress:
         }
         
         current_progress = self.db.execute_query(
-            "SELECT mastery_level FROM study_progress WHERE user_id = %s AND card_id = %s",
-            (self.user_id, card_id),
+            "SELECT mastery_level FROM study_progress WHERE user_id = %s AND study_set_id = %s AND card_id = %s",
+            (self.user_id, set_id, card_id),
             fetch='one'
         )
         
@@ -44,63 +93,84 @@ class DBStudyProgress:
         change = mastery_level_map.get(difficulty, 0)
         new_mastery = max(0, min(10, current_mastery + change))
         
-        return self.db.update_study_progress(
+        # Only trust the cached aggregates if nothing else changed them since they were read
+        cache_current = self._cache_version == self.db.get_progress_version(self.user_id)
+        
+        updated = self.db.update_study_progress(
             user_id=self.user_id,
             card_id=card_id,
             study_set_id=set_id,
             difficulty=difficulty,
             mastery_level=new_mastery
         )
+        
+        if cache_current:
+            self._record_rating(set_id, current_mastery if current_progress else None, new_mastery)
+        return updated
     
-    def get_card_progress(self, set_id: str, card_index: int) -> Dict:
-        """Get progress data for a specific card"""
-        if not self.user_id:
-            return {
-                'difficulty_history': [],
-                'times_studied': 0,
-                'last_studied': None,
-                'mastery_level': 0
-            }
+    def apply_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of (card_index, difficulty) ratings in one write"""
+        if not self.user_id or not ratings:
+            return False
         
         study_set = self.db.get_study_set(set_id, self.user_id)
-        if not study_set or card_index >= len(study_set['cards']):
-            return {
-                'difficulty_history': [],
-                'times_studied': 0,
-                'last_studied': None,
-                'mastery_level': 0
-            }
+        if not study_set:
+            return False
         
-        card_id = study_set['cards'][card_index]['id']
+        cards = study_set['cards']
+        card_ratings = [(cards[card_index]['id'], difficulty)
+                        for card_index, difficulty in ratings if 0 <= card_index < len(cards)]
         
-        progress = self.db.execute_query(
-            """SELECT mastery_level, times_studied, last_studied, difficulty_history 
-               FROM study_progress WHERE user_id = %s AND card_id = %s""",
-            (self.user_id, card_id),
-            fetch='one'
+        updated = self.db.update_study_progress_batch(self.user_id, set_id, card_ratings)
+        self._cache = {}
+        self._cache_version = None
+        return updated
+    
+    def apply_card_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of (card_id, difficulty) ratings in one write
+        
+        Card ids are the keys of cards read through a DeckCursor, so the set's
+        cards don't need to be loaded to map positions to ids.
+        """
+        if not self.user_id or not ratings:
+            return False
+        
+        updated = self.db.update_study_progress_batch(self.user_id, set_id, ratings)
+        self._cache = {}
+        self._cache_version = None
+        return updated
+    
+    def record_test_results(self, set_id: str, attempt: Dict, ratings: List[Tuple[int, str]]) -> bool:
+        """Save a practice test attempt and apply its (card_id, difficulty) ratings, once per attempt id
+        
+        attempt has the id, started_at, score and responses (see
+        Database.record_test_attempt). Returns False if the attempt was already
+        recorded, e.g. on a rerun.
+        """
+        if not self.user_id:
+            return False
+        
+        recorded = self.db.record_test_attempt(
+            attempt['id'], self.user_id, set_id, ratings,
+            started_at=attempt.get('started_at'), score=attempt.get('score'),
+            responses=attempt.get('responses', ())
         )
+        if recorded:
+            self._cache = {}
+            self._cache_version = None
+        return recorded
+    
+    def get_card_progress(self, set_id: str, card_index: int) -> Progress:
+        """Get progress data for a specific card"""
+        if not self.user_id:
+            return Progress()
         
-        if progress:
-            import json
-            difficulty_history = progress[3]
-            if isinstance(difficulty_history, str):
-                difficulty_history = json.loads(difficulty_history)
-            elif not isinstance(difficulty_history, list):
-                difficulty_history = []
-            
-            return {
-                'mastery_level': progress[0] or 0,
-                'times_studied': progress[1] or 0,
-                'last_studied': progress[2].isoformat() if progress[2] else None,
-                'difficulty_history': difficulty_history
-            }
+        study_set = self.db.get_study_set(set_id, self.user_id)
+        if not study_set or card_index >= len(study_set.cards):
+            return Progress()
         
-        return {
-            'difficulty_history': [],
-            'times_studied': 0,
-            'last_studied': None,
-            'mastery_level': 0
-        }
+        card_id = study_set.cards[card_index].id
+        return self.db.get_card_progress(self.user_id, set_id, card_id) or Progress(card_id)
     
     def get_set_progress(self, set_id: str) -> Dict:
         """Get overall progress for a study set"""
@@ -112,7 +182,25 @@ class DBStudyProgress:
                 'difficult': 0
             }
         
-        return self.db.get_user_progress(self.user_id, set_id)
+        cache = self._fresh_cache()
+        if ('set', set_id) not in cache:
+            cache[('set', set_id)] = self.db.get_user_progress(self.user_id, set_id)
+        return dict(cache[('set', set_id)])
+    
+    def get_all_set_progress(self) -> Dict[str, Dict]:
+        """Get overall progress for every study set with progress, in one query
+        
+        Sets that were never studied are missing from the result.
+        """
+        if not self.user_id:
+            return {}
+        
+        cache = self._fresh_cache()
+        if ('all_sets',) not in cache:
+            cache[('all_sets',)] = self.db.get_progress_by_set(self.user_id)
+            for set_id, set_progress in cache[('all_sets',)].items():
+                cache[('set', set_id)] = set_progress
+        return {set_id: dict(set_progress) for set_id, set_progress in cache[('all_sets',)].items()}
     
     def get_cards_by_difficulty(self, set_id: str) -> Dict[str, List[int]]:
         """Get card indices grouped by difficulty level"""
@@ -178,6 +266,10 @@ class DBStudyProgress:
         if not self.user_id:
             return 0
         
+        cache = self._fresh_cache()
+        if ('total', 'mastered') in cache:
+            return cache[('total', 'mastered')]
+        
         result = self.db.execute_query(
             """SELECT COUNT(*) FROM study_progress 
                WHERE user_id = %s AND mastery_level >= 8""",
@@ -185,13 +277,18 @@ class DBStudyProgress:
             fetch='one'
         )
         
-        return result[0] if result else 0
+        cache[('total', 'mastered')] = result[0] if result else 0
+        return cache[('total', 'mastered')]
     
     def get_total_learning(self) -> int:
         """Get total number of cards being learned across all sets"""
         if not self.user_id:
             return 0
         
+        cache = self._fresh_cache()
+        if ('total', 'learning') in cache:
+            return cache[('total', 'learning')]
+        
         result = self.db.execute_query(
             """SELECT COUNT(*) FROM study_progress 
                WHERE user_id = %s AND mastery_level >= 3 AND mastery_level < 8""",
@@ -199,7 +296,8 @@ class DBStudyProgress:
             fetch='one'
         )
         
-        return result[0] if result else 0
+        cache[('total', 'learning')] = result[0] if result else 0
+        return cache[('total', 'learning')]
     
     def get_study_statistics(self) -> Dict:
         """Get comprehensive study statistics"""
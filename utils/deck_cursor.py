@@ -0,0 +1,283 @@
+import random
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from utils.card_store import card_store
+from utils.models import Card
+
+# Shared by every session of this process; fetching a window is I/O bound
+_prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="deck-prefetch")
+
+class DatabaseDeckSource:
+    """Cards of a database study set, read window by window with keyset pagination
+    
+    Card keys are card ids. Cards are returned from the process-wide card store,
+    so sessions reading the same set share them.
+    """
+    
+    def __init__(self, db, set_id: str):
+        self.db = db
+        self.set_id = set_id
+    
+    def count(self) -> int:
+        return self.db.get_card_count(self.set_id)
+    
+    def cards_after(self, anchor: Optional[Any], limit: int) -> List[Card]:
+        version = self.db.get_set_version(self.set_id)
+        cards = self.db.get_card_window(self.set_id, anchor, limit)
+        return card_store.put_many(self.set_id, version, cards)
+    
+    def anchor(self, card: Card) -> Any:
+        return (card.card_order, card.key)
+    
+    def card_keys(self) -> List[int]:
+        return self.db.get_card_ids(self.set_id)
+    
+    def cards_by_keys(self, keys: List[int]) -> List[Card]:
+        version = self.db.get_set_version(self.set_id)
+        records = card_store.get_many(self.set_id, version, keys)
+        
+        missing = [key for key in keys if key not in records]
+        if missing:
+            for record in card_store.put_many(self.set_id, version,
+                                              self.db.get_cards_by_ids(self.set_id, missing)):
+                records[record.key] = record
+        
+        return [records[key] for key in keys if key in records]
+    
+    def current_keys(self, keys: List[int]) -> Dict[int, Optional[int]]:
+        """Map keys read earlier to the key each card has now, or None if it was removed"""
+        return self.db.get_current_card_ids(self.set_id, keys)
+
+class ListDeckSource:
+    """Cards of a study set that is already in memory (JSON storage)
+    
+    Card keys are positions in the set, matching how StudyProgress stores them.
+    """
+    
+    def __init__(self, cards: List[Dict]):
+        self.cards = cards
+    
+    def count(self) -> int:
+        return len(self.cards)
+    
+    def cards_after(self, anchor: Optional[int], limit: int) -> List[Card]:
+        start = 0 if anchor is None else anchor + 1
+        return self.cards_by_keys(range(start, min(start + limit, len(self.cards))))
+    
+    def anchor(self, card: Card) -> int:
+        return card.key
+    
+    def card_keys(self) -> List[int]:
+        return list(range(len(self.cards)))
+    
+    def current_keys(self, keys: List[int]) -> Dict[int, Optional[int]]:
+        return {key: key if 0 <= key < len(self.cards) else None for key in keys}
+    
+    def cards_by_keys(self, keys) -> List[Card]:
+        return [Card.from_dict(key, self.cards[key], card_order=key)
+                for key in keys if 0 <= key < len(self.cards)]
+
+class SQLiteDeckSource:
+    """Cards of a study set in the guest SQLite database, read window by window
+    
+    Card keys are positions in the set, as in JSON storage.
+    """
+    
+    # SQLite's default limit on parameters per statement is 999
+    MAX_PARAMS = 900
+    
+    def __init__(self, db, set_id: str):
+        self.db = db
+        self.set_id = set_id
+    
+    def count(self) -> int:
+        result = self.db.execute_query("SELECT card_count FROM study_sets WHERE id = ?", (self.set_id,), fetch='one')
+        return result[0] if result else 0
+    
+    def cards_after(self, anchor: Optional[int], limit: int) -> List[Card]:
+        rows = self.db.execute_query(
+            """SELECT position, term, definition, term_image_url, definition_image_url, position
+               FROM cards WHERE study_set_id = ? AND position > ?
+               ORDER BY position LIMIT ?""",
+            (self.set_id, -1 if anchor is None else anchor, limit),
+            fetch='all'
+        )
+        return [Card.from_row(row) for row in rows]
+    
+    def anchor(self, card: Card) -> int:
+        return card.key
+    
+    def card_keys(self) -> List[int]:
+        return list(range(self.count()))
+    
+    def current_keys(self, keys: List[int]) -> Dict[int, Optional[int]]:
+        count = self.count()
+        return {key: key if 0 <= key < count else None for key in keys}
+    
+    def cards_by_keys(self, keys) -> List[Card]:
+        keys = list(keys)
+        cards = {}
+        for start in range(0, len(keys), self.MAX_PARAMS):
+            chunk = keys[start:start + self.MAX_PARAMS]
+            rows = self.db.execute_query(
+                f"""SELECT position, term, definition, term_image_url, definition_image_url, position
+                    FROM cards WHERE study_set_id = ? AND position IN ({','.join('?' * len(chunk))})""",
+                (self.set_id, *chunk),
+                fetch='all'
+            )
+            for row in rows:
+                cards[row[0]] = Card.from_row(row)
+        return [cards[key] for key in keys if key in cards]
+
+class DeckCursor:
+    """Position in a study set that only keeps a window of its cards in memory
+    
+    In set order, windows are fetched with keyset pagination, remembering the
+    key each window starts after so earlier windows can be fetched again. Once
+    shuffled or restricted to some cards, the deck order is kept as a compact
+    array of card keys instead of the cards themselves. The window after the
+    current one is fetched in the background before the learner reaches it.
+    
+    Cards are Cards; a card's key identifies it to the progress tracker's
+    apply_card_ratings, so session state only needs to keep keys.
+    """
+    
+    def __init__(self, source, window_size: int = 50, prefetch_margin: int = 10):
+        self.source = source
+        self.window_size = window_size
+        self.prefetch_margin = prefetch_margin
+        self.position = 0
+        self.generation = 0
+        self.shuffled = False
+        self._total = source.count()
+        self._order = None
+        self._reset_windows()
+    
+    def __len__(self) -> int:
+        return len(self._order) if self._order is not None else self._total
+    
+    @property
+    def window_start(self) -> int:
+        """Position of the first card of the current window"""
+        return self.position - self.position % self.window_size
+    
+    def current(self) -> Optional[Dict]:
+        """Get the card at the current position"""
+        window = self._window_at(self.position // self.window_size)
+        offset = self.position % self.window_size
+        if offset >= len(window):
+            return None
+        
+        if offset >= len(window) - self.prefetch_margin:
+            self._start_prefetch(self.position // self.window_size + 1)
+        return window[offset]
+    
+    def window(self) -> List[Dict]:
+        """Get the cards of the current window, prefetching the next one"""
+        window_index = self.position // self.window_size
+        window = self._window_at(window_index)
+        self._start_prefetch(window_index + 1)
+        return window
+    
+    def seek(self, position: int):
+        """Move to a position in the deck"""
+        self.position = max(0, min(position, len(self) - 1))
+    
+    def shuffle(self):
+        """Visit the current cards in a new random order, starting over"""
+        order = self._order if self._order is not None else array('q', self.source.card_keys())
+        random.shuffle(order)
+        self._set_order(order)
+        self.shuffled = True
+    
+    def restrict(self, keys: List[int]):
+        """Visit only the given cards, in the given order"""
+        self._set_order(array('q', keys))
+    
+    def replace(self, key: int, new_key: Optional[int] = None):
+        """Refer to an edited card by its new key, or drop a removed card (new_key None),
+        staying at the same position"""
+        if self._order is not None:
+            self._order = array('q', (new_key if k == key else k for k in self._order
+                                      if k != key or new_key is not None))
+        else:
+            self._total = self.source.count()
+        self.position = max(0, min(self.position, len(self) - 1))
+        self.generation += 1
+        self._reset_windows()
+    
+    def reset(self):
+        """Go back to every card of the set in set order"""
+        self._total = self.source.count()
+        self._order = None
+        self.shuffled = False
+        self.position = 0
+        self.generation += 1
+        self._reset_windows()
+    
+    def _set_order(self, order: array):
+        self._order = order
+        self.position = 0
+        self.generation += 1
+        self._reset_windows()
+    
+    def _reset_windows(self):
+        # _anchors[i] is the key window i starts after (None: the start of the set)
+        self._anchors = [None]
+        self._window_index = None
+        self._window = []
+        self._prefetch = None
+    
+    def _window_at(self, window_index: int) -> List[Dict]:
+        if window_index == self._window_index:
+            return self._window
+        
+        if self._prefetch is not None and self._prefetch[0] == window_index:
+            cards = self._prefetch[1].result()
+        else:
+            cards = self._fetch(window_index)
+        self._prefetch = None
+        
+        self._remember_anchor(window_index, cards)
+        self._window_index = window_index
+        self._window = cards
+        return cards
+    
+    def _fetch(self, window_index: int) -> List[Dict]:
+        if self._order is not None:
+            start = window_index * self.window_size
+            return self.source.cards_by_keys(list(self._order[start:start + self.window_size]))
+        
+        # Walk forward from the closest window whose start is known
+        index = min(window_index, len(self._anchors) - 1)
+        cards = self.source.cards_after(self._anchors[index], self.window_size)
+        while index < window_index and len(cards) == self.window_size:
+            self._remember_anchor(index, cards)
+            index += 1
+            cards = self.source.cards_after(self._anchors[index], self.window_size)
+        return cards if index == window_index else []
+    
+    def _remember_anchor(self, window_index: int, cards: List[Dict]):
+        if (self._order is None and window_index == len(self._anchors) - 1
+                and len(cards) == self.window_size):
+            self._anchors.append(self.source.anchor(cards[-1]))
+    
+    def _start_prefetch(self, window_index: int):
+        if window_index * self.window_size >= len(self):
+            return
+        if self._prefetch is not None and self._prefetch[0] == window_index:
+            return
+        
+        if self._order is not None:
+            start = window_index * self.window_size
+            future: Future = _prefetcher.submit(
+                self.source.cards_by_keys, list(self._order[start:start + self.window_size])
+            )
+        elif window_index < len(self._anchors):
+            future = _prefetcher.submit(
+                self.source.cards_after, self._anchors[window_index], self.window_size
+            )
+        else:
+            return
+        self._prefetch = (window_index, future)
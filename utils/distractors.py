@@ -0,0 +1,195 @@
+import importlib.util
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, Hashable, List, Optional
+from utils.cache import LRUCache
+from utils.models import Card
+
+# Length of the character n-grams definitions are compared by
+NGRAM = 3
+
+# Nearest definitions a question's distractors are drawn from, so repeated tests vary
+NEAREST_POOL = 8
+
+# N-grams in more of the deck than this share say little about similarity and are
+# skipped when querying (their postings would be most of the work)
+MAX_DOCUMENT_SHARE = 0.1
+
+# Cards read per query while indexing a deck
+INDEX_BATCH = 5000
+
+# Similar distractors need NumPy; without it they are drawn at random
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+logger = logging.getLogger(__name__)
+logger.info("Distractors: %s", "nearest definitions (TF-IDF)" if HAS_NUMPY else "random (NumPy is not installed)")
+
+def _normalize(text: str) -> str:
+    return ' '.join((text or '').casefold().split())
+
+def _ngrams(text: str) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + NGRAM] for i in range(max(1, len(padded) - NGRAM + 1)))
+
+def _read_deck(source) -> List[Card]:
+    """Read every card of a deck in set order, a batch at a time"""
+    cards = []
+    anchor = None
+    while True:
+        batch = source.cards_after(anchor, INDEX_BATCH)
+        cards.extend(batch)
+        if len(batch) < INDEX_BATCH:
+            return cards
+        anchor = source.anchor(batch[-1])
+
+class SimilarityIndex:
+    """TF-IDF vectors of a deck's definitions over character n-grams, for finding
+    the definitions most like a given card's
+    
+    Vectors are L2-normalized and kept as NumPy arrays in both row (card) and
+    column (n-gram) order, so a query multiplies one card's few n-grams against
+    their postings and takes the top k with argpartition. Cards with the same
+    definition (case and spacing aside) are never offered as each other's
+    distractors.
+    """
+    
+    def __init__(self, cards: List[Card]):
+        import numpy as np
+        
+        self._np = np
+        self.keys = np.array([card.key for card in cards], dtype=np.int64)
+        self._positions = {card.key: position for position, card in enumerate(cards)}
+        
+        vocabulary: Dict[str, int] = {}
+        definitions: Dict[str, int] = {}
+        definition_ids = []
+        rows, columns, counts = [], [], []
+        for position, card in enumerate(cards):
+            text = _normalize(card.definition)
+            definition_ids.append(definitions.setdefault(text, len(definitions)))
+            for gram, count in _ngrams(text).items():
+                rows.append(position)
+                columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+                counts.append(count)
+        
+        self.definition_ids = np.array(definition_ids, dtype=np.int32)
+        rows = np.array(rows, dtype=np.int32)
+        columns = np.array(columns, dtype=np.int32)
+        
+        # Smoothed inverse document frequency, then unit length per card
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log((1 + len(cards)) / (1 + document_frequency)) + 1
+        weights = np.array(counts, dtype=np.float32) * idf[columns].astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(cards)))
+        weights /= np.maximum(norms[rows], 1e-12).astype(np.float32)
+        
+        # Row order: the entries were appended card by card
+        self._row_pointers = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(cards)))))
+        self._row_columns = columns
+        self._row_weights = weights
+        
+        # Column order: the postings of each n-gram
+        order = np.argsort(columns, kind='stable')
+        self._column_pointers = np.concatenate(([0], np.cumsum(document_frequency)))
+        self._column_rows = rows[order]
+        self._column_weights = weights[order]
+        self._informative = document_frequency <= max(2, MAX_DOCUMENT_SHARE * len(cards))
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.keys, self.definition_ids, self._row_pointers, self._row_columns, self._row_weights,
+            self._column_pointers, self._column_rows, self._column_weights, self._informative
+        ))
+    
+    def nearest(self, key: int, k: int) -> List[int]:
+        """Get the keys of up to k cards whose definitions are most like this card's,
+        most similar first, each with a different definition
+        
+        Cards sharing no n-gram with this one are not returned.
+        """
+        np = self._np
+        position = self._positions.get(key)
+        if position is None:
+            return []
+        
+        start, end = self._row_pointers[position], self._row_pointers[position + 1]
+        columns = self._row_columns[start:end]
+        weights = self._row_weights[start:end]
+        informative = self._informative[columns]
+        if informative.any():
+            columns, weights = columns[informative], weights[informative]
+        
+        postings = [slice(self._column_pointers[c], self._column_pointers[c + 1]) for c in columns]
+        matched_rows = np.concatenate([self._column_rows[s] for s in postings])
+        matched_weights = np.concatenate([self._column_weights[s] * w for s, w in zip(postings, weights)])
+        scores = np.bincount(matched_rows, weights=matched_weights, minlength=len(self.keys))
+        scores[self.definition_ids == self.definition_ids[position]] = 0
+        
+        # More than k candidates, as several may share a definition
+        candidates = min(len(scores), 4 * k)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        
+        nearest, seen = [], set()
+        for candidate in top:
+            if scores[candidate] <= 0 or len(nearest) == k:
+                break
+            if self.definition_ids[candidate] not in seen:
+                seen.add(self.definition_ids[candidate])
+                nearest.append(int(self.keys[candidate]))
+        return nearest
+
+class DistractorEngine:
+    """Finds distractor candidates among the definitions nearest the answer's"""
+    
+    def __init__(self, index: SimilarityIndex, pool: int = NEAREST_POOL):
+        self.index = index
+        self.pool = pool
+    
+    def candidates(self, key: int) -> List[int]:
+        """Get the keys of the cards with the nearest definitions; a question's
+        distractors are drawn from them, so repeated tests vary"""
+        return self.index.nearest(key, self.pool)
+
+# Similarity indexes of database decks, shared by every session; sized in bytes
+_similarity_indexes = LRUCache(maxsize=256 * 1024 * 1024, sizeof=lambda index: index.nbytes)
+
+# Locks of indexes being built, so sessions starting tests on a deck at once
+# wait for one build instead of each building the same index
+_building: Dict[Hashable, threading.Lock] = {}
+_building_lock = threading.Lock()
+
+def get_distractor_engine(source, set_id: str, version: Optional[Hashable] = None) -> Optional[DistractorEngine]:
+    """Get a distractor engine for a deck, indexing it once per version (its updated_at)
+    
+    Returns None when NumPy is not installed, in which case distractors are drawn
+    at random. Decks without a version (JSON storage) are indexed on every call.
+    """
+    if not HAS_NUMPY:
+        return None
+    
+    if version is None:
+        return DistractorEngine(SimilarityIndex(_read_deck(source)))
+    
+    key = (set_id, version)
+    index = _similarity_indexes.get(key)
+    if index is None:
+        with _building_lock:
+            build_lock = _building.setdefault(key, threading.Lock())
+        with build_lock:
+            index = _similarity_indexes.get(key)
+            if index is None:
+                started = time.perf_counter()
+                index = SimilarityIndex(_read_deck(source))
+                _similarity_indexes.set(key, index, tag=set_id)
+                logger.debug("Indexed %d cards of set %s for distractors in %.2fs",
+                             len(index), set_id, time.perf_counter() - started)
+        with _building_lock:
+            _building.pop(key, None)
+    return DistractorEngine(index)
@@ -0,0 +1,42 @@
+import os
+from typing import Dict, List, Optional
+import streamlit.components.v1 as components
+
+_FRONTEND_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "components", "flashcards"
+)
+
+_flashcards = components.declare_component("flashcards", path=_FRONTEND_DIR)
+
+def flashcard_deck(cards: List[Dict], deck_key: str, acknowledged: Optional[Dict] = None,
+                   batch_size: int = 10, flush_seconds: int = 15, key: str = None) -> Optional[Dict]:
+    """Render flashcards that flip, navigate and shuffle entirely in the browser
+    
+    Args:
+        cards: Window of cards as {'key', 'term', 'definition'} dicts, where
+            key is the card's DeckCursor key
+        deck_key: Changes whenever a different window of cards is sent, which
+            resets the browser-side session
+        acknowledged: {'session', 'seq'} of the last rating applied; the browser
+            stops resending that session's ratings up to seq
+        batch_size: Number of ratings collected before they are sent back
+        flush_seconds: Pending ratings are also sent back at this interval
+    
+    Returns:
+        The latest batch sent back, {'session', 'batch_id', 'ratings':
+        [{'seq', 'deck', 'key', 'difficulty'}], 'done'}, or None before the
+        first one. Each rating's deck is the deck_key of the window it was made
+        in, which is not always the current one. A batch holds every rating not acknowledged when it was sent, so it
+        repeats ratings of earlier batches, and the same batch is returned again
+        on later reruns; callers should apply only ratings whose seq is past the
+        last one they applied for that session, and acknowledge it.
+    """
+    return _flashcards(
+        cards=cards,
+        deck_key=deck_key,
+        acknowledged=acknowledged,
+        batch_size=batch_size,
+        flush_seconds=flush_seconds,
+        key=key,
+        default=None
+    )
@@ -0,0 +1,140 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+from utils.cache import LRUCache
+
+# Share of the expected answer's words a written answer must contain to count as correct
+PASS_THRESHOLD = 0.6
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the to was were
+which with this these those their them they he she his her you your i we our not but
+""".split())
+
+_WORD = re.compile(r"[^\W_]+")
+
+# Suffixes stripped by the stemmer, longest first, with what replaces them
+_SUFFIXES = (('ies', 'y'), ('ing', ''), ('ed', ''), ('es', ''), ('ly', ''), ('s', ''))
+
+def _stem(word: str) -> str:
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+def _typos_allowed(word: str) -> int:
+    """Edits tolerated in a word of this length: none for short words"""
+    if len(word) <= 3:
+        return 0
+    return 1 if len(word) <= 6 else 2
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """Whether the edit distance between a and b is at most limit, giving up early"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+class WrittenAnswerGrader:
+    """Grades written answers by the share of the expected answer's words they contain
+    
+    Words are compared after folding case, dropping punctuation and stopwords
+    and stemming, and a word with a small typo (edit distance 1 or 2 depending
+    on its length) still counts. The expected answer of each card is tokenized
+    once and cached by its text, so an edited definition is tokenized again
+    and an unchanged one never is. Grading a batch stems each distinct word
+    once across its definitions and answers, and compares each distinct pair
+    of words once, however many answers contain it.
+    """
+    
+    def __init__(self, maxsize: int = 100000):
+        self._expected = LRUCache(maxsize=maxsize)
+    
+    def tokens(self, text: str, stems: Dict[str, str] = None) -> FrozenSet[str]:
+        """Normalized, stemmed words of a text, without stopwords unless it has nothing else
+        
+        stems, if given, holds the stem of each word seen so far and is shared
+        by the texts of a batch.
+        """
+        words = _WORD.findall((text or '').casefold())
+        content = [word for word in words if word not in STOPWORDS] or words
+        if stems is None:
+            return frozenset(_stem(word) for word in content)
+        
+        tokens = set()
+        for word in content:
+            stem = stems.get(word)
+            if stem is None:
+                stem = stems[word] = _stem(word)
+            tokens.add(stem)
+        return frozenset(tokens)
+    
+    def expected_tokens(self, definition: str) -> FrozenSet[str]:
+        tokens = self._expected.get(definition)
+        if tokens is None:
+            tokens = self.tokens(definition)
+            self._expected.set(definition, tokens)
+        return tokens
+    
+    def grade(self, definition: str, answer: str) -> Tuple[float, bool]:
+        """Grade one answer; returns (similarity, is_correct)"""
+        return self.grade_batch([(definition, answer)])[0]
+    
+    def grade_batch(self, answers: Iterable[Tuple[str, str]]) -> List[Tuple[float, bool]]:
+        """Grade (expected definition, written answer) pairs, e.g. a whole submitted test
+        
+        Returns (similarity, is_correct) for each pair, in order.
+        """
+        answers = list(answers)
+        stems: Dict[str, str] = {}
+        expected_tokens: Dict[str, FrozenSet[str]] = {}
+        answer_tokens: Dict[str, FrozenSet[str]] = {}
+        close_words: Dict[Tuple[str, str], bool] = {}
+        grades = []
+        
+        # Definitions not cached yet are tokenized together first
+        for definition in dict.fromkeys(definition for definition, _ in answers):
+            tokens = self._expected.get(definition)
+            if tokens is None:
+                tokens = self.tokens(definition, stems)
+                self._expected.set(definition, tokens)
+            expected_tokens[definition] = tokens
+        
+        for definition, answer in answers:
+            expected = expected_tokens[definition]
+            given = answer_tokens.get(answer)
+            if given is None:
+                given = answer_tokens[answer] = self.tokens(answer, stems)
+            
+            if not expected:
+                grades.append((0.0, False))
+                continue
+            
+            matched = len(expected & given)
+            for word in expected - given:
+                limit = _typos_allowed(word)
+                if not limit:
+                    continue
+                for candidate in given:
+                    pair = (word, candidate)
+                    close = close_words.get(pair)
+                    if close is None:
+                        close = close_words[pair] = _within_distance(word, candidate, limit)
+                    if close:
+                        matched += 1
+                        break
+            
+            similarity = matched / len(expected)
+            grades.append((similarity, similarity >= PASS_THRESHOLD))
+        
+        return grades
+
+# Shared by every session; expected answers are the same for everyone taking a set's tests
+grader = WrittenAnswerGrader()
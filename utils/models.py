@@ -0,0 +1,194 @@
+import json
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Card strings up to this length are shared between cards; longer ones (most
+# definitions) rarely repeat
+SHARED_STRING_LENGTH = 128
+
+# Shared strings kept before the pool is emptied and starts over, so it stays
+# bounded (at most 4M characters) however many cards are ever loaded; a string
+# dropped from it is freed with the last card using it
+SHARED_STRINGS = 32768
+
+# A plain dict, as it is read for every row built: threads racing on a new
+# string at worst keep two equal copies of it
+_shared_strings: Dict[str, str] = {}
+
+def _share(value: Optional[str]) -> Optional[str]:
+    """The pooled copy of a short string, e.g. a term or image URL repeated in copies of a set"""
+    if not isinstance(value, str) or len(value) > SHARED_STRING_LENGTH:
+        return value
+    shared = _shared_strings.get(value)
+    if shared is None:
+        if len(_shared_strings) >= SHARED_STRINGS:
+            _shared_strings.clear()
+        shared = _shared_strings.setdefault(value, value)
+    return shared
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value is not None and hasattr(value, 'isoformat') else value
+
+class Model:
+    """Base for compact row models built straight from database rows
+    
+    Models use __slots__ instead of a per-object dict, and offer a read-only
+    dict view (`model['field']`, `model.get('field')`, `to_dict()`) with the
+    same keys the JSON backend uses, so pages work with either backend.
+    """
+    
+    __slots__ = ()
+    _dict_fields: Tuple[str, ...] = ()
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._dict_fields:
+            raise KeyError(name)
+        return getattr(self, name)
+    
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default) if name in self._dict_fields else default
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._dict_fields
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self._dict_fields
+    
+    def to_dict(self) -> Dict:
+        """Plain dict copy, e.g. for JSON storage"""
+        return {name: getattr(self, name) for name in self._dict_fields}
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Card(Model):
+    """A card, shared read-only between sessions
+    
+    Short strings are pooled, so the same term or image URL appearing in
+    several sets or copies is held once. In the database a card's key is its id; cards
+    of a JSON study set use their position as id.
+    """
+    
+    __slots__ = ('id', 'term', 'definition', 'term_image_url', 'definition_image_url', 'card_order')
+    _dict_fields = ('id', 'key', 'term', 'definition', 'term_image_url', 'definition_image_url',
+                    'card_order')
+    
+    def __init__(self, id: int, term: str, definition: str, term_image_url: str = None,
+                 definition_image_url: str = None, card_order: int = 0):
+        self.id = id
+        self.term = _share(term)
+        self.definition = _share(definition)
+        self.term_image_url = _share(term_image_url)
+        self.definition_image_url = _share(definition_image_url)
+        self.card_order = card_order
+    
+    @property
+    def key(self) -> int:
+        return self.id
+    
+    @classmethod
+    def from_row(cls, row: Sequence) -> "Card":
+        """Build from (id, term, definition, term_image_url, definition_image_url, card_order)"""
+        return cls(*row)
+    
+    @classmethod
+    def from_dict(cls, id: int, card: Dict, card_order: int = None) -> "Card":
+        """Build from a JSON backend card dict"""
+        return cls(id, card['term'], card['definition'], card.get('term_image_url'),
+                   card.get('definition_image_url'),
+                   card.get('card_order', id) if card_order is None else card_order)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'term': self.term,
+            'definition': self.definition,
+            'term_image_url': self.term_image_url,
+            'definition_image_url': self.definition_image_url
+        }
+
+class StudySet(Model):
+    """A study set with its cards (a tuple of Card), or without them (cards is None)"""
+    
+    __slots__ = ('id', 'user_id', 'title', 'description', 'subject', 'is_public', 'created_at',
+                 'source_set_id', 'updated_at', 'cards', 'card_count', 'has_upstream_changes')
+    _dict_fields = ('id', 'user_id', 'title', 'description', 'subject', 'is_public', 'privacy',
+                    'created_at', 'created_date', 'source_set_id', 'updated_at', 'cards', 'card_count',
+                    'has_upstream_changes')
+    
+    def __init__(self, id: str, user_id: int, title: str, description: str, subject: str,
+                 is_public: bool, created_at, source_set_id: str = None, updated_at=None,
+                 cards: Tuple[Card, ...] = None, card_count: int = None,
+                 has_upstream_changes: bool = False):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.description = description
+        self.subject = subject
+        self.is_public = is_public
+        self.created_at = _isoformat(created_at)
+        self.source_set_id = source_set_id
+        self.updated_at = _isoformat(updated_at)
+        self.cards = cards
+        self.card_count = len(cards) if card_count is None and cards is not None else card_count
+        self.has_upstream_changes = bool(has_upstream_changes)
+    
+    @property
+    def privacy(self) -> str:
+        return 'Public' if self.is_public else 'Private'
+    
+    @property
+    def created_date(self) -> Optional[str]:
+        return self.created_at
+    
+    @classmethod
+    def from_row(cls, row: Sequence, cards: Tuple[Card, ...] = None) -> "StudySet":
+        """Build from (id, user_id, title, description, subject, is_public, created_at,
+        source_set_id, updated_at[, card_count[, has_upstream_changes]])"""
+        return cls(*row[:9], cards=cards, card_count=row[9] if len(row) > 9 else None,
+                   has_upstream_changes=row[10] if len(row) > 10 else False)
+    
+    def with_cards(self, cards: Tuple[Card, ...]) -> "StudySet":
+        """Same set with the given cards, without copying them"""
+        return StudySet(self.id, self.user_id, self.title, self.description, self.subject,
+                        self.is_public, self.created_at, self.source_set_id, self.updated_at,
+                        cards=cards)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'subject': self.subject,
+            'privacy': self.privacy,
+            'cards': [card.to_dict() for card in self.cards or ()],
+            'created_date': self.created_date,
+            'card_count': self.card_count,
+            'source_set_id': self.source_set_id,
+            'updated_at': self.updated_at
+        }
+
+class Progress(Model):
+    """A user's progress on one card"""
+    
+    __slots__ = ('card_id', 'mastery_level', 'times_studied', 'last_studied', 'difficulty_history',
+                 'next_review_date')
+    _dict_fields = __slots__
+    
+    def __init__(self, card_id: int = None, mastery_level: int = 0, times_studied: int = 0,
+                 last_studied=None, difficulty_history: list = None, next_review_date=None):
+        self.card_id = card_id
+        self.mastery_level = mastery_level or 0
+        self.times_studied = times_studied or 0
+        self.last_studied = _isoformat(last_studied)
+        self.difficulty_history = difficulty_history if isinstance(difficulty_history, list) else []
+        self.next_review_date = next_review_date
+    
+    @classmethod
+    def from_row(cls, row: Sequence) -> "Progress":
+        """Build from (card_id, mastery_level, times_studied, last_studied, difficulty_history,
+        next_review_date), decoding difficulty_history if it is stored as text"""
+        card_id, mastery_level, times_studied, last_studied, difficulty_history, next_review_date = row
+        if isinstance(difficulty_history, str):
+            difficulty_history = json.loads(difficulty_history)
+        return cls(card_id, mastery_level, times_studied, last_studied, difficulty_history,
+                   next_review_date)
@@ -0,0 +1,52 @@
+import os
+import threading
+from types import CodeType
+from typing import Dict, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pages rendered inside app.py, by the name shown in the sidebar
+PAGE_FILES = {
+    "Create Study Set": "pages/create_set.py",
+    "Browse Sets": "pages/browse_sets.py",
+    "Study Mode": "pages/study_mode.py",
+    "Practice Test": "pages/practice_test.py",
+    "Spaced Review": "pages/spaced_review.py",
+    "Login": "pages/auth.py",
+    "Public Library": "pages/public_library.py"
+}
+
+# path -> (mtime, compiled code), shared by every session of the process
+_compiled: Dict[str, Tuple[float, CodeType]] = {}
+_lock = threading.Lock()
+
+def get_page_code(page: str) -> Optional[CodeType]:
+    """Get the compiled code of a page, compiling it only on first use or after it changed"""
+    relative_path = PAGE_FILES.get(page)
+    if relative_path is None:
+        return None
+    
+    path = os.path.join(BASE_DIR, relative_path)
+    mtime = os.path.getmtime(path)
+    
+    cached = _compiled.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    
+    with _lock:
+        cached = _compiled.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, 'r', encoding='utf-8') as f:
+                code = compile(f.read(), path, 'exec')
+            cached = (mtime, code)
+            _compiled[path] = cached
+    return cached[1]
+
+def render_page(page: str) -> bool:
+    """Run a page's script in a fresh namespace; returns False for unknown pages"""
+    code = get_page_code(page)
+    if code is None:
+        return False
+    
+    exec(code, {'__name__': '__main__', '__file__': code.co_filename})
+    return True
@@ -0,0 +1,94 @@
+import functools
+import os
+import threading
+from typing import Any, Callable, Dict
+
+# Objects shared by every session of this process, created on first use
+_resources: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+def shared_resource(factory: Callable[[], Any]) -> Callable[[], Any]:
+    """Make a zero-argument factory return one process-wide instance, like st.cache_resource
+    
+    The instance is created the first time it is asked for, never on import.
+    `factory.clear()` drops it so the next call creates a new one.
+    """
+    name = f"{factory.__module__}.{factory.__qualname__}"
+    
+    @functools.wraps(factory)
+    def get():
+        resource = _resources.get(name)
+        if resource is None:
+            with _lock:
+                resource = _resources.get(name)
+                if resource is None:
+                    resource = _resources[name] = factory()
+        return resource
+    
+    get.clear = lambda: _resources.pop(name, None)
+    return get
+
+@shared_resource
+def get_connection_pool():
+    """Pool of database connections shared by every session"""
+    from psycopg2.pool import ThreadedConnectionPool
+    
+    return ThreadedConnectionPool(
+        int(os.environ.get('DB_POOL_MIN', 1)),
+        int(os.environ.get('DB_POOL_MAX', 10)),
+        os.environ.get('DATABASE_URL')
+    )
+
+@shared_resource
+def get_database():
+    """Database handler shared by every session; connects through the pool on first query"""
+    from utils.db import Database
+    
+    return Database(pool_factory=get_connection_pool)
+
+@shared_resource
+def get_json_data_manager():
+    """Study sets of logged-out visitors, kept in a JSON file per set with a shared index"""
+    from utils.data_manager import DataManager
+    
+    return DataManager()
+
+@shared_resource
+def get_json_study_progress():
+    """Study progress of logged-out visitors, all kept in the same JSON file"""
+    from utils.study_progress import StudyProgress
+    
+    return StudyProgress()
+
+@shared_resource
+def get_sqlite_database():
+    """SQLite database of logged-out visitors (GUEST_STORAGE=sqlite), at GUEST_DB_PATH"""
+    from utils.sqlite_db import SQLiteDatabase
+    
+    return SQLiteDatabase()
+
+@shared_resource
+def get_sqlite_data_manager():
+    """Study sets of logged-out visitors, kept in the SQLite database"""
+    from utils.sqlite_data_manager import SQLiteDataManager
+    
+    return SQLiteDataManager(get_sqlite_database())
+
+@shared_resource
+def get_sqlite_study_progress():
+    """Study progress of logged-out visitors, kept in the SQLite database"""
+    from utils.sqlite_study_progress import SQLiteStudyProgress
+    
+    return SQLiteStudyProgress(get_sqlite_database())
+
+def get_guest_data_manager():
+    """Study sets of logged-out visitors, in the storage GUEST_STORAGE selects ('json' or 'sqlite')"""
+    if os.environ.get('GUEST_STORAGE', 'json') == 'sqlite':
+        return get_sqlite_data_manager()
+    return get_json_data_manager()
+
+def get_guest_study_progress():
+    """Study progress of logged-out visitors, in the storage GUEST_STORAGE selects ('json' or 'sqlite')"""
+    if os.environ.get('GUEST_STORAGE', 'json') == 'sqlite':
+        return get_sqlite_study_progress()
+    return get_json_study_progress()
@@ -1,14 +1,45 @@
 import streamlit as st
+from typing import Dict
 from utils.auth import Auth
-from utils.data_manager import DataManager
-from utils.study_progress import StudyProgress
-from utils.db_data_manager import DBDataManager
-from utils.db_study_progress import DBStudyProgress
+from utils.resources import get_database, get_guest_data_manager, get_guest_study_progress
+
+def get_dashboard_summary() -> Dict:
+    """Counts and recent sets for the Home page, from whichever backend the session uses
+    
+    Logged-in users get it from the database in one query.
+    """
+    if st.session_state.auth.is_authenticated() and 'user_id' in st.session_state:
+        return st.session_state.db.get_dashboard_summary(st.session_state.user_id)
+    
+    # Card counts come with the listing; no backend loads cards for it
+    all_sets = st.session_state.data_manager.list_study_sets()
+    return {
+        'total_sets': len(all_sets),
+        'total_cards': sum(study_set['card_count'] for study_set in all_sets.values()),
+        'mastered': st.session_state.study_progress.get_total_mastered(),
+        'learning': st.session_state.study_progress.get_total_learning(),
+        'recent_sets': [
+            {
+                'id': set_id,
+                'title': study_set['title'],
+                'description': study_set.get('description'),
+                'created_date': study_set.get('created_date'),
+                'card_count': study_set['card_count']
+            }
+            for set_id, study_set in list(all_sets.items())[:3]
+        ]
+    }
 
 def ensure_session():
-    """Initialize session state with required objects"""
+    """Initialize session state with required objects
+    
+    The database handler and the guest stores (JSON files, or SQLite with
+    GUEST_STORAGE=sqlite) are shared by every session through the resource
+    registry; the objects kept per session only hold the user id and that
+    session's caches, so creating a session does no I/O.
+    """
     if 'auth' not in st.session_state:
-        st.session_state.auth = Auth()
+        st.session_state.auth = Auth(get_database())
     
     auth = st.session_state.auth
     
@@ -18,12 +49,15 @@ def ensure_session():
             st.session_state.user_id = user['id']
             
             if 'db' not in st.session_state:
-                from utils.db import Database
-                st.session_state.db = Database()
+                st.session_state.db = get_database()
             
             if 'db_data_manager' not in st.session_state:
-                st.session_state.db_data_manager = DBDataManager(user['id'])
-                st.session_state.db_study_progress = DBStudyProgress(user['id'])
+                # Only logged-in sessions need the database-backed managers
+                from utils.db_data_manager import DBDataManager
+                from utils.db_study_progress import DBStudyProgress
+                
+                st.session_state.db_data_manager = DBDataManager(user['id'], db=get_database())
+                st.session_state.db_study_progress = DBStudyProgress(user['id'], db=get_database())
             else:
                 st.session_state.db_data_manager.set_user(user['id'])
                 st.session_state.db_study_progress.set_user(user['id'])
@@ -31,9 +65,5 @@ def ensure_session():
             st.session_state.data_manager = st.session_state.db_data_manager
             st.session_state.study_progress = st.session_state.db_study_progress
     else:
-        if 'json_data_manager' not in st.session_state:
-            st.session_state.json_data_manager = DataManager()
-            st.session_state.json_study_progress = StudyProgress()
-        
-        st.session_state.data_manager = st.session_state.json_data_manager
-        st.session_state.study_progress = st.session_state.json_study_progress
+        st.session_state.data_manager = get_guest_data_manager()
+        st.session_state.study_progress = get_guest_study_progress()
@@ -107,6 +107,32 @@ class SpacedRepetition:
         
         return datetime.now() >= next_review_date
     
+    @staticmethod
+    def is_card_due(progress) -> bool:
+        """
+        Check if a card is due for review from its progress
+        
+        Progress from the database carries next_review_date, so cards scheduled
+        for later are not due; progress without one (never studied, or the
+        JSON backend) is always due.
+        
+        Args:
+            progress: The card's progress (a Progress model or dict)
+        
+        Returns:
+            True if the card should be reviewed now
+        """
+        next_review = progress.get('next_review_date')
+        if isinstance(next_review, str):
+            try:
+                next_review = datetime.fromisoformat(next_review)
+            except ValueError:
+                return True
+        if not isinstance(next_review, datetime):
+            return True
+        
+        return SpacedRepetition.is_due_for_review(next_review)
+    
     @staticmethod
     def get_cards_due_for_review(study_set_cards: list, progress_data: dict) -> list:
         """
@@ -0,0 +1,175 @@
+import json
+from typing import Dict, List, Optional
+from utils.deck_cursor import SQLiteDeckSource
+from utils.sqlite_db import SQLiteDatabase
+
+# Study set fields with a column of their own; any other field is kept in `extra`
+SET_COLUMNS = ('title', 'description', 'subject', 'privacy', 'created_date')
+
+SET_QUERY = "SELECT id, title, description, subject, privacy, created_date, card_count, extra FROM study_sets"
+
+CARDS_QUERY = """
+    SELECT study_set_id, term, definition, term_image_url, definition_image_url
+    FROM cards
+"""
+
+class SQLiteDataManager:
+    """SQLite-backed data manager for guest study sets, with the same interface as DataManager
+    
+    Sets and their cards are rows, so reading or saving one set touches only
+    that set, and search and statistics are SQL queries. Card keys are
+    positions in the set, as in JSON storage.
+    """
+    
+    def __init__(self, db: SQLiteDatabase = None):
+        self.db = db or SQLiteDatabase()
+    
+    def _set_from_row(self, row, cards: List[Dict] = None) -> Dict:
+        study_set = json.loads(row[7]) if row[7] else {}
+        study_set.update({'id': row[0], 'title': row[1], 'card_count': row[6]})
+        # Fields a saved set did not have stay missing, as in JSON storage
+        for column, value in zip(SET_COLUMNS[1:], row[2:6]):
+            if value is not None:
+                study_set[column] = value
+        if cards is not None:
+            study_set['cards'] = cards
+        return study_set
+    
+    def _card_from_row(self, row) -> Dict:
+        card = {'term': row[1], 'definition': row[2]}
+        if row[3]:
+            card['term_image_url'] = row[3]
+        if row[4]:
+            card['definition_image_url'] = row[4]
+        return card
+    
+    def _sets(self, where: str = "", params: tuple = ()) -> Dict:
+        """Get the study sets matching a WHERE clause with card counts, without their cards"""
+        return {row[0]: self._set_from_row(row)
+                for row in self.db.execute_query(f"{SET_QUERY} {where} ORDER BY rowid", params, fetch='all')}
+    
+    def _sets_with_cards(self, where: str = "", params: tuple = ()) -> Dict:
+        """Get the study sets matching a WHERE clause with their cards, in two queries"""
+        sets = {
+            row[0]: self._set_from_row(row, cards=[])
+            for row in self.db.execute_query(f"{SET_QUERY} {where} ORDER BY rowid", params, fetch='all')
+        }
+        if sets:
+            rows = self.db.execute_query(
+                f"""{CARDS_QUERY}
+                    WHERE study_set_id IN (SELECT id FROM study_sets {where})
+                    ORDER BY study_set_id, position""",
+                params,
+                fetch='all'
+            )
+            for row in rows:
+                sets[row[0]]['cards'].append(self._card_from_row(row))
+        return sets
+    
+    def _write_set(self, conn, set_id: str, study_set: Dict, write_cards: bool = True):
+        extra = {key: value for key, value in study_set.items()
+                 if key not in SET_COLUMNS and key not in ('id', 'cards', 'card_count')}
+        cards = study_set.get('cards', [])
+        
+        conn.execute(
+            """INSERT INTO study_sets (id, title, description, subject, privacy, created_date, card_count, extra)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (id) DO UPDATE
+               SET title = excluded.title, description = excluded.description, subject = excluded.subject,
+                   privacy = excluded.privacy, created_date = excluded.created_date,
+                   card_count = CASE WHEN ? THEN excluded.card_count ELSE card_count END,
+                   extra = excluded.extra""",
+            (set_id, *(study_set.get(column) for column in SET_COLUMNS), len(cards),
+             json.dumps(extra, ensure_ascii=False) if extra else None, write_cards)
+        )
+        
+        if write_cards:
+            conn.execute("DELETE FROM cards WHERE study_set_id = ?", (set_id,))
+            conn.executemany(
+                """INSERT INTO cards (study_set_id, position, term, definition, term_image_url, definition_image_url)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(set_id, position, card['term'], card['definition'],
+                  card.get('term_image_url'), card.get('definition_image_url'))
+                 for position, card in enumerate(cards)]
+            )
+    
+    def save_study_set(self, set_id: str, study_set: Dict) -> bool:
+        """Save a study set and its cards in one transaction"""
+        try:
+            with self.db.transaction() as conn:
+                self._write_set(conn, set_id, study_set)
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+    
+    def get_study_set(self, set_id: str) -> Optional[Dict]:
+        """Get a specific study set by ID"""
+        return self._sets_with_cards("WHERE id = ?", (set_id,)).get(set_id)
+    
+    def get_study_set_info(self, set_id: str) -> Optional[Dict]:
+        """Get a study set's details and card count"""
+        row = self.db.execute_query(f"{SET_QUERY} WHERE id = ?", (set_id,), fetch='one')
+        return self._set_from_row(row) if row else None
+    
+    def get_deck_source(self, set_id: str) -> SQLiteDeckSource:
+        """Get a source for reading a study set's cards window by window (see DeckCursor)"""
+        return SQLiteDeckSource(self.db, set_id)
+    
+    def get_all_sets(self) -> Dict:
+        """Get all study sets with card counts, without their cards"""
+        return self._sets()
+    
+    def list_study_sets(self) -> Dict:
+        """Get all study sets with card counts, without their cards"""
+        return self._sets()
+    
+    def get_item_statistics(self, set_id: str) -> List[Dict]:
+        """Item analysis is only kept for logged-in users' sets"""
+        return []
+    
+    def delete_study_set(self, set_id: str) -> bool:
+        """Delete a study set (its cards go with it)"""
+        with self.db.transaction() as conn:
+            return conn.execute("DELETE FROM study_sets WHERE id = ?", (set_id,)).rowcount > 0
+    
+    def update_study_set(self, set_id: str, updates: Dict) -> bool:
+        """Update a study set with new data; cards are only rewritten if they are updated"""
+        with self.db.transaction() as conn:
+            row = conn.execute(f"{SET_QUERY} WHERE id = ?", (set_id,)).fetchone()
+            if row is None:
+                return False
+            
+            study_set = self._set_from_row(row)
+            study_set.update(updates)
+            self._write_set(conn, set_id, study_set, write_cards='cards' in updates)
+        return True
+    
+    def search_study_sets(self, query: str) -> Dict:
+        """Search study sets by title or description"""
+        query = query.lower()
+        return self._sets(
+            "WHERE instr(lower(title), ?) > 0 OR instr(lower(coalesce(description, '')), ?) > 0",
+            (query, query)
+        )
+    
+    def get_sets_by_subject(self, subject: str) -> Dict:
+        """Get all study sets for a specific subject"""
+        return self._sets("WHERE subject = ? COLLATE NOCASE", (subject,))
+    
+    def get_study_stats(self) -> Dict:
+        """Get overall statistics about study sets"""
+        rows = self.db.execute_query(
+            "SELECT coalesce(subject, 'Other'), COUNT(*), SUM(card_count) FROM study_sets GROUP BY 1",
+            fetch='all'
+        )
+        subjects = {row[0]: row[1] for row in rows}
+        total_sets = sum(subjects.values())
+        total_cards = sum(row[2] or 0 for row in rows)
+        
+        return {
+            'total_sets': total_sets,
+            'total_cards': total_cards,
+            'subjects': subjects,
+            'avg_cards_per_set': total_cards / total_sets if total_sets > 0 else 0
+        }
@@ -0,0 +1,123 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Connections shared by every session; a query waits for one when all are in use
+POOL_SIZE = int(os.environ.get('GUEST_DB_POOL', 4))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS study_sets (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    subject TEXT,
+    privacy TEXT,
+    created_date TEXT,
+    card_count INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cards (
+    study_set_id TEXT NOT NULL REFERENCES study_sets(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    term_image_url TEXT,
+    definition_image_url TEXT,
+    PRIMARY KEY (study_set_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS study_progress (
+    study_set_id TEXT NOT NULL,
+    card_index INTEGER NOT NULL,
+    mastery_level INTEGER NOT NULL DEFAULT 0,
+    times_studied INTEGER NOT NULL DEFAULT 0,
+    last_studied TEXT,
+    difficulty_history TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (study_set_id, card_index)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS test_attempts (
+    id TEXT PRIMARY KEY,
+    study_set_id TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_study_sets_subject ON study_sets(subject COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_study_sets_created_date ON study_sets(created_date);
+CREATE INDEX IF NOT EXISTS idx_study_progress_mastery ON study_progress(mastery_level);
+"""
+
+class SQLiteDatabase:
+    """SQLite storage for guest study sets and progress, for deployments without Postgres
+    
+    Streamlit runs every rerun on a new thread, so connections are not tied to
+    threads: a small pool of up to POOL_SIZE connections is shared by all of
+    them, opened as needed and kept for the life of the process. The database
+    is in WAL mode, so readers on one connection never wait for a writer on
+    another, and writes that touch several rows go through transaction().
+    """
+    
+    def __init__(self, path: str = None, pool_size: int = POOL_SIZE):
+        self.path = path or os.environ.get('GUEST_DB_PATH', 'amarsite.db')
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; transaction() opens transactions explicitly. Pooled
+        # connections move between threads, one thread at a time.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection for the duration of the block, creating the schema on first use"""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+    
+    def execute_query(self, query: str, params: tuple = (), fetch: str = None):
+        """Execute a query and optionally fetch results"""
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                if fetch == 'one':
+                    return cursor.fetchone()
+                if fetch == 'all':
+                    return cursor.fetchall()
+                return None
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def transaction(self):
+        """Yield a connection whose statements are committed together or rolled back"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                raise e
@@ -0,0 +1,205 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Tuple
+from utils.sqlite_db import SQLiteDatabase
+
+PROGRESS_QUERY = """
+    SELECT card_index, mastery_level, times_studied, last_studied, difficulty_history
+    FROM study_progress
+"""
+
+SET_PROGRESS_COLUMNS = """
+    COUNT(*),
+    SUM(CASE WHEN mastery_level >= 8 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN mastery_level >= 3 AND mastery_level < 8 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN mastery_level < 3 THEN 1 ELSE 0 END)
+"""
+
+class SQLiteStudyProgress:
+    """SQLite-backed study progress for guests, with the same interface as StudyProgress
+    
+    A batch of ratings is one transaction touching only the rated cards' rows,
+    and every statistic is an indexed SQL aggregate.
+    """
+    
+    def __init__(self, db: SQLiteDatabase = None):
+        self.db = db or SQLiteDatabase()
+    
+    def _progress_from_row(self, row) -> Dict:
+        return {
+            'difficulty_history': json.loads(row[4]),
+            'times_studied': row[2],
+            'last_studied': row[3],
+            'mastery_level': row[1]
+        }
+    
+    def _apply_ratings(self, conn, set_id: str, ratings: List[Tuple[int, str]]):
+        """Apply (card_index, difficulty) ratings inside a transaction"""
+        card_indexes = list({card_index for card_index, _ in ratings})
+        rows = conn.execute(
+            f"{PROGRESS_QUERY} WHERE study_set_id = ? AND card_index IN ({','.join('?' * len(card_indexes))})",
+            (set_id, *card_indexes)
+        ).fetchall()
+        states = {row[0]: self._progress_from_row(row) for row in rows}
+        
+        now = datetime.now().isoformat()
+        for card_index, difficulty in ratings:
+            state = states.setdefault(card_index, {
+                'difficulty_history': [],
+                'times_studied': 0,
+                'last_studied': None,
+                'mastery_level': 0
+            })
+            state['difficulty_history'].append({'difficulty': difficulty, 'timestamp': now})
+            state['times_studied'] += 1
+            state['last_studied'] = now
+            
+            change = 2 if difficulty == 'easy' else 1 if difficulty == 'good' else -1
+            state['mastery_level'] = max(0, min(10, state['mastery_level'] + change))
+        
+        conn.executemany(
+            """INSERT INTO study_progress (study_set_id, card_index, mastery_level, times_studied,
+                                           last_studied, difficulty_history)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (study_set_id, card_index) DO UPDATE
+               SET mastery_level = excluded.mastery_level, times_studied = excluded.times_studied,
+                   last_studied = excluded.last_studied, difficulty_history = excluded.difficulty_history""",
+            [(set_id, card_index, state['mastery_level'], state['times_studied'], state['last_studied'],
+              json.dumps(state['difficulty_history'])) for card_index, state in states.items()]
+        )
+    
+    def update_card_difficulty(self, set_id: str, card_index: int, difficulty: str) -> bool:
+        """Update the difficulty rating for a specific card"""
+        return self.apply_ratings(set_id, [(card_index, difficulty)])
+    
+    def apply_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of (card_index, difficulty) ratings in one transaction"""
+        if not ratings:
+            return False
+        
+        try:
+            with self.db.transaction() as conn:
+                self._apply_ratings(conn, set_id, ratings)
+            return True
+        except Exception as e:
+            print(f"Error saving progress: {e}")
+            return False
+    
+    def apply_card_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of ratings by card key; a card's key is its index"""
+        return self.apply_ratings(set_id, ratings)
+    
+    def record_test_results(self, set_id: str, attempt: Dict, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a practice test's ratings by card key once per attempt id
+        
+        Returns False if the attempt was already recorded, e.g. on a rerun.
+        """
+        with self.db.transaction() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO test_attempts (id, study_set_id, recorded_at) VALUES (?, ?, ?)",
+                (attempt['id'], set_id, datetime.now().isoformat())
+            ).rowcount
+            if not inserted:
+                return False
+            
+            if ratings:
+                self._apply_ratings(conn, set_id, ratings)
+        return True
+    
+    def get_card_progress(self, set_id: str, card_index: int) -> Dict:
+        """Get progress data for a specific card"""
+        row = self.db.execute_query(
+            f"{PROGRESS_QUERY} WHERE study_set_id = ? AND card_index = ?", (set_id, card_index), fetch='one'
+        )
+        if row:
+            return self._progress_from_row(row)
+        
+        return {
+            'difficulty_history': [],
+            'times_studied': 0,
+            'last_studied': None,
+            'mastery_level': 0
+        }
+    
+    def get_set_progress(self, set_id: str) -> Dict:
+        """Get overall progress for a study set"""
+        row = self.db.execute_query(
+            f"SELECT {SET_PROGRESS_COLUMNS} FROM study_progress WHERE study_set_id = ?", (set_id,), fetch='one'
+        )
+        return {
+            'studied': row[0],
+            'mastered': row[1] or 0,
+            'learning': row[2] or 0,
+            'difficult': row[3] or 0
+        }
+    
+    def get_all_set_progress(self) -> Dict[str, Dict]:
+        """Get overall progress for every study set with progress"""
+        rows = self.db.execute_query(
+            f"SELECT study_set_id, {SET_PROGRESS_COLUMNS} FROM study_progress GROUP BY study_set_id", fetch='all'
+        )
+        return {
+            row[0]: {'studied': row[1], 'mastered': row[2], 'learning': row[3], 'difficult': row[4]}
+            for row in rows
+        }
+    
+    def get_cards_by_difficulty(self, set_id: str) -> Dict[str, List[int]]:
+        """Get card indices grouped by difficulty level"""
+        groups = {'easy': [], 'learning': [], 'difficult': []}
+        rows = self.db.execute_query(
+            "SELECT card_index, mastery_level FROM study_progress WHERE study_set_id = ?", (set_id,), fetch='all'
+        )
+        for card_index, mastery in rows:
+            if mastery >= 8:
+                groups['easy'].append(card_index)
+            elif mastery >= 3:
+                groups['learning'].append(card_index)
+            else:
+                groups['difficult'].append(card_index)
+        return groups
+    
+    def get_study_streak(self, set_id: str) -> int:
+        """Calculate study streak for a set (consecutive days studied)"""
+        rows = self.db.execute_query(
+            """SELECT DISTINCT date(last_studied) AS day FROM study_progress
+               WHERE study_set_id = ? AND last_studied IS NOT NULL
+               ORDER BY day DESC""",
+            (set_id,),
+            fetch='all'
+        )
+        
+        streak = 0
+        current_date = datetime.now().date()
+        for (day,) in rows:
+            if (current_date - datetime.fromisoformat(day).date()).days == streak:
+                streak += 1
+            else:
+                break
+        return streak
+    
+    def get_total_mastered(self) -> int:
+        """Get total number of mastered cards across all sets"""
+        return self.db.execute_query(
+            "SELECT COUNT(*) FROM study_progress WHERE mastery_level >= 8", fetch='one'
+        )[0]
+    
+    def get_total_learning(self) -> int:
+        """Get total number of cards being learned across all sets"""
+        return self.db.execute_query(
+            "SELECT COUNT(*) FROM study_progress WHERE mastery_level >= 3 AND mastery_level < 8", fetch='one'
+        )[0]
+    
+    def get_study_statistics(self) -> Dict:
+        """Get comprehensive study statistics"""
+        row = self.db.execute_query(
+            """SELECT COUNT(*), coalesce(SUM(times_studied), 0), COUNT(DISTINCT study_set_id)
+               FROM study_progress""",
+            fetch='one'
+        )
+        return {
+            'total_cards_studied': row[0],
+            'total_study_sessions': row[1],
+            'total_mastered': self.get_total_mastered(),
+            'total_learning': self.get_total_learning(),
+            'sets_with_progress': row[2]
+        }
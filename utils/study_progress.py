@@ -1,34 +1,184 @@
 import json
+import logging
 import os
-from typing import Dict, List
+import threading
+from typing import Dict, List, Tuple
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# Journal events after which the journal is compacted into the snapshot
+COMPACT_AFTER = 1000
+
+def _apply_rating(progress_data: Dict, set_id: str, card_index: int, difficulty: str, timestamp: str):
+    """Apply a rating to a card's progress"""
+    if set_id not in progress_data:
+        progress_data[set_id] = {}
+    
+    card_key = str(card_index)
+    if card_key not in progress_data[set_id]:
+        progress_data[set_id][card_key] = {
+            'difficulty_history': [],
+            'times_studied': 0,
+            'last_studied': None,
+            'mastery_level': 0
+        }
+    
+    card_progress = progress_data[set_id][card_key]
+    
+    # Update difficulty history
+    card_progress['difficulty_history'].append({
+        'difficulty': difficulty,
+        'timestamp': timestamp
+    })
+    
+    # Increment study count
+    card_progress['times_studied'] += 1
+    card_progress['last_studied'] = timestamp
+    
+    # Update mastery level based on difficulty
+    if difficulty == 'easy':
+        card_progress['mastery_level'] = min(card_progress['mastery_level'] + 2, 10)
+    elif difficulty == 'good':
+        card_progress['mastery_level'] = min(card_progress['mastery_level'] + 1, 10)
+    else:  # hard
+        card_progress['mastery_level'] = max(card_progress['mastery_level'] - 1, 0)
+
 class StudyProgress:
-    """Tracks study progress for cards and sets"""
+    """Tracks study progress for cards and sets
+    
+    Ratings are appended to a journal, one compact line per rating, so a
+    write costs the same however much progress is stored. Every
+    COMPACT_AFTER events the journal is folded into the snapshot file and
+    emptied; loading reads the snapshot and replays the journal after it.
+    Events are numbered and the snapshot records the last one it includes,
+    so a compaction interrupted before the journal is emptied replays nothing
+    twice. A rating is applied in memory only once it is in the journal.
+    
+    A last line cut short by a crash is dropped silently. Any other line that
+    cannot be read is skipped with a warning, and the journal is compacted
+    right after loading so it is not read again.
     
-    def __init__(self, progress_file: str = "study_progress.json"):
+    One instance is shared by every guest session (see utils.resources). The
+    files are read on first use, and ratings are applied and appended under a
+    lock, so concurrent sessions never interleave journal lines or read
+    progress while it is being changed.
+    """
+    
+    def __init__(self, progress_file: str = "study_progress.json", journal_file: str = None):
         self.progress_file = progress_file
-        self.progress_data = self._load_progress()
+        self.journal_file = journal_file or os.path.splitext(progress_file)[0] + ".journal"
+        self._sequence = 0
+        self._journal_events = 0
+        self._progress_data = None
+        self._lock = threading.RLock()
+        # Practice test attempts already applied (guest test sessions end with the process)
+        self._recorded_attempts = set()
+    
+    @property
+    def progress_data(self) -> Dict:
+        """Progress by set id and card index, loaded from the files on first use"""
+        if self._progress_data is None:
+            with self._lock:
+                if self._progress_data is None:
+                    self._progress_data, skipped = self._load_progress()
+                    if skipped:
+                        self._compact()
+        return self._progress_data
     
-    def _load_progress(self) -> Dict:
-        """Load progress data from JSON file"""
+    def _load_progress(self) -> Tuple[Dict, int]:
+        """Load the progress snapshot, then replay the journal events after it
+        
+        Returns the progress and the number of journal lines skipped as unreadable.
+        """
+        progress_data = {}
+        skipped = 0
         if os.path.exists(self.progress_file):
             try:
                 with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    snapshot = json.load(f)
+                # Files written before the journal hold the progress itself
+                if 'journal_sequence' in snapshot and 'progress' in snapshot:
+                    progress_data = snapshot['progress']
+                    self._sequence = snapshot['journal_sequence']
+                else:
+                    progress_data = snapshot
             except (json.JSONDecodeError, FileNotFoundError):
-                return {}
-        return {}
+                pass
+        
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                lines = f.read().split("\n")
+            
+            # A last line without a newline was cut short by a crash; drop it so
+            # the next append starts on a line of its own
+            if lines[-1]:
+                with open(self.journal_file, 'w', encoding='utf-8') as f:
+                    f.write(''.join(line + "\n" for line in lines[:-1]))
+            
+            for line_number, line in enumerate(lines[:-1], 1):
+                try:
+                    sequence, set_id, card_index, difficulty, timestamp = json.loads(line)
+                    if not isinstance(sequence, int):
+                        raise ValueError(sequence)
+                except (ValueError, TypeError):
+                    logger.warning("Skipping unreadable line %d of %s", line_number, self.journal_file)
+                    skipped += 1
+                    continue
+                
+                self._journal_events += 1
+                if sequence > self._sequence:
+                    self._sequence = sequence
+                    _apply_rating(progress_data, set_id, card_index, difficulty, timestamp)
+        
+        return progress_data, skipped
     
-    def _save_progress(self) -> bool:
-        """Save progress data to JSON file"""
+    def _append_events(self, events: List[Tuple[str, int, str, str]]) -> bool:
+        """Append (set_id, card_index, difficulty, timestamp) rating events to the journal"""
+        lines = []
+        for sequence, event in enumerate(events, self._sequence + 1):
+            lines.append(json.dumps([sequence, *event], ensure_ascii=False, separators=(',', ':')) + "\n")
+        
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self.progress_data, f, ensure_ascii=False, indent=2)
-            return True
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
         except Exception as e:
             print(f"Error saving progress: {e}")
             return False
+        
+        self._sequence += len(lines)
+        self._journal_events += len(lines)
+        return True
+    
+    def _record(self, events: List[Tuple[str, int, str, str]]) -> bool:
+        """Append rating events to the journal, then apply them to the progress in memory"""
+        # Loaded first, so new events are numbered after those already saved
+        progress_data = self.progress_data
+        if not self._append_events(events):
+            return False
+        
+        for event in events:
+            _apply_rating(progress_data, *event)
+        
+        if self._journal_events >= COMPACT_AFTER:
+            self._compact()
+        return True
+    
+    def _compact(self) -> bool:
+        """Write all progress to the snapshot file, then empty the journal"""
+        try:
+            temp_file = f"{self.progress_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'journal_sequence': self._sequence, 'progress': self.progress_data},
+                          f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.progress_file)
+            
+            open(self.journal_file, 'w').close()
+            self._journal_events = 0
+            return True
+        except Exception as e:
+            print(f"Error compacting progress: {e}")
+            return False
     
     def update_card_difficulty(self, set_id: str, card_index: int, difficulty: str) -> bool:
         """Update the difficulty rating for a specific card
@@ -38,39 +188,41 @@ class StudyProgress:
             card_index: Index of the card in the set
             difficulty: 'easy', 'good', or 'hard'
         """
-        if set_id not in self.progress_data:
-            self.progress_data[set_id] = {}
-        
-        card_key = str(card_index)
-        if card_key not in self.progress_data[set_id]:
-            self.progress_data[set_id][card_key] = {
-                'difficulty_history': [],
-                'times_studied': 0,
-                'last_studied': None,
-                'mastery_level': 0
-            }
-        
-        card_progress = self.progress_data[set_id][card_key]
-        
-        # Update difficulty history
-        card_progress['difficulty_history'].append({
-            'difficulty': difficulty,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Increment study count
-        card_progress['times_studied'] += 1
-        card_progress['last_studied'] = datetime.now().isoformat()
+        with self._lock:
+            return self._record([self._rating_event(set_id, card_index, difficulty)])
+    
+    def apply_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of (card_index, difficulty) ratings with a single save"""
+        if not ratings:
+            return False
         
-        # Update mastery level based on difficulty
-        if difficulty == 'easy':
-            card_progress['mastery_level'] = min(card_progress['mastery_level'] + 2, 10)
-        elif difficulty == 'good':
-            card_progress['mastery_level'] = min(card_progress['mastery_level'] + 1, 10)
-        else:  # hard
-            card_progress['mastery_level'] = max(card_progress['mastery_level'] - 1, 0)
+        with self._lock:
+            return self._record([self._rating_event(set_id, card_index, difficulty)
+                                 for card_index, difficulty in ratings])
+    
+    def apply_card_ratings(self, set_id: str, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a batch of ratings by card key; in JSON storage a card's key is its index"""
+        return self.apply_ratings(set_id, ratings)
+    
+    def record_test_results(self, set_id: str, attempt: Dict, ratings: List[Tuple[int, str]]) -> bool:
+        """Apply a practice test's ratings by card key once per attempt id
         
-        return self._save_progress()
+        Only the ratings are kept; attempt details and responses are saved for
+        logged-in users. Returns False if the attempt was already recorded, e.g.
+        on a rerun, or its ratings could not be saved.
+        """
+        with self._lock:
+            if attempt['id'] in self._recorded_attempts:
+                return False
+            
+            if ratings and not self.apply_ratings(set_id, ratings):
+                return False
+            self._recorded_attempts.add(attempt['id'])
+            return True
+    
+    def _rating_event(self, set_id: str, card_index: int, difficulty: str) -> Tuple[str, int, str, str]:
+        """A rating made now, as a journal event"""
+        return set_id, card_index, difficulty, datetime.now().isoformat()
     
     def get_card_progress(self, set_id: str, card_index: int) -> Dict:
         """Get progress data for a specific card"""
@@ -89,111 +241,122 @@ class StudyProgress:
     
     def get_set_progress(self, set_id: str) -> Dict:
         """Get overall progress for a study set"""
-        if set_id not in self.progress_data:
+        with self._lock:
+            if set_id not in self.progress_data:
+                return {
+                    'studied': 0,
+                    'mastered': 0,
+                    'learning': 0,
+                    'difficult': 0
+                }
+            
+            set_data = self.progress_data[set_id]
+            studied = len(set_data)
+            mastered = sum(1 for card in set_data.values() if card['mastery_level'] >= 8)
+            learning = sum(1 for card in set_data.values() if 3 <= card['mastery_level'] < 8)
+            difficult = sum(1 for card in set_data.values() if card['mastery_level'] < 3)
+            
             return {
-                'studied': 0,
-                'mastered': 0,
-                'learning': 0,
-                'difficult': 0
+                'studied': studied,
+                'mastered': mastered,
+                'learning': learning,
+                'difficult': difficult
             }
-        
-        set_data = self.progress_data[set_id]
-        studied = len(set_data)
-        mastered = sum(1 for card in set_data.values() if card['mastery_level'] >= 8)
-        learning = sum(1 for card in set_data.values() if 3 <= card['mastery_level'] < 8)
-        difficult = sum(1 for card in set_data.values() if card['mastery_level'] < 3)
-        
-        return {
-            'studied': studied,
-            'mastered': mastered,
-            'learning': learning,
-            'difficult': difficult
-        }
+    
+    def get_all_set_progress(self) -> Dict[str, Dict]:
+        """Get overall progress for every study set with progress"""
+        with self._lock:
+            return {set_id: self.get_set_progress(set_id) for set_id in self.progress_data}
     
     def get_cards_by_difficulty(self, set_id: str) -> Dict[str, List[int]]:
         """Get card indices grouped by difficulty level"""
-        if set_id not in self.progress_data:
-            return {'easy': [], 'learning': [], 'difficult': []}
-        
-        easy_cards = []
-        learning_cards = []
-        difficult_cards = []
-        
-        for card_index, card_progress in self.progress_data[set_id].items():
-            mastery = card_progress['mastery_level']
-            card_idx = int(card_index)
-            
-            if mastery >= 8:
-                easy_cards.append(card_idx)
-            elif mastery >= 3:
-                learning_cards.append(card_idx)
-            else:
-                difficult_cards.append(card_idx)
-        
-        return {
-            'easy': easy_cards,
-            'learning': learning_cards,
-            'difficult': difficult_cards
-        }
+        with self._lock:
+            if set_id not in self.progress_data:
+                return {'easy': [], 'learning': [], 'difficult': []}
+            
+            easy_cards = []
+            learning_cards = []
+            difficult_cards = []
+            
+            for card_index, card_progress in self.progress_data[set_id].items():
+                mastery = card_progress['mastery_level']
+                card_idx = int(card_index)
+                
+                if mastery >= 8:
+                    easy_cards.append(card_idx)
+                elif mastery >= 3:
+                    learning_cards.append(card_idx)
+                else:
+                    difficult_cards.append(card_idx)
+            
+            return {
+                'easy': easy_cards,
+                'learning': learning_cards,
+                'difficult': difficult_cards
+            }
     
     def get_study_streak(self, set_id: str) -> int:
         """Calculate study streak for a set (consecutive days studied)"""
-        if set_id not in self.progress_data:
-            return 0
-        
-        # Get all study dates
-        study_dates = []
-        for card_progress in self.progress_data[set_id].values():
-            if card_progress['last_studied']:
-                try:
-                    date = datetime.fromisoformat(card_progress['last_studied']).date()
-                    study_dates.append(date)
-                except ValueError:
-                    continue
-        
-        if not study_dates:
-            return 0
-        
-        # Count consecutive days
-        study_dates = sorted(set(study_dates), reverse=True)
-        streak = 0
-        current_date = datetime.now().date()
-        
-        for date in study_dates:
-            if (current_date - date).days == streak:
-                streak += 1
-            else:
-                break
-        
-        return streak
+        with self._lock:
+            if set_id not in self.progress_data:
+                return 0
+            
+            # Get all study dates
+            study_dates = []
+            for card_progress in self.progress_data[set_id].values():
+                if card_progress['last_studied']:
+                    try:
+                        date = datetime.fromisoformat(card_progress['last_studied']).date()
+                        study_dates.append(date)
+                    except ValueError:
+                        continue
+            
+            if not study_dates:
+                return 0
+            
+            # Count consecutive days
+            study_dates = sorted(set(study_dates), reverse=True)
+            streak = 0
+            current_date = datetime.now().date()
+            
+            for date in study_dates:
+                if (current_date - date).days == streak:
+                    streak += 1
+                else:
+                    break
+            
+            return streak
     
     def get_total_mastered(self) -> int:
         """Get total number of mastered cards across all sets"""
-        total = 0
-        for set_data in self.progress_data.values():
-            total += sum(1 for card in set_data.values() if card['mastery_level'] >= 8)
-        return total
+        with self._lock:
+            total = 0
+            for set_data in self.progress_data.values():
+                total += sum(1 for card in set_data.values() if card['mastery_level'] >= 8)
+            return total
     
     def get_total_learning(self) -> int:
         """Get total number of cards being learned across all sets"""
-        total = 0
-        for set_data in self.progress_data.values():
-            total += sum(1 for card in set_data.values() if 3 <= card['mastery_level'] < 8)
-        return total
+        with self._lock:
+            total = 0
+            for set_data in self.progress_data.values():
+                total += sum(1 for card in set_data.values() if 3 <= card['mastery_level'] < 8)
+            return total
     
     def get_study_statistics(self) -> Dict:
         """Get comprehensive study statistics"""
-        total_cards_studied = 0
-        total_study_sessions = 0
-        
-        for set_data in self.progress_data.values():
-            total_cards_studied += len(set_data)
-            total_study_sessions += sum(card['times_studied'] for card in set_data.values())
-        
-        return {
-            'total_cards_studied': total_cards_studied,
-            'total_study_sessions': total_study_sessions,
-            'total_mastered': self.get_total_mastered(),
-            'total_learning': self.get_total_learning(),
-            'sets_with_progress': len(self.progress_data)
-        }
+        with self._lock:
+            total_cards_studied = 0
+            total_study_sessions = 0
+            
+            for set_data in self.progress_data.values():
+                total_cards_studied += len(set_data)
+                total_study_sessions += sum(card['times_studied'] for card in set_data.values())
+            
+            return {
+                'total_cards_studied': total_cards_studied,
+                'total_study_sessions': total_study_sessions,
+                'total_mastered': self.get_total_mastered(),
+                'total_learning': self.get_total_learning(),
+                'sets_with_progress': len(self.progress_data)
+            }
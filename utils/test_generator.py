@@ -0,0 +1,207 @@
+import random
+import threading
+from array import array
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+from utils.cache import LRUCache
+from utils.models import Card
+
+# Wrong answers offered with each multiple choice question
+DISTRACTORS = 3
+
+# Distractor candidates kept per card; a question's distractors are sampled from them
+POOL_SIZE = 8
+
+# Extra candidates drawn per card, so a repeated definition rarely needs another round
+CANDIDATE_SLACK = 2
+
+# Rounds of drawing before a card settles for a smaller pool (decks of near-identical cards)
+MAX_ROUNDS = 5
+
+class DeckIndex:
+    """Card keys of a deck in a compact array, for drawing random cards in O(1)
+    
+    Built once per deck version; sampling never scans the deck unless the deck
+    is so small that scanning it is as cheap as drawing.
+    """
+    
+    __slots__ = ('keys',)
+    
+    def __init__(self, keys: Iterable[int]):
+        self.keys = array('q', keys)
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def first(self, k: int) -> List[int]:
+        """Get the keys of the first k cards, in set order"""
+        return list(self.keys[:k])
+    
+    def sample(self, k: int, exclude: Iterable[int] = ()) -> List[int]:
+        """Draw up to k distinct keys uniformly at random, skipping the excluded ones
+        
+        Uses rejection sampling by position: with the deck at least twice the
+        size of what is drawn or excluded, each key takes under two draws.
+        """
+        seen = set(exclude)
+        size = len(self.keys)
+        if size <= 2 * (k + len(seen)):
+            pool = [key for key in self.keys if key not in seen]
+            return random.sample(pool, min(k, len(pool)))
+        
+        chosen = []
+        while len(chosen) < k:
+            key = self.keys[random.randrange(size)]
+            if key not in seen:
+                seen.add(key)
+                chosen.append(key)
+        return chosen
+
+# Indexes of database decks, shared by every session; sized in card keys
+_deck_indexes = LRUCache(maxsize=1000000, sizeof=len)
+
+def get_deck_index(source, set_id: str, version: Optional[Hashable] = None) -> DeckIndex:
+    """Get the index of a deck, built from its card keys once per version (its updated_at)
+    
+    Decks without a version (JSON storage) are indexed on every call.
+    """
+    if version is None:
+        return DeckIndex(source.card_keys())
+    
+    index = _deck_indexes.get((set_id, version))
+    if index is None:
+        index = DeckIndex(source.card_keys())
+        _deck_indexes.set((set_id, version), index, tag=set_id)
+    return index
+
+def _definition_key(card: Card) -> str:
+    return ' '.join(card.definition.casefold().split())
+
+class QuestionBank:
+    """Multiple choice material of one deck version, shared by every session
+    
+    For each card asked about, the bank keeps a pool of distractor candidates
+    whose definitions differ from the card's and from each other: the nearest
+    definitions when a distractor engine is available (see utils.distractors),
+    topped up with random cards. Pools are built the first time a card is
+    asked about, for all of a test's cards in one batch, and reused by every
+    later test, so a class starting the same quiz builds it once.
+    """
+    
+    def __init__(self, source, index: DeckIndex, distractors: Callable = None, pool_size: int = POOL_SIZE):
+        self.source = source
+        self.index = index
+        self.pool_size = pool_size
+        self._distractors = distractors
+        self._pools: Dict[int, array] = {}
+        self._lock = threading.Lock()
+    
+    def pools(self, keys: List[int]) -> Dict[int, array]:
+        """Get the distractor pools of the given cards, building the missing ones
+        
+        Pools are built outside the lock, since the first build may index the
+        whole deck for similarity; if two tests build the same card's pool, the
+        first one stored is kept.
+        """
+        with self._lock:
+            missing = [key for key in keys if key not in self._pools]
+            if not missing:
+                return {key: self._pools[key] for key in keys}
+        
+        engine = self._distractors() if self._distractors is not None else None
+        built = self._build_pools(missing, engine)
+        
+        with self._lock:
+            for key, pool in built.items():
+                self._pools.setdefault(key, pool)
+            return {key: self._pools[key] for key in keys}
+    
+    def _fetch(self, keys: Iterable[int]) -> Dict[int, Card]:
+        return {card.key: card for card in self.source.cards_by_keys(list(keys))}
+    
+    def _build_pools(self, keys: List[int], engine=None) -> Dict[int, array]:
+        """Build pools for cards, drawing random candidates together and fetching them
+        in one batch; only cards that drew repeated definitions draw again"""
+        pools = {key: engine.candidates(key)[:self.pool_size] if engine else [] for key in keys}
+        tried = {key: {key, *pool} for key, pool in pools.items()}
+        cards = self._fetch(set().union(*tried.values()))
+        
+        for _ in range(MAX_ROUNDS):
+            candidates = {
+                key: self.index.sample(self.pool_size - len(pool) + CANDIDATE_SLACK, exclude=tried[key])
+                for key, pool in pools.items() if len(pool) < self.pool_size
+            }
+            if not any(candidates.values()):
+                break
+            
+            cards.update(self._fetch({key for keys in candidates.values() for key in keys} - cards.keys()))
+            
+            for key, keys in candidates.items():
+                tried[key].update(keys)
+                pool = pools[key]
+                definitions = {_definition_key(cards[k]) for k in [key] + pool if k in cards}
+                for candidate in keys:
+                    card = cards.get(candidate)
+                    if card is None or len(pool) == self.pool_size:
+                        continue
+                    
+                    definition = _definition_key(card)
+                    if definition not in definitions:
+                        definitions.add(definition)
+                        pool.append(candidate)
+        
+        return {key: array('q', pool) for key, pool in pools.items()}
+
+# Question banks of database decks, shared by every session
+_question_banks = LRUCache(maxsize=256)
+
+def get_question_bank(source, set_id: str, version: Optional[Hashable] = None) -> QuestionBank:
+    """Get the question bank of a deck, one per version (its updated_at)
+    
+    The deck's similarity index is only built once a multiple choice question
+    needs it. Decks without a version (JSON storage) get a new bank on every call.
+    """
+    from utils.distractors import get_distractor_engine
+    
+    bank = _question_banks.get((set_id, version)) if version is not None else None
+    if bank is None:
+        bank = QuestionBank(source, get_deck_index(source, set_id, version),
+                            distractors=lambda: get_distractor_engine(source, set_id, version))
+        if version is not None:
+            _question_banks.set((set_id, version), bank, tag=set_id)
+    return bank
+
+class TestGenerator:
+    """Assembles practice tests from a question bank; questions refer to cards by key
+    
+    Question cards are drawn from the deck index and each multiple choice
+    question offers its answer plus distractors sampled from the card's pool,
+    so generating a test costs the same for a deck of fifty cards as for one
+    of fifty thousand.
+    """
+    
+    def __init__(self, bank: QuestionBank):
+        self.bank = bank
+    
+    def generate(self, num_questions: int, test_type: str, random_order: bool = True) -> List[Dict]:
+        """Create questions of the given test type ("Multiple Choice", "Written Response" or "Mixed")"""
+        if random_order:
+            question_keys = self.bank.index.sample(num_questions)
+        else:
+            question_keys = self.bank.index.first(num_questions)
+        
+        questions = []
+        for key in question_keys:
+            if test_type == "Multiple Choice" or (test_type == "Mixed" and random.choice([True, False])):
+                questions.append({'type': 'multiple_choice', 'card': key})
+            else:
+                questions.append({'type': 'written', 'card': key})
+        
+        multiple_choice = [question for question in questions if question['type'] == 'multiple_choice']
+        pools = self.bank.pools([question['card'] for question in multiple_choice])
+        for question in multiple_choice:
+            pool = pools[question['card']]
+            options = array('q', [question['card']] + random.sample(list(pool), min(DISTRACTORS, len(pool))))
+            random.shuffle(options)
+            question['options'] = options
+        
+        return questions
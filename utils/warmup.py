@@ -0,0 +1,63 @@
+import logging
+import os
+import threading
+import time
+from utils.resources import shared_resource
+
+logger = logging.getLogger(__name__)
+
+# Connections opened ahead of the first visitors (the pool keeps them open)
+WARM_CONNECTIONS = int(os.environ.get('DB_POOL_WARM', 2))
+
+# Newest public study sets whose decks are loaded into the deck cache
+WARM_PUBLIC_SETS = int(os.environ.get('WARM_PUBLIC_SETS', 10))
+
+def _warm_database():
+    from utils.resources import get_connection_pool, get_database
+    
+    pool = get_connection_pool()
+    connections = []
+    try:
+        for _ in range(WARM_CONNECTIONS):
+            connections.append(pool.getconn())
+    finally:
+        for conn in connections:
+            pool.putconn(conn)
+    
+    db = get_database()
+    for study_set in db.get_public_study_sets(limit=WARM_PUBLIC_SETS):
+        db.get_study_set(study_set['id'])
+
+def _warm_up():
+    started = time.perf_counter()
+    
+    # Modules the first page views import lazily
+    try:
+        import bcrypt
+        from utils import db_data_manager, db_study_progress
+        from utils.page_registry import PAGE_FILES, get_page_code
+        
+        for page in PAGE_FILES:
+            get_page_code(page)
+    except Exception as e:
+        logger.warning("Warm-up could not load the pages' modules: %s", e)
+    
+    if os.environ.get('DATABASE_URL'):
+        try:
+            _warm_database()
+        except Exception as e:
+            logger.warning("Warm-up could not reach the database: %s", e)
+    
+    logger.debug("Warm-up finished in %.2fs", time.perf_counter() - started)
+
+@shared_resource
+def warm_up() -> threading.Thread:
+    """Prepare this process for its first visitors, once, in the background
+    
+    Imports the modules page views load lazily, compiles every page, opens
+    pooled database connections and loads the newest public decks into the
+    deck cache. The first render does not wait for any of it.
+    """
+    thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread